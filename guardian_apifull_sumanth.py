@@ -3,15 +3,22 @@ import threading
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog, scrolledtext
 from playwright.async_api import async_playwright
-import re
 import traceback
 import os
 import json
 from datetime import datetime
 import httpx
 
+from guardian_eligibility import BASE_URL, api_headers, member_flow, patient_flow
+
+# Opt-in: launch Chromium and load the home page with the saved session as soon as the app
+# opens, so a still-valid session is ready (and eligibility enabled) before anyone clicks
+GUARDIAN_WARMUP = os.environ.get("GUARDIAN_WARMUP") == "1"
+
 
 class GuardianAutomationApp:
+    HOME_URL = "https://www.guardiananytime.com/gaprovider/home"
+
     def __init__(self, root):
         self.root = root
         root.title("Guardian Eligibility Data Collector")
@@ -121,6 +128,10 @@ class GuardianAutomationApp:
         self.eligibility_json = None
         self.eligibility_responses = []
         self.auth_state_path = os.path.join(os.path.expanduser("~"), ".guardian_auth_state.json")
+        # self.loop runs one flow at a time (warm-up, login, OTP, eligibility)
+        self.loop_lock = threading.Lock()
+        if GUARDIAN_WARMUP:
+            threading.Thread(target=self._run_on_loop, args=(self._warmup_flow,), daemon=True).start()
 
     # ================== utils ==================
     def log(self, msg):
@@ -132,166 +143,6 @@ class GuardianAutomationApp:
         cookies = await self.context.cookies("https://www.guardiananytime.com")
         return "; ".join(f"{c['name']}={c['value']}" for c in cookies)
 
-    def _digits(self, s: str) -> str:
-        return re.sub(r"[^0-9]", "", s or "")
-
-    def _norm_name(self, s: str) -> str:
-        s = (s or "").upper().strip()
-        s = re.sub(r"[^A-Z ]+", "", s)
-        s = re.sub(r"\s+", " ", s)
-        return s
-
-    def _rel_code(self, rel_str: str) -> str:
-        m = {"self": "Self", "son": "S", "daughter": "D", "spouse": "SP"}
-        return m.get((rel_str or "").strip().lower(), rel_str or "Self")
-
-    # ---- pickers ----
-    def _pick_member_by_dob(self, rows, dob: str):
-        want = self._digits(dob)
-        for block in rows or []:
-            for member in block.get("member_dependent", []) or []:
-                if self._digits(member.get("date_of_birth", "")) == want:
-                    self.log(f"✓ Found member: {member.get('first_name')} {member.get('last_name')} DOB: {member.get('date_of_birth')}")
-                    return member
-        for r in rows or []:
-            if self._digits(r.get("date_of_birth", "")) == want:
-                return r
-        return None
-
-    def _iter_member_search_candidates(self, ms_json: dict):
-        if not isinstance(ms_json, dict):
-            return
-        for b in ms_json.get("multiple_patient_search_res") or []:
-            for m in b.get("member_dependent", []) or []:
-                yield m
-        for m in ms_json.get("member_dependent", []) or []:
-            yield m
-        if {"first_name", "last_name"} & set(ms_json.keys()):
-            yield ms_json
-
-    def _pick_member_by_full_name(self, ms_json: dict, full_name: str):
-        want = self._norm_name(full_name)
-        best = None
-        count = 0
-        for c in self._iter_member_search_candidates(ms_json):
-            count += 1
-            fn = self._norm_name(c.get("first_name") or c.get("patient_first_name") or "")
-            ln = self._norm_name(c.get("last_name")  or c.get("patient_last_name")  or "")
-            name = (fn + " " + ln).strip()
-            if name == want:
-                self.log(f"✓ Exact match: {c.get('first_name')} {c.get('last_name')}")
-                return c
-            if not best and fn and ln:
-                best = c
-        self.log(f"DEBUG: candidates seen = {count}")
-        if best:
-            self.log(f"✓ Using best available: {best.get('first_name')} {best.get('last_name')}")
-        return best
-
-    # ---- group/identifier helpers ----
-    def _extract_group_from_rows(self, rows):
-        # scan block-level and dependent-level for any plausible group key
-        keys = ("group_policy_number", "plan_group_number", "group_id")
-        for block in rows or []:
-            for k in keys:
-                v = block.get(k)
-                if v: return v
-            for m in block.get("member_dependent", []) or []:
-                for k in keys:
-                    v = m.get(k)
-                    if v: return v
-        return None
-
-    def _pool_fields_from_rows(self, rows):
-        pool = []
-        for block in rows or []:
-            for m in block.get("member_dependent", []) or []:
-                pool.append(m)
-        return pool
-
-    def _backfill_member_fields(self, member: dict, rows):
-        needed = {
-            "group_policy_number": None,
-            "identifier": None,
-            "first_name": None,
-            "last_name": None,
-            "relationship": None,
-            "date_of_birth": None,
-        }
-        pool = self._pool_fields_from_rows(rows)
-        ident = member.get("identifier") or member.get("member_id") or member.get("subscriber_id") or ""
-
-        for k in list(needed.keys()):
-            if member.get(k):
-                continue
-            match = None
-            if ident:
-                for c in pool:
-                    if (c.get("identifier") == ident) or (c.get("member_id") == ident) or (c.get("subscriber_id") == ident):
-                        match = c; break
-            if not match:
-                for c in pool:
-                    if (c.get("first_name") == member.get("first_name") and
-                        c.get("last_name")  == member.get("last_name")):
-                        match = c; break
-            if match and match.get(k):
-                member[k] = match.get(k)
-
-        # final try: pull group from any sibling if still missing
-        if not member.get("group_policy_number"):
-            g = self._extract_group_from_rows(rows)
-            if g: member["group_policy_number"] = g
-
-    def _extract_identifier_from_rows_or_member(self, rows, member):
-        ident = member.get("identifier") or member.get("member_id") or member.get("subscriber_id")
-        if ident:
-            return ident
-        # try block-level input_identifier from the same response
-        for block in rows or []:
-            if block.get("input_identifier"):
-                return block["input_identifier"]
-        return None
-
-    async def _enrich_group_by_identifier(self, client: httpx.AsyncClient, identifier: str):
-        """
-        Try to re-query by identifier to fetch a record that includes group number.
-        """
-        tries = [
-            ("/gaprovider/api/multiple-patient/search", [{"identifier": identifier}]),
-            ("/gaprovider/api/multiple-patient/search", [{"input_identifier": identifier}]),
-        ]
-        for path, payload in tries:
-            self.log(f"ℹ️ Re-query for group via {path} using identifier")
-            r = await client.post(path, json=payload)
-            if r.status_code < 400:
-                try:
-                    j = r.json()
-                except Exception:
-                    continue
-                rows = j.get("multiple_patient_search_res") or []
-                g = self._extract_group_from_rows(rows)
-                if g:
-                    return g, j
-        return None, None
-
-    # ---- PPO payload ----
-    def _ppo_from_member_generic(self, member: dict, dob: str) -> dict:
-        payload = {
-            "group_policy_number": member.get("group_policy_number")
-                                   or member.get("plan_group_number")
-                                   or member.get("group_id")
-                                   or "",
-            "patient_relation_to_member": member.get("relationship") or "",
-            "patient_identifier": member.get("identifier")
-                                   or member.get("member_id")
-                                   or member.get("subscriber_id")
-                                   or "",
-            "patient_date_of_birth": dob,
-            "patient_first_name": member.get("first_name") or member.get("patient_first_name") or "",
-            "patient_last_name":  member.get("last_name")  or member.get("patient_last_name")  or "",
-        }
-        return {k: v for k, v in payload.items() if v}
-
     # ================== network taps (optional debug) ==================
     async def _capture_response(self, response):
         try:
@@ -334,6 +185,32 @@ class GuardianAutomationApp:
         self.context = await self.browser.new_context(storage_state=storage_state)
         self.page = await self.context.new_page()
 
+    async def _open_saved_session(self):
+        """Load home with the saved storage state; True (eligibility enabled) if still logged in"""
+        page = self.page
+        self.log("DEBUG: Navigating to Guardian home")
+        await page.goto(self.HOME_URL, wait_until="domcontentloaded")
+        try: await page.wait_for_load_state("networkidle", timeout=4000)
+        except: pass
+
+        if self.HOME_URL not in page.url:
+            return False
+        self.log("✅ Session found — home loaded, OTP not required.")
+        self.otp_entry.config(state="disabled"); self.otp_btn.config(state="disabled")
+        self.eligibility_btn.config(state="normal")
+        try: await self.context.storage_state(path=self.auth_state_path)
+        except: pass
+        return True
+
+    async def _warmup_flow(self):
+        """GUARDIAN_WARMUP: browser up and saved session checked before Start is clicked"""
+        try:
+            await self.ensure_browser()
+            if not await self._open_saved_session():
+                self.log("> Warm-up: browser ready, login required — click Start Login.")
+        except Exception as e:
+            self.log(f"Warm-up failed: {e}")
+
     async def cleanup_browser(self):
         if self.browser: await self.browser.close()
         if self.pw_manager: await self.pw_manager.stop()
@@ -352,13 +229,18 @@ class GuardianAutomationApp:
         threading.Thread(target=self._run_async, daemon=True).start()
 
     def _run_async(self):
-        asyncio.set_event_loop(self.loop)
-        self.loop.run_until_complete(self._login_flow())
+        self._run_on_loop(self._login_flow)
+
+    def _run_on_loop(self, flow):
+        """Worker thread: run one async flow on the app's event loop, after any flow still running"""
+        with self.loop_lock:
+            asyncio.set_event_loop(self.loop)
+            self.loop.run_until_complete(flow())
 
     async def _login_flow(self):
         username, password, chosen_mfa = self.uname_var.get(), self.pwd_var.get(), self.mfa_var.get()
 
-        HOME_URL = "https://www.guardiananytime.com/gaprovider/home"
+        HOME_URL = self.HOME_URL
         AUTH_URL = (
             "https://login.guardianlife.com/oauth2/default/v1/authorize"
             "?client_id=0oa3l1gpjzxhrgTrt4h7"
@@ -377,17 +259,7 @@ class GuardianAutomationApp:
             self.eligibility_responses = []
             self._attach_network_hooks()
 
-            self.log("DEBUG: Navigating to Guardian home")
-            await page.goto(HOME_URL, wait_until="domcontentloaded")
-            try: await page.wait_for_load_state("networkidle", timeout=4000)
-            except: pass
-
-            if HOME_URL in page.url:
-                self.log("✅ Session found — home loaded, OTP not required.")
-                self.otp_entry.config(state="disabled"); self.otp_btn.config(state="disabled")
-                self.eligibility_btn.config(state="normal")
-                try: await self.context.storage_state(path=self.auth_state_path)
-                except: pass
+            if await self._open_saved_session():
                 return
 
             # IdP route
@@ -461,8 +333,7 @@ class GuardianAutomationApp:
         threading.Thread(target=self._do_enter_otp, args=(otp,), daemon=True).start()
 
     def _do_enter_otp(self, otp):
-        asyncio.set_event_loop(self.loop)
-        self.loop.run_until_complete(self._complete_otp(otp))
+        self._run_on_loop(lambda: self._complete_otp(otp))
 
     async def _complete_otp(self, otp):
         try:
@@ -490,165 +361,33 @@ class GuardianAutomationApp:
         threading.Thread(target=self._do_eligibility_search, daemon=True).start()
 
     def _do_eligibility_search(self):
-        asyncio.set_event_loop(self.loop)
-        self.loop.run_until_complete(self._eligibility_search_workflow())
+        self._run_on_loop(self._eligibility_search_workflow)
 
     async def _eligibility_search_workflow(self):
         self.view_btn.grid_remove()
         self.download_btn.grid_remove()
         self.eligibility_json = None
 
-        base = "https://www.guardiananytime.com"
-        headers = {
-            "Accept": "application/json",
-            "Content-Type": "application/json",
-            "Origin": base,
-            "Referer": f"{base}/gaprovider/home",
-            "Cookie": await self._cookie_header(),
-            "User-Agent": "guardian-tk/1.0",
-        }
-
-        # -------- Patient info flow (with group enrichment) --------
-        async def patient_flow():
-            last_name = (self.patient_last_var.get() or "").strip()
-            dob = (self.patient_dob_var.get() or "").strip()
-            rel_ui = (self.patient_rel_var.get() or "Self").strip()
-
-            async with httpx.AsyncClient(base_url=base, headers=headers, timeout=30.0, follow_redirects=True) as client:
-                # try with UI relationship string, then code (S/D/SP/Self)
-                search_bodies = [
-                    [{
-                        "date_of_birth": dob,
-                        "last_name": last_name,
-                        "relationship": rel_ui,
-                        "first_name": "",
-                        "zip_code": ""
-                    }],
-                    [{
-                        "date_of_birth": dob,
-                        "last_name": last_name,
-                        "relationship": self._rel_code(rel_ui),
-                        "first_name": "",
-                        "zip_code": ""
-                    }],
-                ]
-
-                last_err = None
-                for body in search_bodies:
-                    self.log(f"> API: POST /gaprovider/api/multiple-patient/search for {last_name}, {dob} (rel={body[0]['relationship']})")
-                    resp = await client.post("/gaprovider/api/multiple-patient/search", json=body)
-                    if resp.status_code >= 400:
-                        last_err = (resp.status_code, resp.text[:400]); continue
-
-                    data = resp.json()
-                    rows = data.get("multiple_patient_search_res") or []
-                    member = self._pick_member_by_dob(rows, dob)
-                    if not member:
-                        last_err = (404, "No dependent with that DOB"); continue
-
-                    # backfill from same result
-                    self._backfill_member_fields(member, rows)
-
-                    # derive group if still missing
-                    if not member.get("group_policy_number"):
-                        ident = self._extract_identifier_from_rows_or_member(rows, member)
-                        if ident:
-                            g, _ = await self._enrich_group_by_identifier(client, ident)
-                            if g:
-                                member["group_policy_number"] = g
-
-                    # if still missing, try one more pull from rows (any dependent)
-                    if not member.get("group_policy_number"):
-                        g2 = self._extract_group_from_rows(rows)
-                        if g2:
-                            member["group_policy_number"] = g2
-
-                    if not member.get("group_policy_number"):
-                        last_err = (400, "group_policy_number still missing after enrichment"); continue
-
-                    # build PPO payload
-                    dob_for_ppo = member.get("date_of_birth") or dob
-                    ppo_payload = self._ppo_from_member_generic(member, dob_for_ppo)
-
-                    self.log("DEBUG PPO payload keys (patient): " + ", ".join(sorted(ppo_payload.keys())))
-                    self.log("> API: POST /gaprovider/api/dental-vob/ppo")
-                    ppo_resp = await client.post("/gaprovider/api/dental-vob/ppo", json=ppo_payload)
-                    if ppo_resp.status_code >= 400:
-                        last_err = (ppo_resp.status_code, ppo_resp.text[:400]); continue
-
-                    return {"selected_member": member, "ppo": ppo_resp.json(), "search_payload_used": body}, None
-
-                return None, last_err or (400, "Patient info search failed")
-
-        # -------- Member ID flow (unchanged; no group/division) --------
-        async def member_flow():
-            member_input = (self.member_id_var.get() or "").strip()
-            full_name = (self.full_name_var.get() or "").strip()
-            if not member_input:
-                return None, (400, "Member ID is required")
-
-            async with httpx.AsyncClient(base_url=base, headers=headers, timeout=30.0, follow_redirects=True) as client:
-                tries = [
-                    ("/gaprovider/api/multiple-patient/search", [{"member_id": member_input}]),
-                    ("/gaprovider/api/multiple-patient/search", [{"input_identifier": member_input}]),
-                    ("/gaprovider/api/multiple-patient/search", [{"identifier": member_input}]),
-                ]
-                last_err = None
-                ms_json = None
-
-                for path, payload in tries:
-                    self.log(f"> API TRY: POST {path} payload={json.dumps(payload)[:180]}")
-                    r = await client.post(path, json=payload)
-                    if r.status_code < 400:
-                        try:
-                            ms_json = r.json()
-                        except Exception:
-                            ms_json = None
-                        if isinstance(ms_json, dict) and ms_json.get("multiple_patient_search_res"):
-                            self.log("✓ Member search returned results.")
-                            break
-                        last_err = (200, "Unexpected/empty response")
-                        continue
-                    last_err = (r.status_code, r.text[:400])
-
-                if ms_json is None:
-                    return None, last_err or (400, "Member search failed")
-
-                member = self._pick_member_by_full_name(ms_json, full_name)
-                if not member:
-                    return None, (404, "Full Name not found in member-search results")
-
-                dob = member.get("date_of_birth") or member.get("dob") or ""
-                ppo_payload = self._ppo_from_member_generic(member, dob)
-
-                if not ppo_payload.get("group_policy_number"):
-                    return None, (400, "Group policy number missing in response; cannot call PPO")
-
-                self.log("DEBUG PPO payload keys (member): " + ", ".join(sorted(ppo_payload.keys())))
-                self.log("> API: POST /gaprovider/api/dental-vob/ppo")
-                p = await client.post("/gaprovider/api/dental-vob/ppo", json=ppo_payload)
-                if p.status_code >= 400:
-                    return None, (p.status_code, p.text[:400])
-                return {"selected_member": member, "ppo": p.json(), "member_search_json": ms_json}, None
-
-        # choose and run
+        headers = api_headers(await self._cookie_header())
         mode = self.search_mode_var.get()
-        if mode == "Member ID":
-            data, err = await member_flow()
-        else:
-            data, err = await patient_flow()
+
+        async def run_flow():
+            async with httpx.AsyncClient(base_url=BASE_URL, headers=headers, timeout=30.0, follow_redirects=True) as client:
+                if mode == "Member ID":
+                    return await member_flow(client, self.member_id_var.get(), self.full_name_var.get(), self.log)
+                return await patient_flow(client, self.patient_last_var.get(), self.patient_dob_var.get(),
+                                          self.patient_rel_var.get(), self.log)
+
+        data, err = await run_flow()
 
         # one-time cookie refresh for 401/403
         if (not data) and err and err[0] in (401, 403):
             try:
-                await self.page.goto("https://www.guardiananytime.com/gaprovider/home", wait_until="domcontentloaded")
+                await self.page.goto(self.HOME_URL, wait_until="domcontentloaded")
                 headers["Cookie"] = await self._cookie_header()
             except:
                 pass
-            if mode == "Member ID":
-                data, err = await member_flow()
-            else:
-                data, err = await patient_flow()
+            data, err = await run_flow()
 
         if data:
             self.eligibility_json = {"json": data, "timestamp": datetime.now().isoformat()}
@@ -0,0 +1,640 @@
+#!/usr/bin/env python3
+"""
+Guardian Anytime eligibility lookups without the Tk app
+
+patient_flow (last name + DOB + relationship) and member_flow (member ID + full name)
+run multiple-patient/search and then dental-vob/ppo on an httpx.AsyncClient that
+carries the portal session cookie. run_batch looks up many patients concurrently
+over one shared client, bounded by a semaphore, with per-patient latency.
+
+    python guardian_eligibility.py schedule.csv --output eligibility.json --concurrency 8
+    python guardian_eligibility.py schedule.csv --search-chunk-size 25   # 25 patients per search request
+
+The patient list is a CSV or JSON list with last_name, dob and relationship (patient
+info search) or member_id and full_name (member ID search) per row. The session comes
+from the storage state guardian_apifull_sumanth.py saves after login
+(~/.guardian_auth_state.json), or from a raw Cookie header in GUARDIAN_COOKIE. On a
+401/403 the CLI re-reads the storage state once (log in again in the app mid-batch);
+if that does not help the batch stops and asks for a new login.
+"""
+
+import argparse
+import asyncio
+import csv
+import json
+import logging
+import os
+import re
+import sys
+import time
+from datetime import datetime
+
+import httpx
+
+BASE_URL = "https://www.guardiananytime.com"
+SEARCH_PATH = "/gaprovider/api/multiple-patient/search"
+PPO_PATH = "/gaprovider/api/dental-vob/ppo"
+DEFAULT_AUTH_STATE = os.path.join(os.path.expanduser("~"), ".guardian_auth_state.json")
+LOGIN_AGAIN = "Session expired: log in again with guardian_apifull_sumanth.py (or set a fresh GUARDIAN_COOKIE)"
+
+logger = logging.getLogger(__name__)
+
+
+def _log(msg):
+    logger.info(msg)
+
+
+# ================== utils ==================
+def digits(s: str) -> str:
+    return re.sub(r"[^0-9]", "", s or "")
+
+
+def norm_name(s: str) -> str:
+    s = (s or "").upper().strip()
+    s = re.sub(r"[^A-Z ]+", "", s)
+    s = re.sub(r"\s+", " ", s)
+    return s
+
+
+def rel_code(rel_str: str) -> str:
+    m = {"self": "Self", "son": "S", "daughter": "D", "spouse": "SP"}
+    return m.get((rel_str or "").strip().lower(), rel_str or "Self")
+
+
+# ---- pickers ----
+def pick_member_by_dob(rows, dob: str, log=_log):
+    want = digits(dob)
+    for block in rows or []:
+        for member in block.get("member_dependent", []) or []:
+            if digits(member.get("date_of_birth", "")) == want:
+                log(f"✓ Found member: {member.get('first_name')} {member.get('last_name')} DOB: {member.get('date_of_birth')}")
+                return member
+    for r in rows or []:
+        if digits(r.get("date_of_birth", "")) == want:
+            return r
+    return None
+
+
+def iter_member_search_candidates(ms_json: dict):
+    if not isinstance(ms_json, dict):
+        return
+    for b in ms_json.get("multiple_patient_search_res") or []:
+        for m in b.get("member_dependent", []) or []:
+            yield m
+    for m in ms_json.get("member_dependent", []) or []:
+        yield m
+    if {"first_name", "last_name"} & set(ms_json.keys()):
+        yield ms_json
+
+
+def pick_member_by_full_name(ms_json: dict, full_name: str, log=_log):
+    want = norm_name(full_name)
+    best = None
+    count = 0
+    for c in iter_member_search_candidates(ms_json):
+        count += 1
+        fn = norm_name(c.get("first_name") or c.get("patient_first_name") or "")
+        ln = norm_name(c.get("last_name")  or c.get("patient_last_name")  or "")
+        name = (fn + " " + ln).strip()
+        if name == want:
+            log(f"✓ Exact match: {c.get('first_name')} {c.get('last_name')}")
+            return c
+        if not best and fn and ln:
+            best = c
+    log(f"DEBUG: candidates seen = {count}")
+    if best:
+        log(f"✓ Using best available: {best.get('first_name')} {best.get('last_name')}")
+    return best
+
+
+# ---- group/identifier helpers ----
+def extract_group_from_rows(rows):
+    # scan block-level and dependent-level for any plausible group key
+    keys = ("group_policy_number", "plan_group_number", "group_id")
+    for block in rows or []:
+        for k in keys:
+            v = block.get(k)
+            if v: return v
+        for m in block.get("member_dependent", []) or []:
+            for k in keys:
+                v = m.get(k)
+                if v: return v
+    return None
+
+
+def pool_fields_from_rows(rows):
+    pool = []
+    for block in rows or []:
+        for m in block.get("member_dependent", []) or []:
+            pool.append(m)
+    return pool
+
+
+def backfill_member_fields(member: dict, rows):
+    needed = {
+        "group_policy_number": None,
+        "identifier": None,
+        "first_name": None,
+        "last_name": None,
+        "relationship": None,
+        "date_of_birth": None,
+    }
+    pool = pool_fields_from_rows(rows)
+    ident = member.get("identifier") or member.get("member_id") or member.get("subscriber_id") or ""
+
+    for k in list(needed.keys()):
+        if member.get(k):
+            continue
+        match = None
+        if ident:
+            for c in pool:
+                if (c.get("identifier") == ident) or (c.get("member_id") == ident) or (c.get("subscriber_id") == ident):
+                    match = c; break
+        if not match:
+            for c in pool:
+                if (c.get("first_name") == member.get("first_name") and
+                    c.get("last_name")  == member.get("last_name")):
+                    match = c; break
+        if match and match.get(k):
+            member[k] = match.get(k)
+
+    # final try: pull group from any sibling if still missing
+    if not member.get("group_policy_number"):
+        g = extract_group_from_rows(rows)
+        if g: member["group_policy_number"] = g
+
+
+def extract_identifier_from_rows_or_member(rows, member):
+    ident = member.get("identifier") or member.get("member_id") or member.get("subscriber_id")
+    if ident:
+        return ident
+    # try block-level input_identifier from the same response
+    for block in rows or []:
+        if block.get("input_identifier"):
+            return block["input_identifier"]
+    return None
+
+
+async def enrich_group_by_identifier(client: httpx.AsyncClient, identifier: str, log=_log):
+    """
+    Try to re-query by identifier to fetch a record that includes group number.
+    """
+    tries = [
+        (SEARCH_PATH, [{"identifier": identifier}]),
+        (SEARCH_PATH, [{"input_identifier": identifier}]),
+    ]
+    for path, payload in tries:
+        log(f"ℹ️ Re-query for group via {path} using identifier")
+        r = await client.post(path, json=payload)
+        if r.status_code < 400:
+            try:
+                j = r.json()
+            except Exception:
+                continue
+            rows = j.get("multiple_patient_search_res") or []
+            g = extract_group_from_rows(rows)
+            if g:
+                return g, j
+    return None, None
+
+
+# ---- PPO payload ----
+def ppo_from_member_generic(member: dict, dob: str) -> dict:
+    payload = {
+        "group_policy_number": member.get("group_policy_number")
+                               or member.get("plan_group_number")
+                               or member.get("group_id")
+                               or "",
+        "patient_relation_to_member": member.get("relationship") or "",
+        "patient_identifier": member.get("identifier")
+                               or member.get("member_id")
+                               or member.get("subscriber_id")
+                               or "",
+        "patient_date_of_birth": dob,
+        "patient_first_name": member.get("first_name") or member.get("patient_first_name") or "",
+        "patient_last_name":  member.get("last_name")  or member.get("patient_last_name")  or "",
+    }
+    return {k: v for k, v in payload.items() if v}
+
+
+# ================== session ==================
+def api_headers(cookie_header: str) -> dict:
+    return {
+        "Accept": "application/json",
+        "Content-Type": "application/json",
+        "Origin": BASE_URL,
+        "Referer": f"{BASE_URL}/gaprovider/home",
+        "Cookie": cookie_header,
+        "User-Agent": "guardian-tk/1.0",
+    }
+
+
+def new_client(cookie_header: str, max_connections=None) -> httpx.AsyncClient:
+    """AsyncClient for the Guardian API; max_connections caps the shared pool (None: httpx default)"""
+    limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections) \
+        if max_connections else httpx.Limits()
+    return httpx.AsyncClient(base_url=BASE_URL, headers=api_headers(cookie_header), timeout=30.0,
+                             follow_redirects=True, limits=limits)
+
+
+def cookie_header_from_auth_state(path=DEFAULT_AUTH_STATE) -> str:
+    """Cookie header for guardiananytime.com from a Playwright storage_state file"""
+    with open(path, encoding="utf-8") as f:
+        state = json.load(f)
+    now = time.time()
+    cookies = [
+        c for c in state.get("cookies", [])
+        if c.get("domain", "").lstrip(".").endswith("guardiananytime.com") and (c.get("expires", -1) < 0 or c["expires"] > now)
+    ]
+    return "; ".join(f"{c['name']}={c['value']}" for c in cookies)
+
+
+def auth_state_refresher(path=DEFAULT_AUTH_STATE):
+    """refresh_cookies for run_batch: the Cookie header from the storage state file as it
+    is now (the Guardian app rewrites it after every login), else GUARDIAN_COOKIE"""
+    async def refresh_cookies():
+        if os.path.exists(path):
+            return cookie_header_from_auth_state(path)
+        return os.environ.get("GUARDIAN_COOKIE", "")
+    return refresh_cookies
+
+
+# ================== flows ==================
+async def patient_flow(client: httpx.AsyncClient, last_name: str, dob: str, rel_ui: str = "Self", log=_log):
+    """Patient info search, group enrichment, then PPO. Returns (data, None) or (None, (status, message))"""
+    last_name, dob, rel_ui = (last_name or "").strip(), (dob or "").strip(), (rel_ui or "Self").strip()
+
+    # try with UI relationship string, then code (S/D/SP/Self)
+    search_bodies = [
+        [patient_search_item(last_name, dob, rel_ui)],
+        [patient_search_item(last_name, dob, rel_code(rel_ui))],
+    ]
+
+    last_err = None
+    for body in search_bodies:
+        log(f"> API: POST {SEARCH_PATH} for {last_name}, {dob} (rel={body[0]['relationship']})")
+        resp = await client.post(SEARCH_PATH, json=body)
+        if resp.status_code >= 400:
+            last_err = (resp.status_code, resp.text[:400]); continue
+
+        data, last_err = await complete_patient(client, resp.json().get("multiple_patient_search_res") or [], dob, body, log)
+        if data:
+            return data, None
+
+    return None, last_err or (400, "Patient info search failed")
+
+
+def patient_search_item(last_name: str, dob: str, relationship: str) -> dict:
+    return {
+        "date_of_birth": dob,
+        "last_name": last_name,
+        "relationship": relationship,
+        "first_name": "",
+        "zip_code": ""
+    }
+
+
+async def complete_patient(client: httpx.AsyncClient, rows, dob: str, body, log=_log):
+    """Patient info lookup after the search: pick the member in `rows`, enrich the group, then PPO"""
+    member = pick_member_by_dob(rows, dob, log)
+    if not member:
+        return None, (404, "No dependent with that DOB")
+
+    # backfill from same result
+    backfill_member_fields(member, rows)
+
+    # derive group if still missing
+    if not member.get("group_policy_number"):
+        ident = extract_identifier_from_rows_or_member(rows, member)
+        if ident:
+            g, _ = await enrich_group_by_identifier(client, ident, log)
+            if g:
+                member["group_policy_number"] = g
+
+    # if still missing, try one more pull from rows (any dependent)
+    if not member.get("group_policy_number"):
+        g2 = extract_group_from_rows(rows)
+        if g2:
+            member["group_policy_number"] = g2
+
+    if not member.get("group_policy_number"):
+        return None, (400, "group_policy_number still missing after enrichment")
+
+    # build PPO payload
+    dob_for_ppo = member.get("date_of_birth") or dob
+    ppo_payload = ppo_from_member_generic(member, dob_for_ppo)
+
+    log("DEBUG PPO payload keys (patient): " + ", ".join(sorted(ppo_payload.keys())))
+    log(f"> API: POST {PPO_PATH}")
+    ppo_resp = await client.post(PPO_PATH, json=ppo_payload)
+    if ppo_resp.status_code >= 400:
+        return None, (ppo_resp.status_code, ppo_resp.text[:400])
+
+    return {"selected_member": member, "ppo": ppo_resp.json(), "search_payload_used": body}, None
+
+
+async def member_flow(client: httpx.AsyncClient, member_input: str, full_name: str, log=_log):
+    """Member ID search, full-name pick, then PPO. Returns (data, None) or (None, (status, message))"""
+    member_input, full_name = (member_input or "").strip(), (full_name or "").strip()
+    if not member_input:
+        return None, (400, "Member ID is required")
+
+    tries = [
+        (SEARCH_PATH, [{"member_id": member_input}]),
+        (SEARCH_PATH, [{"input_identifier": member_input}]),
+        (SEARCH_PATH, [{"identifier": member_input}]),
+    ]
+    last_err = None
+    ms_json = None
+
+    for path, payload in tries:
+        log(f"> API TRY: POST {path} payload={json.dumps(payload)[:180]}")
+        r = await client.post(path, json=payload)
+        if r.status_code < 400:
+            try:
+                ms_json = r.json()
+            except Exception:
+                ms_json = None
+            if isinstance(ms_json, dict) and ms_json.get("multiple_patient_search_res"):
+                log("✓ Member search returned results.")
+                break
+            last_err = (200, "Unexpected/empty response")
+            continue
+        last_err = (r.status_code, r.text[:400])
+
+    if ms_json is None:
+        return None, last_err or (400, "Member search failed")
+    return await complete_member(client, ms_json, full_name, log)
+
+
+async def complete_member(client: httpx.AsyncClient, ms_json: dict, full_name: str, log=_log):
+    """Member ID lookup after the search: pick the member by full name, then PPO"""
+    member = pick_member_by_full_name(ms_json, full_name, log)
+    if not member:
+        return None, (404, "Full Name not found in member-search results")
+
+    dob = member.get("date_of_birth") or member.get("dob") or ""
+    ppo_payload = ppo_from_member_generic(member, dob)
+
+    if not ppo_payload.get("group_policy_number"):
+        return None, (400, "Group policy number missing in response; cannot call PPO")
+
+    log("DEBUG PPO payload keys (member): " + ", ".join(sorted(ppo_payload.keys())))
+    log(f"> API: POST {PPO_PATH}")
+    p = await client.post(PPO_PATH, json=ppo_payload)
+    if p.status_code >= 400:
+        return None, (p.status_code, p.text[:400])
+    return {"selected_member": member, "ppo": p.json(), "member_search_json": ms_json}, None
+
+
+async def lookup(client: httpx.AsyncClient, patient: dict, log=_log, search_json=None):
+    """One patient dict: member_id (+ full_name) selects member_flow, otherwise
+    last_name/dob/relationship go to patient_flow
+
+    search_json: this patient's part of a batched search (search_chunk); the lookup
+    continues from it and only falls back to its own search requests if that fails"""
+    if search_json is not None:
+        if patient.get("member_id"):
+            data, err = await complete_member(client, search_json, (patient.get("full_name") or "").strip(), log)
+        else:
+            item = search_item(patient)
+            data, err = await complete_patient(client, search_json["multiple_patient_search_res"], item["date_of_birth"],
+                                               [item], log)
+        if data:
+            return data, None
+        log(f"> Batched search result not usable ({err[0]}): falling back to a single search")
+    if patient.get("member_id"):
+        return await member_flow(client, patient.get("member_id"), patient.get("full_name"), log)
+    return await patient_flow(client, patient.get("last_name"), patient.get("dob"),
+                              patient.get("relationship") or "Self", log)
+
+
+# ================== batched search ==================
+def search_item(patient: dict) -> dict:
+    """multiple-patient/search array item for one patient (the first form the single flows try)"""
+    if patient.get("member_id"):
+        return {"member_id": patient["member_id"].strip()}
+    return patient_search_item((patient.get("last_name") or "").strip(), (patient.get("dob") or "").strip(),
+                               (patient.get("relationship") or "Self").strip())
+
+
+def block_matches(block: dict, patient: dict) -> bool:
+    """Whether a multiple_patient_search_res block answers this patient's search item:
+    the same member ID, or a member with the same DOB and last name (a block without
+    last names is not a match - the patient falls back to its own search)"""
+    if patient.get("member_id"):
+        want = patient["member_id"].strip().upper()
+        idents = [block.get("input_identifier")] + [
+            m.get("identifier") or m.get("member_id") for m in block.get("member_dependent", []) or []
+        ]
+        return any((ident or "").strip().upper() == want for ident in idents)
+    want_dob, want_last = digits(patient.get("dob")), norm_name(patient.get("last_name"))
+    if not want_dob or not want_last:
+        return False
+    for m in (block.get("member_dependent", []) or []) + [block]:
+        last = norm_name(m.get("last_name") or m.get("patient_last_name") or "")
+        if digits(m.get("date_of_birth", "")) == want_dob and last == want_last:
+            return True
+    return False
+
+
+def demultiplex_search(chunk, blocks):
+    """Match the response blocks of one batched search back to its (position, patient)
+    inputs: the block at the same index when it fits, otherwise the first unused block that
+    does. A block that fits several inputs is used for none of them (they fall back to their
+    own search). Returns {position: search response holding only that patient's block}"""
+    fits = [[offset for offset, (_, patient) in enumerate(chunk) if block_matches(block, patient)]
+            if isinstance(block, dict) else [] for block in blocks]
+    matched, used = {}, set()
+    for offset, (position, patient) in enumerate(chunk):
+        order = ([offset] if offset < len(blocks) else []) + [i for i in range(len(blocks)) if i != offset]
+        for i in order:
+            if i not in used and fits[i] == [offset]:
+                matched[position] = {"multiple_patient_search_res": [blocks[i]]}
+                used.add(i)
+                break
+    return matched
+
+
+async def search_chunk(client: httpx.AsyncClient, chunk, log=_log):
+    """One multiple-patient/search request for a chunk of (position, patient); returns
+    demultiplex_search's {position: search response}, or {} when the request failed"""
+    body = [search_item(patient) for _, patient in chunk]
+    log(f"> API: POST {SEARCH_PATH} for {len(body)} patients (batched)")
+    try:
+        resp = await client.post(SEARCH_PATH, json=body)
+        if resp.status_code >= 400:
+            log(f"✗ Batched search failed ({resp.status_code}): {resp.text[:200]}")
+            return {}
+        blocks = resp.json().get("multiple_patient_search_res") or []
+    except Exception as e:
+        log(f"✗ Batched search failed: {e}")
+        return {}
+    matched = demultiplex_search(chunk, blocks)
+    if len(matched) < len(chunk):
+        log(f"ℹ️ Batched search matched {len(matched)}/{len(chunk)} patients; the rest search one at a time")
+    return matched
+
+
+# ================== batch ==================
+async def run_batch(patients, cookie_header: str, concurrency=8, log=_log, refresh_cookies=None,
+                    search_chunk_size=None):
+    """Look up every patient over one shared AsyncClient, at most `concurrency` at a time
+
+    refresh_cookies: optional coroutine function returning a fresh Cookie header; on a
+    401/403 the header is refreshed once for the whole batch and the patient retried.
+    Once the session is known dead (no refresher, no new cookie, or a 401/403 again)
+    the patients not yet started fail at once with LOGIN_AGAIN instead of each a 401.
+    search_chunk_size: pack up to this many patients into each multiple-patient/search
+    request first (patients it cannot answer fall back to their own search).
+    Returns a report with per-patient status and latency, in input order"""
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    refresh_lock = asyncio.Lock()
+    refreshed = []
+    session_expired = []
+    batch_start = time.perf_counter()
+    prefetched = {}
+    search_stats = None
+
+    async with new_client(cookie_header, max_connections=concurrency) as client:
+
+        if search_chunk_size and search_chunk_size > 1:
+            indexed = list(enumerate(patients))
+            chunks = [indexed[i:i + search_chunk_size] for i in range(0, len(indexed), search_chunk_size)]
+
+            async def run_chunk(chunk):
+                async with semaphore:
+                    prefetched.update(await search_chunk(client, chunk, log))
+
+            search_start = time.perf_counter()
+            await asyncio.gather(*(run_chunk(chunk) for chunk in chunks))
+            search_stats = {"chunk_size": search_chunk_size, "requests": len(chunks), "matched": len(prefetched),
+                            "seconds": round(time.perf_counter() - search_start, 3)}
+
+        async def refresh(stale_header):
+            async with refresh_lock:
+                # Only the first patient to hit the expired cookie refreshes it
+                if client.headers.get("Cookie") == stale_header and not refreshed:
+                    refreshed.append(time.time())
+                    try:
+                        fresh = await refresh_cookies()
+                    except Exception as e:
+                        log(f"✗ Could not refresh the session cookie: {e}")
+                        fresh = None
+                    if fresh:
+                        client.headers["Cookie"] = fresh
+                return client.headers.get("Cookie") != stale_header
+
+        def expire_session():
+            if not session_expired:
+                session_expired.append(time.time())
+                log(f"✗ {LOGIN_AGAIN}; skipping the remaining patients")
+
+        def auth_failed(data, err):
+            return not data and err and err[0] in (401, 403)
+
+        async def run_one(position, patient):
+            async with semaphore:
+                start = time.perf_counter()
+                result = {"position": position, "input": patient}
+                try:
+                    if session_expired:
+                        data, err = None, (401, LOGIN_AGAIN)
+                    else:
+                        header = client.headers.get("Cookie")
+                        data, err = await lookup(client, patient, log, prefetched.get(position))
+                        if auth_failed(data, err) and refresh_cookies and await refresh(header):
+                            data, err = await lookup(client, patient, log)
+                        if auth_failed(data, err):
+                            expire_session()
+                    if data:
+                        result.update(status="success", result=data)
+                    else:
+                        result.update(status="failed", error={"status": err[0], "message": err[1]})
+                except Exception as e:
+                    result.update(status="failed", error={"status": None, "message": str(e)})
+                result["seconds"] = round(time.perf_counter() - start, 3)
+                log(f"{'✓' if result['status'] == 'success' else '✗'} patient {position + 1}/{len(patients)} "
+                    f"in {result['seconds']}s")
+                return result
+
+        results = await asyncio.gather(*(run_one(position, patient) for position, patient in enumerate(patients)))
+
+    return batch_report(list(results), time.perf_counter() - batch_start, search_stats, bool(session_expired))
+
+
+def batch_report(results, total_seconds, search_stats=None, session_expired=False):
+    """search_stats: the batched search phase (per-patient seconds do not include it);
+    session_expired: the batch stopped on a dead session (see LOGIN_AGAIN)"""
+    succeeded = sum(1 for result in results if result["status"] == "success")
+    latencies = sorted(result["seconds"] for result in results)
+    return {
+        "batched_search": search_stats,
+        "session_expired": session_expired,
+        "patients": results,
+        "succeeded": succeeded,
+        "failed": len(results) - succeeded,
+        "total_seconds": round(total_seconds, 2),
+        "median_seconds": latencies[len(latencies) // 2] if latencies else 0.0,
+        "max_seconds": latencies[-1] if latencies else 0.0,
+        "patients_per_hour": round(len(results) * 3600 / total_seconds, 2) if total_seconds else 0.0,
+        "timestamp": datetime.now().isoformat(),
+    }
+
+
+def load_patients(path):
+    """Patient dicts from a CSV or JSON list (keys lower-cased, blank values dropped)"""
+    with open(path, encoding="utf-8") as f:
+        entries = json.load(f) if path.lower().endswith(".json") else list(csv.DictReader(f))
+    patients = []
+    for entry in entries:
+        patient = {key.strip().lower(): str(value).strip() for key, value in entry.items() if value not in (None, "")}
+        if patient.get("member_id") or (patient.get("last_name") and patient.get("dob")):
+            patients.append(patient)
+    return patients
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("patients", help="CSV or JSON file: last_name,dob,relationship or member_id,full_name")
+    parser.add_argument("--output", default="guardian_eligibility.json", help="Batch report with every result")
+    parser.add_argument("--concurrency", type=int, default=8, help="Lookups in flight at once")
+    parser.add_argument("--search-chunk-size", type=int, default=0,
+                        help="Patients per batched multiple-patient/search request (0: one search per patient)")
+    parser.add_argument("--auth-state", default=DEFAULT_AUTH_STATE,
+                        help="Playwright storage state saved by the Guardian app after login")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    patients = load_patients(args.patients)
+    if not patients:
+        print(f"No patients found in {args.patients}")
+        return 1
+
+    cookie_header = os.environ.get("GUARDIAN_COOKIE")
+    if not cookie_header:
+        if not os.path.exists(args.auth_state):
+            print(f"No session: log in with guardian_apifull_sumanth.py first ({args.auth_state}) or set GUARDIAN_COOKIE")
+            return 1
+        cookie_header = cookie_header_from_auth_state(args.auth_state)
+
+    report = asyncio.run(run_batch(patients, cookie_header, concurrency=args.concurrency,
+                                   refresh_cookies=auth_state_refresher(args.auth_state),
+                                   search_chunk_size=args.search_chunk_size))
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+
+    for result in report["patients"]:
+        status = "✓" if result["status"] == "success" else "✗"
+        who = result["input"].get("member_id") or f"{result['input'].get('last_name')} {result['input'].get('dob')}"
+        detail = "" if result["status"] == "success" else f"  {result['error']['status']}: {result['error']['message'][:80]}"
+        print(f"{status} {who:<30} {result['seconds']:>7.2f}s{detail}")
+    print(f"\n{report['succeeded']}/{len(report['patients'])} succeeded in {report['total_seconds']:.2f}s "
+          f"({report['patients_per_hour']:.1f} patients/hour); results saved to {args.output}")
+    if report["session_expired"]:
+        print(LOGIN_AGAIN)
+    return 0 if report["failed"] == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
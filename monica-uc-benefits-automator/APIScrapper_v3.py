@@ -1,21 +1,580 @@
 import requests
 import re
 import json
+import random
 import time
 from bs4 import BeautifulSoup
 from urllib.parse import urlencode, urlparse, parse_qs, unquote
 import logging
+import os
+import threading
+import weakref
+from html import unescape
+import xml.etree.ElementTree as ET
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from uc_records import ProcedureRecord, CategoryTableRow, to_json, to_plain
+from uc_store import PlanBenefitCache
+
+try:
+    import lxml  # noqa: F401 - optional, faster tree builder for BeautifulSoup
+    LXML_AVAILABLE = True
+except ImportError:
+    LXML_AVAILABLE = False
+
+# html.parser is the reference backend; lxml is opt-in (html_parser='lxml' or UC_HTML_PARSER=lxml)
+# once golden_parser_check.py shows identical output on your captures
+DEFAULT_HTML_PARSER = os.environ.get('UC_HTML_PARSER', 'html.parser')
+
+DEFAULT_SESSION_FILE = "uc_session.json"
+
+# How much extract_all_categories_data fetches
+LEVEL_SUMMARY = 1     # benefits summary only, no category requests
+LEVEL_CATEGORIES = 2  # plus each category table (covered, allowance, coverage, limitation, ...)
+LEVEL_FULL = 3        # plus every procedure's detail and More... expansions
+EXTRACTION_METHODS = {
+    LEVEL_SUMMARY: 'Benefits summary only',
+    LEVEL_CATEGORIES: 'All categories table extraction',
+    LEVEL_FULL: 'All categories comprehensive extraction'
+}
+
+# Typed progress for UIs, put on the scraper's progress= queue (queue.Queue or anything with put()).
+# kind is one of PROGRESS_EVENTS; data holds the fields listed for it
+ProgressEvent = namedtuple('ProgressEvent', ['kind', 'data', 'timestamp'])
+PROGRESS_EVENTS = {
+    'benefits_summary': ('sections',),
+    'category_started': ('index', 'total', 'name'),
+    'category_table': ('index', 'name', 'procedures'),
+    'procedure_started': ('code', 'name', 'index'),
+    'procedure_done': ('code', 'category', 'has_details'),
+    'category_done': ('index', 'name', 'procedures'),
+    'extraction_complete': ('categories', 'procedures', 'output_file'),
+    'extraction_cancelled': ('categories', 'procedures', 'output_file'),
+    'extraction_failed': ('error',)
+}
+
+
+class ExtractionCancelled(BaseException):
+    """Raised after the request in flight once the scraper's cancel_event is set
+
+    A BaseException (like asyncio.CancelledError) so the per-step `except Exception`
+    handlers let it through to the extraction, which saves the partial results"""
+
+
+class SessionExpired(Exception):
+    """The portal answered with a login page or an expired view and the session could not
+    be recovered in place. Stops the extraction (anything finished is checkpointed) so
+    extract_patients_batch can log back in and resume"""
+
+
+class JSFNavigationState:
+    """Tracks which view the portal's JSF server is on for one session, so resets and
+    page refreshes are only issued when a response shows the state actually diverged"""
+
+    BENEFITS = 'benefits'
+    PROCEDURE_DETAIL = 'procedure_detail'
+
+    # e.g. j_id_n8:j_id_n9:3:j_id_na  /  j_id_n8:j_id_n9:3:j_id_ni:7:j_id_nm
+    CATEGORY_ID_PATTERN = re.compile(r'^(.+:)\d+(:[^:]+)$')
+    DETAIL_ID_PATTERN = re.compile(r'^(.+:)\d+(:[^:]+:)\d+(:[^:]+)$')
 
-class UnitedConcordiaPortalScraper:
     def __init__(self):
+        self.view = self.BENEFITS
+        self.expanded_category = None
+        self.diverged = False
+
+        # Learned once per session; the defaults are the IDs seen in HAR analysis
+        self.category_id_template = "j_id_n8:j_id_n9:{cat}:j_id_na"
+        self.detail_id_template = "j_id_n8:j_id_n9:{cat}:j_id_ni:{idx}:j_id_nm"
+        self.back_button_id = "j_id_oo:j_id_op"
+        self.learned_category_ids = False
+        self.learned_detail_ids = False
+
+        # None until observed: can the server go from one procedure detail straight to the next?
+        self.detail_needs_reset = None
+
+        self.resets_issued = 0
+        self.resets_skipped = 0
+        self.refreshes_issued = 0
+        self.refreshes_skipped = 0
+
+    def learn_category_ids(self, category_sections):
+        """Learn the category table ID scheme from the parsed category list"""
+        if self.learned_category_ids or not category_sections:
+            return
+        match = self.CATEGORY_ID_PATTERN.match(category_sections[0]['jsf_id'])
+        if match:
+            self.category_id_template = f"{match.group(1)}{{cat}}{match.group(2)}"
+            self.learned_category_ids = True
+
+    def learn_detail_ids(self, basic_procedures):
+        """Learn the procedure detail link ID scheme from a parsed category table"""
+        if self.learned_detail_ids:
+            return
+        for proc_data in basic_procedures.values():
+            match = self.DETAIL_ID_PATTERN.match(proc_data.get('detail_jsf_id') or '')
+            if match:
+                self.detail_id_template = f"{match.group(1)}{{cat}}{match.group(2)}{{idx}}{match.group(3)}"
+                self.learned_detail_ids = True
+                return
+
+    def learn_back_button(self, back_button_id):
+        if back_button_id:
+            self.back_button_id = back_button_id
+
+    def category_jsf_id(self, category_index):
+        return self.category_id_template.format(cat=category_index)
+
+    def detail_jsf_id(self, category_index, row_index):
+        return self.detail_id_template.format(cat=category_index, idx=row_index)
+
+    def needs_reset_before_category(self):
+        """Category tables are only clickable from the benefits view"""
+        return self.view != self.BENEFITS or self.diverged
+
+    def needs_reset_before_detail(self):
+        """Reset between procedures only once the server has shown it needs it"""
+        return self.diverged or (self.view == self.PROCEDURE_DETAIL and self.detail_needs_reset is True)
+
+    def is_optimistic_detail(self):
+        """True when the next detail request skips a reset the server has not yet confirmed it tolerates"""
+        return self.view == self.PROCEDURE_DETAIL and self.detail_needs_reset is None
+
+    def on_category_expanded(self, category_index):
+        self.view = self.BENEFITS
+        self.expanded_category = category_index
+
+    def on_procedure_detail(self):
+        self.view = self.PROCEDURE_DETAIL
+
+    def on_benefits_view(self):
+        self.view = self.BENEFITS
+        self.diverged = False
+
+    def on_page_refreshed(self):
+        self.view = self.BENEFITS
+        self.expanded_category = None
+        self.diverged = False
+
+    def mark_diverged(self):
+        self.diverged = True
+
+    def summary(self):
+        return {
+            'resets_issued': self.resets_issued,
+            'resets_skipped': self.resets_skipped,
+            'refreshes_issued': self.refreshes_issued,
+            'refreshes_skipped': self.refreshes_skipped
+        }
+
+
+class RetryPolicy:
+    """How procedure detail requests are retried: jittered exponential backoff per failure kind
+
+    mismatch        - the portal answered with another procedure (reset and retry)
+    server_error    - HTTP 5xx/429 or a transport error (wait and resend)
+    session_expired - ViewExpired, or a login page instead of a partial response (recover and retry)
+    """
+
+    MISMATCH = 'mismatch'
+    SERVER_ERROR = 'server_error'
+    SESSION_EXPIRED = 'session_expired'
+    FATAL = 'fatal'
+
+    def __init__(self, max_attempts=3, base_delays=None, max_delay=30.0, jitter=0.5,
+                 breaker_threshold=5, breaker_cooldown=30.0):
+        self.max_attempts = max_attempts
+        self.base_delays = {self.MISMATCH: 0.5, self.SERVER_ERROR: 2.0, self.SESSION_EXPIRED: 0.0}
+        self.base_delays.update(base_delays or {})
+        self.max_delay = max_delay
+        self.jitter = jitter
+        self.breaker_threshold = breaker_threshold
+        self.breaker_cooldown = breaker_cooldown
+
+    def delay(self, kind, retry_number):
+        """Seconds to wait before retry `retry_number` (1-based) after a `kind` failure"""
+        delay = min(self.max_delay, self.base_delays.get(kind, 1.0) * (2 ** (retry_number - 1)))
+        return delay * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+    def new_circuit_breaker(self):
+        return CircuitBreaker(self.breaker_threshold, self.breaker_cooldown)
+
+
+class CircuitBreaker:
+    """Per-session breaker: after `failure_threshold` consecutive server errors the session
+    pauses for `cooldown` seconds. The first request after the pause is a probe - one more
+    failure opens the breaker again, a success closes it"""
+
+    def __init__(self, failure_threshold=5, cooldown=30.0):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.consecutive_failures = 0
+        self.open_until = 0.0
+        self.trips = 0
+
+    def pause_seconds(self):
+        return max(0.0, self.open_until - time.monotonic())
+
+    def record_success(self):
+        self.consecutive_failures = 0
+
+    def record_failure(self):
+        """Returns True when this failure opened the breaker"""
+        self.consecutive_failures += 1
+        if self.consecutive_failures < self.failure_threshold:
+            return False
+        self.open_until = time.monotonic() + self.cooldown
+        self.consecutive_failures = self.failure_threshold - 1
+        self.trips += 1
+        return True
+
+
+class RequestMetrics:
+    """Per-request instrumentation for one scraper session: action type (from the JSF
+    render/source of the POST), latency, response bytes and retry attempt"""
+
+    def __init__(self):
+        # Only the current patient's requests; see start_patient
+        self.records = []
+        self.member_id = None
+        # Set by the caller right before a retried request; consumed by the next record
+        self.pending_attempt = 0
+
+    @staticmethod
+    def classify(method, url, form):
+        render = form.get('javax.faces.partial.render', '')
+        if render:
+            if 'servicesGroup' in render:
+                return 'category_expansion'
+            if 'proc-related-procedures' in render:
+                return 'more_expansion'
+            if JSFNavigationState.DETAIL_ID_PATTERN.match(form.get('javax.faces.source', '')):
+                return 'procedure_detail'
+            return 'back_navigation'
+        if 'subscriber.xhtml' in url:
+            return 'benefits_page'
+        if 'index.xhtml' in url:
+            return 'patient_search' if method == 'POST' else 'portal_page'
+        return 'authentication'
+
+    def record(self, method, url, body, status_code, elapsed_seconds, size):
+        if isinstance(body, bytes):
+            body = body.decode('utf-8', 'replace')
+        form = {key: values[0] for key, values in parse_qs(body or '').items()}
+        self.records.append({
+            'timestamp': round(time.time(), 3),
+            'action': self.classify(method, url, form),
+            'method': method,
+            'status': status_code,
+            'latency_ms': round(elapsed_seconds * 1000, 1),
+            'bytes': size,
+            'attempt': self.pending_attempt
+        })
+        self.pending_attempt = 0
+
+    def start_patient(self, member_id):
+        """Open the next patient's window. Earlier records were already summarized (and
+        exported to metrics_file) with their patient, so a batch never holds more than one
+        patient's records"""
+        self.records = []
+        self.member_id = member_id
+
+    def patient_records(self):
+        return self.records
+
+    def merge(self, other):
+        """Fold a worker session's requests into this patient's window"""
+        self.records.extend(other.records)
+
+    @staticmethod
+    def summarize(records):
+        by_action = {}
+        for record in records:
+            stats = by_action.setdefault(record['action'], {'requests': 0, 'seconds': 0.0, 'max_ms': 0.0, 'bytes': 0, 'retries': 0})
+            stats['requests'] += 1
+            stats['seconds'] += record['latency_ms'] / 1000
+            stats['max_ms'] = max(stats['max_ms'], record['latency_ms'])
+            stats['bytes'] += record['bytes']
+            stats['retries'] += 1 if record['attempt'] else 0
+        for stats in by_action.values():
+            stats['avg_ms'] = round(stats['seconds'] * 1000 / stats['requests'], 1)
+            stats['seconds'] = round(stats['seconds'], 3)
+        return {
+            'total_requests': len(records),
+            'total_seconds': round(sum(record['latency_ms'] for record in records) / 1000, 3),
+            'total_bytes': sum(record['bytes'] for record in records),
+            'retries': sum(1 for record in records if record['attempt']),
+            'by_action': dict(sorted(by_action.items(), key=lambda item: -item[1]['seconds']))
+        }
+
+    def summary(self):
+        return self.summarize(self.patient_records())
+
+    def export_jsonl(self, path):
+        """Append this patient's request records to a JSON-lines file"""
+        with open(path, 'a', encoding='utf-8') as f:
+            for record in self.patient_records():
+                f.write(json.dumps({'member_id': self.member_id, **record}) + '\n')
+
+
+class ProcedureDetailMemo:
+    """Procedure detail fetched earlier in the same run, keyed by plan and procedure code
+
+    The same CDT code is listed in several category tables; later occurrences reuse the
+    first detail instead of requesting it again. Shared by a run's worker sessions"""
+
+    # Row data, not detail data - taken from the category table the procedure is listed in
+    ROW_FIELDS = ('procedure_code', 'procedure_name')
+
+    def __init__(self, plan_key=None):
+        self.plan_key = plan_key
+        self._details = {}
+        self._lock = threading.Lock()
+        self.reused = 0
+        self.requests_saved = 0
+
+    def get(self, procedure_code):
+        """Detail fields of an already fetched procedure (for _procedure_record), or None"""
+        with self._lock:
+            entry = self._details.get((self.plan_key, procedure_code))
+            if entry is None:
+                return None
+            self.reused += 1
+            self.requests_saved += entry[1]
+            return entry[0]
+
+    def put(self, procedure_code, record, requests):
+        """Remember a fetched record and how many requests fetching it took"""
+        detail = {key: value for key, value in record.items() if key not in self.ROW_FIELDS}
+        with self._lock:
+            self._details.setdefault((self.plan_key, procedure_code), (detail, requests))
+
+    def summary(self):
+        return {'duplicate_procedures_reused': self.reused, 'requests_saved': self.requests_saved}
+
+
+class PartialResponse:
+    """Decoded JSF <partial-response>: update-id -> payload, with the ViewState pulled out"""
+
+    def __init__(self, raw):
+        self.raw = raw
+        self.updates = {}       # update id -> CDATA payload, in document order
+        self.payloads = []      # every update/eval payload in document order
+        self.viewstate = None
+        self.error = None
+
+    @property
+    def first_payload(self):
+        return self.payloads[0] if self.payloads else None
+
+    def get(self, update_id, default=None):
+        return self.updates.get(update_id, default)
+
+
+# Only used when a response is not well-formed XML
+_PARTIAL_ELEMENT_PATTERN = re.compile(
+    r'<(update|eval)(?:\s+id="([^"]*)")?[^>]*>\s*<!\[CDATA\[(.*?)\]\]>\s*</\1>', re.DOTALL)
+
+
+def decode_partial_response(raw):
+    """Walk a JSF partial-response once and return a PartialResponse"""
+    decoded = PartialResponse(raw)
+
+    def add(element_id, payload):
+        if element_id and 'javax.faces.ViewState' in element_id:
+            decoded.viewstate = payload.strip()
+        if element_id:
+            decoded.updates[element_id] = payload
+        decoded.payloads.append(payload)
+
+    try:
+        root = ET.fromstring(raw.lstrip())
+    except ET.ParseError:
+        for match in _PARTIAL_ELEMENT_PATTERN.finditer(raw):
+            add(match.group(2), match.group(3))
+        return decoded
+
+    for element in root.iter():
+        if element.tag in ('update', 'eval') and element.text is not None:
+            add(element.get('id'), element.text)
+        elif element.tag == 'error':
+            decoded.error = {child.tag: (child.text or '').strip() for child in element}
+    return decoded
+
+
+def extract_element_html(html, tag, element_id):
+    """Slice every <tag id="element_id">...</tag> out of html without parsing the document.
+    Nested tags of the same name are balanced. Returns the fragments in document order"""
+    id_pattern = re.compile(r'<%s\b[^>]*\sid\s*=\s*["\']%s["\']' % (tag, re.escape(element_id)), re.IGNORECASE)
+    tag_pattern = re.compile(r'<(/?)%s\b[^>]*>' % tag, re.IGNORECASE)
+    fragments = []
+    position = 0
+    while True:
+        start_match = id_pattern.search(html, position)
+        if not start_match:
+            return fragments
+        depth = 0
+        for tag_match in tag_pattern.finditer(html, start_match.start()):
+            if tag_match.group(1):
+                depth -= 1
+            elif not tag_match.group(0).endswith('/>'):
+                depth += 1
+            if depth == 0:
+                fragments.append(html[start_match.start():tag_match.end()])
+                position = tag_match.end()
+                break
+        else:
+            # Unclosed element - the parser closes it at end of input, same as a full parse
+            fragments.append(html[start_match.start():])
+            return fragments
+
+
+class PageSnapshot:
+    """One fetched and parsed copy of a full portal page"""
+
+    def __init__(self, response, html_parser=DEFAULT_HTML_PARSER):
+        self.url = str(response.url)
+        self.status_code = response.status_code
+        self.text = response.text
+        self.soup = BeautifulSoup(response.text, html_parser)
+
+
+class ResultStream:
+    """NDJSON result stream writer shared by any number of scraper sessions. Writes hold one
+    lock per underlying file, so sessions given the same file (even each wrapping it
+    themselves) never interleave their lines"""
+
+    _file_locks = weakref.WeakKeyDictionary()
+    _file_locks_guard = threading.Lock()
+
+    def __init__(self, file):
+        self.file = file
+        with self._file_locks_guard:
+            self.lock = self._file_locks.setdefault(file, threading.Lock())
+
+    @classmethod
+    def wrap(cls, stream):
+        """A ResultStream for a text file object (None and ResultStreams are returned as is)"""
+        if stream is None or isinstance(stream, cls):
+            return stream
+        return cls(stream)
+
+    def write_line(self, line):
+        with self.lock:
+            self.file.write(line + "\n")
+            self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+class UnitedConcordiaPortalScraper:
+
+    SUBSCRIBER_URL = "https://www.unitedconcordia.com/tuctpi/subscriber.xhtml"
+
+    # Sections read from a procedure detail response, sliced out by the parse fast path
+    PROCEDURE_DETAIL_SECTIONS = (
+        ('table', 'procedureDetailInfoTable1'),
+        ('table', 'procedureDetailInfoTable2'),
+        ('div', 'proc-related-procedures'),
+        ('table', 'procedureServiceHistoryPanelList'),
+        ('div', 'policyDetails'),
+        ('div', 'proc-dictionary'),
+    )
+    BACK_BUTTON_PATTERN = re.compile(r'<a\b[^>]*>[^<]*Back to Benefits[^<]*</a>')
+    # Navigation buttons read straight from a detail response (pipelined parsing)
+    LINK_PATTERN = re.compile(r'<a\b([^>]*)>(.*?)</a>', re.IGNORECASE | re.DOTALL)
+    ONCLICK_PATTERN = re.compile(r'\sonclick\s*=\s*(?:"([^"]*)"|\'([^\']*)\')', re.IGNORECASE)
+    ONCLICK_TARGET_PATTERN = re.compile(r"getElementById\('([^']+)'\)")
+    # from_plan_cache of records completed from the plan cache. Service history is per patient and the
+    # snapshot on the benefits page may not list all of it, so every procedure's detail is still
+    # requested; only its More... expansion (plan-level related procedures) comes from the cache
+    PLAN_CACHE_RULE = {'rule': 'service_history_fetched', 'cached_fields': ['related_procedures']}
+    AJAX_HEADERS = {
+        'Content-Type': 'application/x-www-form-urlencoded; charset=UTF-8',
+        'X-Requested-With': 'XMLHttpRequest',
+        'Faces-Request': 'partial/ajax'
+    }
+
+    def __init__(self, html_parser=None, parse_fast_path=True, plan_cache=None, checkpoint=None, session_file=None,
+                 retry_policy=None, metrics_file=None, location_map=None, result_stream=None, pipeline_parse=False,
+                 procedure_dictionary=None, progress=None, cancel_event=None):
         self.session = requests.Session()
         self.base_url = "https://www.unitedconcordia.com/tuctpi/index.xhtml"
         self.login_url = "https://www.unitedconcordia.com"
         self.current_viewstate = None
         self.is_authenticated = False
+        self.nav_state = JSFNavigationState()
+
+        # Procedure detail retries; the breaker is per session so one degraded worker pauses alone
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.circuit_breaker = self.retry_policy.new_circuit_breaker()
+        self.retry_counts = {}
+
+        # Request timings, summarized per patient in the results and optionally appended to a JSONL file
+        self.metrics = RequestMetrics()
+        self.metrics_file = metrics_file
+
+        # BeautifulSoup tree builder (DEFAULT_HTML_PARSER unless given) and whether procedure/category
+        # responses are parsed from just the known table fragments instead of a full tree
+        self.html_parser = html_parser or DEFAULT_HTML_PARSER
+        self.parse_fast_path = parse_fast_path
+
+        # Pipelined mode: procedure detail responses are parsed on this thread while the next
+        # procedure's request is on the wire (the requests themselves stay strictly in order)
+        self.pipeline_parse = pipeline_parse
+        self._parse_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='uc-parse') if pipeline_parse else None
+
+        # Optional uc_store.PlanBenefitCache; _plan_context holds the current patient's lookup
+        self.plan_cache = plan_cache
+        self._plan_context = None
+
+        # Optional uc_store.ExtractionCheckpoint for resuming interrupted extractions;
+        # _checkpointed_categories holds the current patient's completed categories
+        self.checkpoint = checkpoint
+        self._checkpoint_key = None
+        self._checkpointed_categories = {}
+
+        # Optional uc_store.ProcedureLocationMap, filled from every category table of the current plan
+        self.location_map = location_map
+        self._location_plan_key = None
+
+        # Optional uc_store.ProcedureDictionary: CDT entries are stored once and referenced by code
+        self.procedure_dictionary = procedure_dictionary
+
+        # Optional text file object (or ResultStream) receiving results as NDJSON events while they
+        # are extracted; sessions given the same file share its write lock
+        self.result_stream = ResultStream.wrap(result_stream)
+        self._streamed_procedures = set()
+
+        # Optional queue receiving ProgressEvents (category/procedure started and done, counts)
+        self.progress = progress
+
+        # Optional threading.Event used as a cancellation token: once set, the next response
+        # raises ExtractionCancelled and the run saves what it has. _run_entries holds the
+        # run's categories so far (without procedure_count while still being extracted)
+        self.cancel_event = cancel_event
+        self._run_entries = {}
+
+        # Level of the extraction in progress (LEVEL_SUMMARY/LEVEL_CATEGORIES/LEVEL_FULL)
+        self._extraction_level = LEVEL_FULL
+
+        # ProcedureDetailMemo of the run in progress (procedure detail runs only)
+        self.detail_memo = None
+
+        # Cached subscriber.xhtml page, dropped whenever a POST changes server state
+        self._page_snapshot = None
         
         self.stored_username = None
         self.stored_password = None
+
+        # Cookie jar + portal URL saved after login, reused by the next run while still valid
+        self.session_file = session_file
+
+        # Patient of the current search, needed to open extra worker sessions
+        self.current_member_id = None
+        self.current_dob = None
         
         self.scraped_data = {
             'members': [],
@@ -33,9 +592,137 @@ class UnitedConcordiaPortalScraper:
             'Connection': 'keep-alive'
         })
         
+        self.session.hooks['response'].append(self._invalidate_snapshot_on_post)
+        self.session.hooks['response'].append(self._record_request_metrics)
+        self.session.hooks['response'].append(self._check_cancelled)
+
         logging.basicConfig(level=logging.INFO)
         self.logger = logging.getLogger(__name__)
 
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """Release the HTTP connections and the pipelined-parse thread"""
+        if self._parse_executor is not None:
+            self._parse_executor.shutdown(wait=True)
+        self.session.close()
+
+    def _invalidate_snapshot_on_post(self, response, *args, **kwargs):
+        """Session response hook: any POST may change the server-side view"""
+        if response.request is not None and response.request.method == 'POST':
+            self._page_snapshot = None
+
+    def _record_request_metrics(self, response, *args, **kwargs):
+        """Session response hook: latency here is time to response headers (requests' elapsed)"""
+        request = response.request
+        self.metrics.record(request.method, request.url, request.body, response.status_code,
+                            response.elapsed.total_seconds(), len(response.content))
+
+    def _check_cancelled(self, *args, **kwargs):
+        """Session response hook (and check between steps): abort once cancel_event is set"""
+        if self.cancel_event is not None and self.cancel_event.is_set():
+            raise ExtractionCancelled()
+
+    def _pause(self, seconds):
+        """time.sleep that ends early with ExtractionCancelled when the run is cancelled"""
+        if self.cancel_event is None:
+            time.sleep(seconds)
+            return
+        self.cancel_event.wait(seconds)
+        self._check_cancelled()
+
+    def _soup(self, markup):
+        return BeautifulSoup(markup, self.html_parser)
+
+    def _detail_fragment_soup(self, html_content, skip_dictionary=False):
+        """Parse only the known procedure detail sections (fast path)"""
+        fragments = []
+        for tag, element_id in self.PROCEDURE_DETAIL_SECTIONS:
+            if skip_dictionary and element_id == 'proc-dictionary':
+                continue
+            fragments.extend(extract_element_html(html_content, tag, element_id))
+        back_match = self.BACK_BUTTON_PATTERN.search(html_content)
+        if back_match:
+            fragments.append(back_match.group(0))
+        return self._soup(''.join(fragments))
+
+    def _emit(self, event, **data):
+        """Write one NDJSON event to result_stream (no-op without one)"""
+        if not self.result_stream:
+            return
+        line = json.dumps({'event': event, 'member_id': self.current_member_id,
+                           'timestamp': round(time.time(), 3), **data}, ensure_ascii=False, default=to_json)
+        self.result_stream.write_line(line)
+
+    def _progress(self, kind, **data):
+        """Put one ProgressEvent on the progress queue (no-op without one)"""
+        if self.progress is not None:
+            self.progress.put(ProgressEvent(kind, data, time.time()))
+
+    def _publish_benefits_summary(self, benefits_summary):
+        self._emit('benefits_summary', benefits_summary=benefits_summary or {})
+        self._progress('benefits_summary', sections=len(benefits_summary or {}))
+
+    def _publish_failure(self, error):
+        self._emit('complete', status='failed', error=str(error))
+        self._progress('extraction_failed', error=str(error))
+
+    def _stream_procedure(self, category_name, category_index, unique_key, record):
+        if self.result_stream:
+            self._streamed_procedures.add((category_index, unique_key))
+            self._emit('procedure', category=category_name, category_index=category_index, key=unique_key,
+                       record=record)
+
+    def _category_done(self, category_index, category_name, entry):
+        """Stream a finished category (records not streamed yet, then category_complete); returns (name, entry)"""
+        self._run_entries[category_index] = (category_name, entry)
+        self._progress('category_done', index=category_index, name=category_name, procedures=entry['procedure_count'])
+        if self.result_stream:
+            for unique_key, record in entry['procedures'].items():
+                if (category_index, unique_key) not in self._streamed_procedures:
+                    self._stream_procedure(category_name, category_index, unique_key, record)
+            self._emit('category_complete', category=category_name, category_index=category_index,
+                       procedure_count=entry['procedure_count'])
+        return category_name, entry
+
+    def invalidate_page_snapshot(self):
+        self._page_snapshot = None
+
+    def _jsf_ajax_payload(self, form_name, source, render, behavior_event='action'):
+        """Form data for a JSF AJAX click on `source` with the current ViewState"""
+        return {
+            f"{form_name}_SUBMIT": "1",
+            "javax.faces.ViewState": self.current_viewstate,
+            "javax.faces.behavior.event": behavior_event,
+            "javax.faces.partial.event": "click",
+            "javax.faces.source": source,
+            "javax.faces.partial.ajax": "true",
+            "javax.faces.partial.execute": source,
+            "javax.faces.partial.render": render,
+            form_name: form_name
+        }
+
+    def _apply_viewstate(self, decoded):
+        """Adopt the ViewState from a decoded partial response; returns True if it had one"""
+        if decoded.viewstate:
+            self.current_viewstate = decoded.viewstate
+            return True
+        return False
+
+    def get_subscriber_page(self):
+        """Return the subscriber.xhtml snapshot, fetching and parsing it only once until
+        the next POST. A non-200 response is returned but not cached"""
+        if self._page_snapshot is None:
+            snapshot = PageSnapshot(self.session.get(self.SUBSCRIBER_URL), self.html_parser)
+            if snapshot.status_code != 200:
+                return snapshot
+            self._page_snapshot = snapshot
+        return self._page_snapshot
+
     def save_debug_html(self, content, filename):
         """Save HTML content for debugging"""
         try:
@@ -49,76 +736,43 @@ class UnitedConcordiaPortalScraper:
         """Save JSON data for debugging"""
         try:
             with open(filename, 'w', encoding='utf-8') as f:
-                json.dump(data, f, indent=2)
+                json.dump(data, f, indent=2, default=to_json)
             self.logger.info(f"Debug JSON saved to {filename}")
         except Exception as e:
             self.logger.error(f"Failed to save debug JSON: {e}")
 
-    def authenticate(self, username, password):
-        """Handle OAuth authentication process"""
+    def authenticate(self, username, password, reuse_session=True):
+        """Handle OAuth authentication process
+
+        With a session_file, a saved session that still reaches the portal is reused
+        and the OAuth/OAM login is skipped"""
         try:
-            self.logger.info("Starting OAuth authentication process...")
-            
             self.stored_username = username
             self.stored_password = password
+
+            if reuse_session and self.restore_session(username):
+                return True
+
+            self.logger.info("Starting OAuth authentication process...")
             
             login_response = self.session.get('https://www.unitedconcordia.com/login', allow_redirects=True)
             if login_response.status_code != 200:
                 raise Exception(f"Failed to access OAuth page: {login_response.status_code}")
             
-            self.logger.info(f"Redirected to: {login_response.url}")
-            
-            soup = BeautifulSoup(login_response.text, 'html.parser')
-            enc_form = soup.find('input', {'name': 'enc_post_data'})
-            if not enc_form:
-                raise Exception("OAuth consent form not found")
-            
-            oauth_form = enc_form.find_parent('form')
-            if not oauth_form:
-                raise Exception("OAuth parent form not found")
-            
-            form_action = oauth_form.get('action')
-            enc_data = enc_form.get('value', '')
+            form_action, consent_data = self._oauth_consent_submission(login_response)
             
             self.logger.info("Submitting OAuth consent...")
             
             consent_response = self.session.post(
                 form_action,
-                data={'enc_post_data': enc_data},
+                data=consent_data,
                 allow_redirects=True
             )
             
             if consent_response.status_code != 200:
                 raise Exception(f"OAuth consent failed: {consent_response.status_code}")
             
-            self.logger.info(f"After consent: {consent_response.url}")
-            
-            parsed_url = urlparse(consent_response.url)
-            url_params = parse_qs(parsed_url.query)
-            
-            bmctx = url_params.get('bmctx', [''])[0]
-            challenge_url = url_params.get('challenge_url', [''])[0]
-            request_id = url_params.get('request_id', [''])[0]
-            resource_url = url_params.get('resource_url', [''])[0]
-            
-            if not challenge_url or not bmctx:
-                raise Exception("Missing challenge_url or bmctx in OAuth response")
-            
-            challenge_url_decoded = unquote(challenge_url)
-            
-            self.logger.info(f"Submitting credentials to: {challenge_url_decoded}")
-            
-            auth_data = {
-                'username': username,
-                'password': password,
-                'bmctx': bmctx,
-                'request_id': request_id,
-                'challenge_url': challenge_url,
-                'resource_url': resource_url,
-                'authn_try_count': '0',
-                'locale': 'en_US',
-                'contextType': 'external'
-            }
+            challenge_url_decoded, auth_data = self._credential_submission(consent_response, username, password)
             
             login_response = self.session.post(
                 challenge_url_decoded,
@@ -132,6 +786,7 @@ class UnitedConcordiaPortalScraper:
             if self._verify_login_success(login_response):
                 self.is_authenticated = True
                 self.logger.info("OAuth login successful")
+                self.save_session()
                 return True
             else:
                 # Login failed
@@ -141,10 +796,134 @@ class UnitedConcordiaPortalScraper:
             self.logger.error(f"OAuth authentication failed: {e}")
             raise
 
+    def _oauth_consent_submission(self, login_response):
+        """Return (form_action, form data) for the OAuth consent form on the login page"""
+        self.logger.info(f"Redirected to: {login_response.url}")
+        
+        soup = self._soup(login_response.text)
+        enc_form = soup.find('input', {'name': 'enc_post_data'})
+        if not enc_form:
+            raise Exception("OAuth consent form not found")
+        
+        oauth_form = enc_form.find_parent('form')
+        if not oauth_form:
+            raise Exception("OAuth parent form not found")
+        
+        return oauth_form.get('action'), {'enc_post_data': enc_form.get('value', '')}
+
+    def _credential_submission(self, consent_response, username, password):
+        """Return (challenge URL, form data) for the credential POST after OAuth consent"""
+        self.logger.info(f"After consent: {consent_response.url}")
+        
+        parsed_url = urlparse(str(consent_response.url))
+        url_params = parse_qs(parsed_url.query)
+        
+        bmctx = url_params.get('bmctx', [''])[0]
+        challenge_url = url_params.get('challenge_url', [''])[0]
+        request_id = url_params.get('request_id', [''])[0]
+        resource_url = url_params.get('resource_url', [''])[0]
+        
+        if not challenge_url or not bmctx:
+            raise Exception("Missing challenge_url or bmctx in OAuth response")
+        
+        challenge_url_decoded = unquote(challenge_url)
+        
+        self.logger.info(f"Submitting credentials to: {challenge_url_decoded}")
+        
+        auth_data = {
+            'username': username,
+            'password': password,
+            'bmctx': bmctx,
+            'request_id': request_id,
+            'challenge_url': challenge_url,
+            'resource_url': resource_url,
+            'authn_try_count': '0',
+            'locale': 'en_US',
+            'contextType': 'external'
+        }
+        return challenge_url_decoded, auth_data
+
+    def save_session(self):
+        """Write the cookie jar and portal URL to session_file (owner-only permissions)"""
+        if not self.session_file:
+            return
+        try:
+            state = {
+                'username': self.stored_username,
+                'base_url': self.base_url,
+                'saved_at': time.time(),
+                'cookies': [
+                    {
+                        'name': cookie.name,
+                        'value': cookie.value,
+                        'domain': cookie.domain,
+                        'path': cookie.path,
+                        'secure': cookie.secure,
+                        'expires': cookie.expires,
+                        'rest': cookie._rest
+                    }
+                    for cookie in self._cookie_jar()
+                ]
+            }
+            fd = os.open(self.session_file, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(state, f)
+            os.chmod(self.session_file, 0o600)
+            self.logger.info(f"Session saved to {self.session_file}")
+        except Exception as e:
+            self.logger.warning(f"Failed to save session: {e}")
+
+    def restore_session(self, username):
+        """Load a saved session for this username and keep it only if the portal still accepts it"""
+        if not (self.session_file and os.path.exists(self.session_file)):
+            return False
+        try:
+            if not self._load_saved_session(username):
+                return False
+
+            if self.is_session_valid():
+                return self._accept_saved_session()
+
+            self.logger.info("Saved session expired - logging in again")
+        except Exception as e:
+            self.logger.warning(f"Failed to restore session: {e}")
+
+        self._discard_saved_session()
+        return False
+
+    def _cookie_jar(self):
+        return self.session.cookies
+
+    def _load_saved_session(self, username):
+        """Put the saved cookies and portal URL in place; False if the file is for another user"""
+        with open(self.session_file, encoding='utf-8') as f:
+            state = json.load(f)
+        if state.get('username') != username:
+            return False
+
+        jar = self._cookie_jar()
+        for cookie in state.get('cookies', []):
+            jar.set_cookie(requests.cookies.create_cookie(
+                cookie['name'], cookie['value'],
+                domain=cookie['domain'], path=cookie['path'], secure=cookie['secure'],
+                expires=cookie['expires'], rest=cookie['rest']
+            ))
+        self.base_url = state.get('base_url') or self.base_url
+        return True
+
+    def _accept_saved_session(self):
+        self.is_authenticated = True
+        self.logger.info(f"Reusing saved session from {self.session_file} - login skipped")
+        return True
+
+    def _discard_saved_session(self):
+        self._cookie_jar().clear()
+        self.base_url = "https://www.unitedconcordia.com/tuctpi/index.xhtml"
+
     def _verify_login_success(self, response):
         """Verify if OAuth login was successful"""
         success_url_patterns = ['tuctpi', 'mypatients', 'benefits', 'portal', 'dashboard']
-        current_url = response.url.lower()
+        current_url = str(response.url).lower()
         
         for pattern in success_url_patterns:
             if pattern in current_url:
@@ -179,6 +958,7 @@ class UnitedConcordiaPortalScraper:
                         if self._is_benefits_portal_page(response.text):
                             self.base_url = url
                             self.logger.info(f"SUCCESS: Direct portal access successful")
+                            self.save_session()
                             return True
                     
                     elif response.status_code in [301, 302, 303, 307, 308]:
@@ -193,6 +973,7 @@ class UnitedConcordiaPortalScraper:
                             if 'oam' in redirect_url.lower() or 'cdsso' in redirect_url.lower():
                                 self.logger.info(f"Detected OAM authentication challenge")
                                 if self._handle_oam_authentication(redirect_url):
+                                    self.save_session()
                                     return True
                         
                 except Exception as e:
@@ -296,57 +1077,60 @@ class UnitedConcordiaPortalScraper:
             self.logger.error(f"OAM authentication handling failed: {e}")
             return False
 
+    def _oam_credential_submissions(self, oam_url):
+        """(endpoint, form data) pairs to try, in order, for a direct OAM credential POST"""
+        parsed_oam = urlparse(oam_url)
+        oam_base = f"{parsed_oam.scheme}://{parsed_oam.netloc}"
+        
+        oam_auth_endpoints = [
+            f"{oam_base}/oam/server/auth_cred_submit",
+            f"{oam_base}/oam/server/obrareq.cgi",
+            parsed_oam.geturl()
+        ]
+        
+        credential_formats = [
+            {
+                'username': self.stored_username,
+                'password': self.stored_password,
+                'request_id': '',
+                'authn_try_count': '0',
+                'contextType': 'external',
+                'locale': 'en_US'
+            },
+            {
+                'user': self.stored_username,
+                'password': self.stored_password
+            }
+        ]
+        
+        return [(endpoint, creds) for endpoint in oam_auth_endpoints for creds in credential_formats]
+
     def _try_direct_oam_post(self, oam_url):
         """Try direct POST to OAM endpoint with credentials"""
         try:
             self.logger.info("Attempting direct OAM credential submission...")
             
-            parsed_oam = urlparse(oam_url)
-            oam_base = f"{parsed_oam.scheme}://{parsed_oam.netloc}"
-            
-            oam_auth_endpoints = [
-                f"{oam_base}/oam/server/auth_cred_submit",
-                f"{oam_base}/oam/server/obrareq.cgi",
-                parsed_oam.geturl()
-            ]
-            
-            credential_formats = [
-                {
-                    'username': self.stored_username,
-                    'password': self.stored_password,
-                    'request_id': '',
-                    'authn_try_count': '0',
-                    'contextType': 'external',
-                    'locale': 'en_US'
-                },
-                {
-                    'user': self.stored_username,
-                    'password': self.stored_password
-                }
-            ]
-            
-            for endpoint in oam_auth_endpoints:
-                for creds in credential_formats:
-                    try:
-                        self.logger.info(f"Trying direct OAM POST: {endpoint}")
-                        
-                        response = self.session.post(
-                            endpoint,
-                            data=creds,
-                            allow_redirects=True,
-                            headers={'Content-Type': 'application/x-www-form-urlencoded'}
-                        )
-                        
-                        if response.status_code == 200:
-                            
-                            if self._is_benefits_portal_page(response.text):
-                                self.base_url = response.url
-                                self.logger.info(f"SUCCESS: Direct OAM POST successful")
-                                return True
+            for endpoint, creds in self._oam_credential_submissions(oam_url):
+                try:
+                    self.logger.info(f"Trying direct OAM POST: {endpoint}")
+                    
+                    response = self.session.post(
+                        endpoint,
+                        data=creds,
+                        allow_redirects=True,
+                        headers={'Content-Type': 'application/x-www-form-urlencoded'}
+                    )
+                    
+                    if response.status_code == 200:
                         
-                    except Exception as e:
-                        self.logger.debug(f"Direct OAM POST failed: {e}")
-                        continue
+                        if self._is_benefits_portal_page(response.text):
+                            self.base_url = response.url
+                            self.logger.info(f"SUCCESS: Direct OAM POST successful")
+                            return True
+                    
+                except Exception as e:
+                    self.logger.debug(f"Direct OAM POST failed: {e}")
+                    continue
             
             return False
             
@@ -361,6 +1145,10 @@ class UnitedConcordiaPortalScraper:
                 raise Exception("Must be authenticated before searching")
             
             self.logger.info(f"Searching for patient: {member_id}")
+
+            self.current_member_id = member_id
+            self.current_dob = dob
+            self.metrics.start_patient(member_id)
             
             response = self.session.get(self.base_url)
             if response.status_code != 200:
@@ -371,7 +1159,7 @@ class UnitedConcordiaPortalScraper:
             if not self._is_benefits_portal_page(response.text):
                 raise Exception("Not on the benefits portal page")
             
-            soup = BeautifulSoup(response.text, 'html.parser')
+            soup = self._soup(response.text)
             return self._submit_search_form(soup, member_id, dob)
                 
         except Exception as e:
@@ -380,6 +1168,11 @@ class UnitedConcordiaPortalScraper:
 
     def _submit_search_form(self, soup, member_id, dob):
         """Find and submit the search form"""
+        form_action, search_data = self._search_submission(soup, member_id, dob)
+        return self._perform_search_submission(form_action, search_data)
+
+    def _search_submission(self, soup, member_id, dob):
+        """Return (form_action, form data) for the patient search form on the portal page"""
         search_form = soup.find('form', {'id': 'search'})
         
         if search_form:
@@ -390,12 +1183,11 @@ class UnitedConcordiaPortalScraper:
             
             if member_field and dob_field:
                 self.logger.info(f"Found specific search fields: member={member_field.get('name')}, dob={dob_field.get('name')}")
-                return self._perform_search_submission(search_form, member_field, dob_field, member_id, dob)
+                return self._build_search_submission(search_form, member_field, dob_field, member_id, dob)
         
         raise Exception("Could not find suitable search form")
 
-    def _perform_search_submission(self, form, member_field, dob_field, member_id, dob):
-        """Perform the actual search form submission"""
+    def _build_search_submission(self, form, member_field, dob_field, member_id, dob):
         search_data = {}
         
         search_data[member_field.get('name')] = member_id
@@ -417,7 +1209,10 @@ class UnitedConcordiaPortalScraper:
         if not form_action.startswith('http'):
             parsed_base = urlparse(self.base_url)
             form_action = f"{parsed_base.scheme}://{parsed_base.netloc}{form_action}"
-        
+        return form_action, search_data
+
+    def _perform_search_submission(self, form_action, search_data):
+        """Perform the actual search form submission"""
         self.logger.info(f"Submitting search to: {form_action}")
         search_response = self.session.post(form_action, data=search_data)
         
@@ -443,35 +1238,181 @@ class UnitedConcordiaPortalScraper:
         
         return found_indicators >= 2
 
+    def is_session_valid(self):
+        """Cheap probe: does the portal page still load without an OAM/login redirect?"""
+        try:
+            response = self.session.get(self.base_url, allow_redirects=False)
+            return response.status_code == 200 and self._is_benefits_portal_page(response.text)
+        except Exception as e:
+            self.logger.warning(f"Session probe failed: {e}")
+            return False
+
+    def reauthenticate(self):
+        """Start a clean login with the stored credentials (e.g. after the OAM session expired)"""
+        if not self.stored_username:
+            raise Exception("No stored credentials to re-authenticate with")
+        self._reset_login_state()
+        self.authenticate(self.stored_username, self.stored_password, reuse_session=False)
+        if not self.navigate_to_benefits_portal():
+            raise Exception("Failed to navigate to benefits portal after re-authentication")
+        return True
+
+    def _reset_login_state(self):
+        self.logger.info("Session expired - re-authenticating...")
+        self._cookie_jar().clear()
+        self.is_authenticated = False
+        self.current_viewstate = None
+        self.nav_state.on_page_refreshed()
+        self.invalidate_page_snapshot()
+        self.base_url = "https://www.unitedconcordia.com/tuctpi/index.xhtml"
+
+    def extract_patients_batch(self, patients, output_dir='.', workers=1, level=LEVEL_FULL, procedure_codes=None):
+        """Extract several patients on this one authenticated session
+
+        patients: iterable of (member_id, dob). Re-authenticates only when the portal
+        session has expired. Each patient is saved to <output_dir>/<member_id>_<dob>.json
+        at the given extraction level, or with only procedure_codes when given; returns a
+        report with per-patient timing and throughput"""
+        if not self.is_authenticated:
+            raise Exception("Must be authenticated before running a batch")
+
+        os.makedirs(output_dir, exist_ok=True)
+        batch_start = time.time()
+        report = []
+
+        for position, (member_id, dob) in enumerate(patients, 1):
+            patient_start = time.time()
+            result = self._batch_patient_result(position, member_id, dob, output_dir)
+            output_file = result['output_file']
+
+            try:
+                results = None
+                for attempt in range(2):
+                    # A new login is only paid for when the session turns out to be gone
+                    if attempt > 0:
+                        self.reauthenticate()
+                        result['reauthenticated'] = True
+
+                    try:
+                        found = self.search_patient(member_id, dob)
+                    except Exception:
+                        if attempt == 0 and not self.is_session_valid():
+                            continue
+                        raise
+                    if not found:
+                        raise Exception("Patient not found")
+
+                    self.nav_state = JSFNavigationState()
+                    try:
+                        if procedure_codes:
+                            results = self.extract_procedure_codes(procedure_codes, output_file=output_file)
+                        else:
+                            results = self.extract_all_categories_data(workers=workers, output_file=output_file,
+                                                                       level=level)
+                    except SessionExpired as e:
+                        # Expired mid-extraction: log back in and let the checkpoint resume the rest
+                        if attempt == 0:
+                            self.logger.warning(f"{e} - logging in again to resume")
+                            continue
+                        raise
+                    # Failed categories can also mean the session went away between requests
+                    if attempt == 0 and self._batch_incomplete(results) and not self.is_session_valid():
+                        continue
+                    break
+
+                self._complete_batch_result(result, results)
+            except ExtractionCancelled:
+                result.update({'status': 'cancelled', 'output_file': None})
+            except Exception as e:
+                self.logger.error(f"Batch patient {member_id} failed: {e}")
+                result.update({'status': 'failed', 'error': str(e), 'output_file': None})
+
+            result['seconds'] = round(time.time() - patient_start, 2)
+            report.append(result)
+            self.logger.info(f"Batch patient {member_id}: {result['status']} in {result['seconds']}s")
+            if result['status'] == 'cancelled':
+                break
+
+        return self._batch_report(report, time.time() - batch_start)
+
+    def _batch_patient_result(self, position, member_id, dob, output_dir):
+        self.logger.info(f"\n{'#'*60}")
+        self.logger.info(f"Batch patient {position}: {member_id}")
+        self.logger.info(f"{'#'*60}")
+        output_file = os.path.join(output_dir, f"{member_id}_{re.sub(r'[^0-9]', '', dob)}.json")
+        return {'member_id': member_id, 'dob': dob, 'output_file': output_file, 'reauthenticated': False}
+
+    @staticmethod
+    def _batch_incomplete(results):
+        if not results:
+            return True
+        summary = results['extraction_summary']
+        return bool(summary.get('failed_categories')) and not summary.get('cancelled')
+
+    def _complete_batch_result(self, result, results):
+        if not results:
+            raise Exception("Extraction failed")
+        summary = results['extraction_summary']
+        failed_categories = summary.get('failed_categories') or []
+        if summary.get('cancelled'):
+            status = 'cancelled'
+        elif failed_categories:
+            # Saved, but some categories are missing - not counted as a success
+            status = 'incomplete'
+            result['error'] = f"{len(failed_categories)} categories failed: {', '.join(failed_categories)}"
+        else:
+            status = 'success'
+        result.update({
+            'status': status,
+            'categories': summary['total_categories_processed'],
+            'procedures': summary['total_procedures_extracted'],
+            'requests': results['request_metrics']['total_requests']
+        })
+
+    @staticmethod
+    def _batch_report(report, total_seconds):
+        succeeded = sum(1 for result in report if result['status'] == 'success')
+        return {
+            'patients': report,
+            'succeeded': succeeded,
+            'failed': len(report) - succeeded,
+            'total_seconds': round(total_seconds, 2),
+            'patients_per_hour': round(len(report) * 3600 / total_seconds, 2) if total_seconds else 0.0
+        }
+
     def extract_viewstate_from_current_page(self):
         """Extract ViewState from current benefits page"""
         try:
-            response = self.session.get("https://www.unitedconcordia.com/tuctpi/subscriber.xhtml")
-            if response.status_code != 200:
-                self.logger.error(f"Could not access current page: {response.status_code}")
-                return None
-                
-            soup = BeautifulSoup(response.text, 'html.parser')
-            viewstate_input = soup.find('input', {'name': 'javax.faces.ViewState'})
-            if viewstate_input:
-                self.current_viewstate = viewstate_input.get('value', '')
-                self.logger.info(f"Extracted ViewState: {self.current_viewstate[:50]}...")
-                return self.current_viewstate
-            else:
-                self.logger.warning("ViewState not found")
-                return None
+            return self._viewstate_from_page(self.get_subscriber_page())
         except Exception as e:
             self.logger.error(f"Failed to extract ViewState: {e}")
             return None
+
+    def _viewstate_from_page(self, page):
+        if page.status_code != 200:
+            self.logger.error(f"Could not access current page: {page.status_code}")
+            return None
+            
+        viewstate_input = page.soup.find('input', {'name': 'javax.faces.ViewState'})
+        if viewstate_input:
+            self.current_viewstate = viewstate_input.get('value', '')
+            self.logger.info(f"Extracted ViewState: {self.current_viewstate[:50]}...")
+            return self.current_viewstate
+        else:
+            self.logger.warning("ViewState not found")
+            return None
     
     ##Getting details from table here
     def _parse_category_procedures(self, xml_response, category_name):
-        """Parse procedure data from category expansion response"""
+        """Parse procedure data from category expansion response (raw text or PartialResponse)"""
         try:
             procedures = {}
 
-            # Extract ALL CDATA content (there can be multiple sections)
-            cdata_matches = re.findall(r'<!\[CDATA\[(.*?)\]\]>', xml_response, re.DOTALL)
+            if not isinstance(xml_response, PartialResponse):
+                xml_response = decode_partial_response(xml_response)
+
+            # ALL CDATA content (there can be multiple sections)
+            cdata_matches = xml_response.payloads
             if not cdata_matches:
                 self.logger.warning(f"No CDATA sections found for {category_name}")
                 return procedures
@@ -482,7 +1423,14 @@ class UnitedConcordiaPortalScraper:
             # Important: The response contains multiple tables with same ID, but only the visible one has the data we want
             procedure_table = None
             for i, cdata_content in enumerate(cdata_matches):
-                soup = BeautifulSoup(cdata_content, 'html.parser')
+                if self.parse_fast_path:
+                    # Only the procedure tables matter - skip other sections without parsing them
+                    table_fragments = extract_element_html(cdata_content, 'table', 'benefitDetailAllServiceProceduresList')
+                    if not table_fragments:
+                        continue
+                    soup = self._soup(''.join(table_fragments))
+                else:
+                    soup = self._soup(cdata_content)
                 # Find ALL tables with this ID
                 all_tables = soup.find_all('table', {'id': 'benefitDetailAllServiceProceduresList'})
 
@@ -501,7 +1449,7 @@ class UnitedConcordiaPortalScraper:
                 self.logger.warning(f"No visible procedure table found in any CDATA section for {category_name}")
                 # Save response for debugging
                 debug_filename = f"category_expansion_{category_name.replace(' ', '_')}_response.xml"
-                self.save_debug_html(xml_response, debug_filename)
+                self.save_debug_html(xml_response.raw, debug_filename)
                 self.logger.info(f"Saved category expansion response to {debug_filename} for inspection")
                 return procedures
             
@@ -566,155 +1514,157 @@ class UnitedConcordiaPortalScraper:
             self.logger.info("Extracting benefits summary data...")
 
             # Get the current benefits page HTML
-            response = self.session.get("https://www.unitedconcordia.com/tuctpi/subscriber.xhtml")
-            if response.status_code != 200:
-                self.logger.error(f"Could not access benefits page: {response.status_code}")
+            page = self.get_subscriber_page()
+            if page.status_code != 200:
+                self.logger.error(f"Could not access benefits page: {page.status_code}")
                 return None
 
-            soup = BeautifulSoup(response.text, 'html.parser')
-
-            summary_data = {}
-
-            # === NETWORK AND GROUP INFORMATION ===
-            network_data = {}
+            return self.parse_benefits_summary(page.soup)
 
-            # Your Network
-            your_network_div = soup.find('div', id='your-network-individual-network')
-            if your_network_div:
-                network_data['Your Network'] = your_network_div.get_text(strip=True)
-
-            # Group Network
-            group_network_div = soup.find('div', id='policy-info-group-network')
-            if group_network_div:
-                network_data['Group Network'] = group_network_div.get_text(strip=True)
-
-            # Group / ID, Timely Filing, Policyholder, Claims Address (using flexible pattern matching)
-            for div in soup.find_all('div', class_='verticalLine'):
-                # Use newline as separator to properly split after <br> tags
-                text = div.get_text(separator='\n')
-
-                if 'Group / ID' in text:
-                    # Find the line containing "Group / ID" and get the next line
-                    lines = text.split('\n')
-                    for i, line in enumerate(lines):
-                        if 'Group / ID' in line:
-                            if i + 1 < len(lines):
-                                network_data['Group / ID'] = lines[i + 1].strip()
-                            break
+        except Exception as e:
+            self.logger.error(f"Failed to extract benefits summary: {e}")
+            import traceback
+            self.logger.error(traceback.format_exc())
+            return None
 
-                if 'Timely Filing' in text:
-                    # Find the line containing "Timely Filing" and get the next line
-                    lines = text.split('\n')
-                    for i, line in enumerate(lines):
-                        if 'Timely Filing' in line:
-                            if i + 1 < len(lines):
-                                network_data['Timely Filing'] = lines[i + 1].strip()
-                            break
+    def parse_benefits_summary(self, soup):
+        """Parse the summary sections out of a parsed benefits page"""
+        summary_data = {}
+
+        # === NETWORK AND GROUP INFORMATION ===
+        network_data = {}
+
+        # Your Network
+        your_network_div = soup.find('div', id='your-network-individual-network')
+        if your_network_div:
+            network_data['Your Network'] = your_network_div.get_text(strip=True)
+
+        # Group Network
+        group_network_div = soup.find('div', id='policy-info-group-network')
+        if group_network_div:
+            network_data['Group Network'] = group_network_div.get_text(strip=True)
+
+        # Group / ID, Timely Filing, Policyholder, Claims Address (using flexible pattern matching)
+        for div in soup.find_all('div', class_='verticalLine'):
+            # Use newline as separator to properly split after <br> tags
+            text = div.get_text(separator='\n')
+
+            if 'Group / ID' in text:
+                # Find the line containing "Group / ID" and get the next line
+                lines = text.split('\n')
+                for i, line in enumerate(lines):
+                    if 'Group / ID' in line:
+                        if i + 1 < len(lines):
+                            network_data['Group / ID'] = lines[i + 1].strip()
+                        break
 
-                if 'Policyholder' in text:
-                    # Find the line containing "Policyholder" and get the next line(s) until "Claims Address"
-                    lines = text.split('\n')
-                    for i, line in enumerate(lines):
-                        if 'Policyholder' in line:
-                            if i + 1 < len(lines):
-                                # Get all lines until we hit "Claims Address" or end
-                                policyholder_lines = []
-                                j = i + 1
-                                while j < len(lines) and 'Claims Address' not in lines[j]:
-                                    if lines[j].strip():
-                                        policyholder_lines.append(lines[j].strip())
-                                    j += 1
-                                network_data['Policyholder'] = ' '.join(policyholder_lines)
-                            break
+            if 'Timely Filing' in text:
+                # Find the line containing "Timely Filing" and get the next line
+                lines = text.split('\n')
+                for i, line in enumerate(lines):
+                    if 'Timely Filing' in line:
+                        if i + 1 < len(lines):
+                            network_data['Timely Filing'] = lines[i + 1].strip()
+                        break
 
-                if 'Claims Address' in text:
-                    # Find the line containing "Claims Address" and get the next line(s)
-                    lines = text.split('\n')
-                    for i, line in enumerate(lines):
-                        if 'Claims Address' in line:
-                            if i + 1 < len(lines):
-                                # Collect all remaining non-empty lines as address
-                                address_lines = []
-                                j = i + 1
-                                while j < len(lines):
-                                    if lines[j].strip():
-                                        address_lines.append(lines[j].strip())
-                                    j += 1
-                                network_data['Claims Address'] = '\n'.join(address_lines)
-                            break
+            if 'Policyholder' in text:
+                # Find the line containing "Policyholder" and get the next line(s) until "Claims Address"
+                lines = text.split('\n')
+                for i, line in enumerate(lines):
+                    if 'Policyholder' in line:
+                        if i + 1 < len(lines):
+                            # Get all lines until we hit "Claims Address" or end
+                            policyholder_lines = []
+                            j = i + 1
+                            while j < len(lines) and 'Claims Address' not in lines[j]:
+                                if lines[j].strip():
+                                    policyholder_lines.append(lines[j].strip())
+                                j += 1
+                            network_data['Policyholder'] = ' '.join(policyholder_lines)
+                        break
 
-            if network_data:
-                summary_data['Network and Group Information'] = network_data
+            if 'Claims Address' in text:
+                # Find the line containing "Claims Address" and get the next line(s)
+                lines = text.split('\n')
+                for i, line in enumerate(lines):
+                    if 'Claims Address' in line:
+                        if i + 1 < len(lines):
+                            # Collect all remaining non-empty lines as address
+                            address_lines = []
+                            j = i + 1
+                            while j < len(lines):
+                                if lines[j].strip():
+                                    address_lines.append(lines[j].strip())
+                                j += 1
+                            network_data['Claims Address'] = '\n'.join(address_lines)
+                        break
 
-            # === PATIENT/MEMBER INFORMATION ===
-            patient_data = {}
+        if network_data:
+            summary_data['Network and Group Information'] = network_data
 
-            # Find member information table
-            member_info_div = soup.find('div', class_='member-information')
-            if member_info_div:
-                # Extract table data (Member ID, DOB, Age, Relationship, Other Active Insurance)
-                table = member_info_div.find('table')
-                if table:
-                    rows = table.find_all('tr')
-                    for row in rows:
-                        cells = row.find_all('td')
-                        if len(cells) >= 2:
-                            key = cells[0].get_text(strip=True)
-                            value = cells[1].get_text(strip=True).replace('\n', ' ')
-                            if key:
-                                patient_data[key] = value
-
-            # Extract additional fields (Coverage Effective, Member has a qualified medical condition) from the main page
-            # These are NOT inside member-information div
-            for span in soup.find_all('span', class_='text-muted'):
-                text = span.get_text(strip=True)
-                if text in ['Coverage Effective', 'Member has a qualified medical condition reported?']:
-                    # The structure is: div.col-xs-12 > span + div.row > div (value)
-                    # The div.row is a CHILD of the parent, not a sibling
-                    parent = span.parent
-                    if parent:
-                        # Find the div.row that's a child of the parent
-                        row_div = parent.find('div', class_='row')
-                        if row_div:
-                            # Get the value from the div inside the row
-                            value_div = row_div.find('div')
-                            if value_div:
-                                value = value_div.get_text(separator=' ', strip=True).split('|')[0].strip()
-                                if value and text:
-                                    patient_data[text] = value
-
-            if patient_data:
-                summary_data['Patient Information'] = patient_data
-
-            # === POLICY INFORMATION (Deductibles, Coordination, etc.) ===
-            # Find Policy Information tables
-            policy_tables = soup.find_all('table', {'aria-label': True})
-            for table in policy_tables:
-                table_name = table.get('aria-label')
-                if table_name and ('Deductibles' in table_name or 'Coordination' in table_name or 'Benefits' in table_name):
-                    table_data = self._extract_table_data(table)
-                    if table_data:
-                        summary_data[f"Policy - {table_name}"] = table_data
-
-            # === SERVICE HISTORY ===
-            # Look for service history snapshot table
-            for table in soup.find_all('table'):
-                # Check if table contains service history headers
-                headers = [th.get_text(strip=True) for th in table.find_all('th')]
-                if any('Date' in h or 'Service' in h or 'Procedure' in h for h in headers):
-                    table_data = self._extract_table_data(table)
-                    if table_data and len(table_data) > 0:
-                        # Check if it's the service history table (not procedure list)
-                        if 'Service History' not in summary_data and any('Tooth' in str(headers) or 'Surface' in str(headers) for _ in [1]):
-                            summary_data['Service History Snapshot'] = table_data
-
-            return summary_data
+        # === PATIENT/MEMBER INFORMATION ===
+        patient_data = {}
 
-        except Exception as e:
-            self.logger.error(f"Failed to extract benefits summary: {e}")
-            import traceback
-            self.logger.error(traceback.format_exc())
-            return None
+        # Find member information table
+        member_info_div = soup.find('div', class_='member-information')
+        if member_info_div:
+            # Extract table data (Member ID, DOB, Age, Relationship, Other Active Insurance)
+            table = member_info_div.find('table')
+            if table:
+                rows = table.find_all('tr')
+                for row in rows:
+                    cells = row.find_all('td')
+                    if len(cells) >= 2:
+                        key = cells[0].get_text(strip=True)
+                        value = cells[1].get_text(strip=True).replace('\n', ' ')
+                        if key:
+                            patient_data[key] = value
+
+        # Extract additional fields (Coverage Effective, Member has a qualified medical condition) from the main page
+        # These are NOT inside member-information div
+        for span in soup.find_all('span', class_='text-muted'):
+            text = span.get_text(strip=True)
+            if text in ['Coverage Effective', 'Member has a qualified medical condition reported?']:
+                # The structure is: div.col-xs-12 > span + div.row > div (value)
+                # The div.row is a CHILD of the parent, not a sibling
+                parent = span.parent
+                if parent:
+                    # Find the div.row that's a child of the parent
+                    row_div = parent.find('div', class_='row')
+                    if row_div:
+                        # Get the value from the div inside the row
+                        value_div = row_div.find('div')
+                        if value_div:
+                            value = value_div.get_text(separator=' ', strip=True).split('|')[0].strip()
+                            if value and text:
+                                patient_data[text] = value
+
+        if patient_data:
+            summary_data['Patient Information'] = patient_data
+
+        # === POLICY INFORMATION (Deductibles, Coordination, etc.) ===
+        # Find Policy Information tables
+        policy_tables = soup.find_all('table', {'aria-label': True})
+        for table in policy_tables:
+            table_name = table.get('aria-label')
+            if table_name and ('Deductibles' in table_name or 'Coordination' in table_name or 'Benefits' in table_name):
+                table_data = self._extract_table_data(table)
+                if table_data:
+                    summary_data[f"Policy - {table_name}"] = table_data
+
+        # === SERVICE HISTORY ===
+        # Look for service history snapshot table
+        for table in soup.find_all('table'):
+            # Check if table contains service history headers
+            headers = [th.get_text(strip=True) for th in table.find_all('th')]
+            if any('Date' in h or 'Service' in h or 'Procedure' in h for h in headers):
+                table_data = self._extract_table_data(table)
+                if table_data and len(table_data) > 0:
+                    # Check if it's the service history table (not procedure list)
+                    if 'Service History' not in summary_data and any('Tooth' in str(headers) or 'Surface' in str(headers) for _ in [1]):
+                        summary_data['Service History Snapshot'] = table_data
+
+        return summary_data
 
     def _extract_table_data(self, table):
         """Extract all data from a table (flexible structure)"""
@@ -786,129 +1736,831 @@ class UnitedConcordiaPortalScraper:
                     })
         return category_sections
 
-    def extract_all_categories_data(self):
-        """Extract comprehensive procedure data for ALL categories"""
+    def extract_all_categories_data(self, workers=1, output_file='mypatientbenefitssummary.json', level=LEVEL_FULL):
+        """Extract comprehensive procedure data for ALL categories
+
+        workers > 1 opens that many independent portal sessions (each with its own
+        ViewState) and splits the categories across them.
+        level: LEVEL_SUMMARY (benefits summary only), LEVEL_CATEGORIES (plus category
+        tables, one request per category) or LEVEL_FULL (plus procedure details)
+        With a cancel_event, setting it stops the run after the request in flight and saves
+        the partial results (extraction_summary.cancelled). Raises SessionExpired when the
+        login expires mid-run and cannot be recovered"""
+        benefits_summary, category_sections = None, []
         try:
             self.logger.info("=== EXTRACTING ALL CATEGORIES DATA ===")
+            self._begin_level(level)
+            self._start_checkpoint()
 
             # STEP 1: Extract benefits summary data FIRST (before expanding any categories)
             self.logger.info("STEP 1: Extracting benefits summary (Network, Patient Info, Service History, Policy Info)...")
             benefits_summary = self.extract_benefits_summary()
+            self._check_cancelled()
             if benefits_summary:
                 self.logger.info(f"✓ Extracted {len(benefits_summary)} summary sections")
             else:
                 self.logger.warning("⚠ Could not extract benefits summary")
+            self._publish_benefits_summary(benefits_summary)
+
+            if level == LEVEL_SUMMARY:
+                return self._summary_only_results(self.get_subscriber_page(), benefits_summary, output_file)
 
             # Get current ViewState
             if not self.extract_viewstate_from_current_page():
                 raise Exception("Could not extract ViewState")
 
-            # Get the main benefits page to find all category sections
-            response = self.session.get("https://www.unitedconcordia.com/tuctpi/subscriber.xhtml")
-            if response.status_code != 200:
-                raise Exception(f"Could not access benefits page: {response.status_code}")
+            # Get the main benefits page to find all category sections (same snapshot as above)
+            page = self.get_subscriber_page()
+            if page.status_code != 200:
+                raise Exception(f"Could not access benefits page: {page.status_code}")
+
+            category_sections = self._prepare_category_run(page, benefits_summary)
 
-            soup = BeautifulSoup(response.text, 'html.parser')
+            # Process each category - organize procedures by category
+            if workers > 1 and len(category_sections) > 1:
+                category_entries = self._extract_categories_parallel(category_sections, workers)
+            else:
+                category_entries = {}
+                for category_index, category in enumerate(category_sections):
+                    category_entries[category_index] = self._extract_category_entry(
+                        category_index, category, len(category_sections)
+                    )
+
+            return self._finish_extraction(benefits_summary, category_sections, category_entries, output_file)
+
+        except ExtractionCancelled:
+            return self._finish_cancelled(benefits_summary, category_sections, output_file)
+        except SessionExpired as e:
+            self.logger.error(f"All categories extraction stopped: {e}")
+            self._publish_failure(e)
+            raise
+        except Exception as e:
+            self.logger.error(f"All categories extraction failed: {e}")
+            self._publish_failure(e)
+            return None
 
-            # Find all procedure category sections using helper function
-            category_sections = self._find_category_sections(soup)
+    def extract_procedure_codes(self, procedure_codes, output_file='mypatientbenefitssummary.json'):
+        """Extract full procedure data for just the given CDT codes
 
-            self.logger.info(f"Found {len(category_sections)} categories to process")
+        Only categories listing a requested code are expanded and only those rows get a
+        detail request. With a location_map, the categories known to hold the codes on this
+        plan are expanded directly, and only categories not mapped yet are searched for the rest"""
+        benefits_summary, category_sections = None, []
+        try:
+            self.logger.info("=== EXTRACTING REQUESTED PROCEDURE CODES ===")
+            requested = self._begin_targeted_run(procedure_codes)
 
-            # TESTING MODE: Only process first 2 categories to test benefits_summary extraction
-            # Set to None to process all categories
-            TEST_MODE_MAX_CATEGORIES = None
+            benefits_summary = self.extract_benefits_summary()
+            self._check_cancelled()
+            self._publish_benefits_summary(benefits_summary)
+            if not self.extract_viewstate_from_current_page():
+                raise Exception("Could not extract ViewState")
 
-            if TEST_MODE_MAX_CATEGORIES:
-                category_sections = category_sections[:TEST_MODE_MAX_CATEGORIES]
-                self.logger.info(f"⚠ TEST MODE: Only processing first {TEST_MODE_MAX_CATEGORIES} categories")
+            page = self.get_subscriber_page()
+            if page.status_code != 200:
+                raise Exception(f"Could not access benefits page: {page.status_code}")
 
-            # Process each category - organize procedures by category
-            procedures_by_category = {}
-            total_processed = 0
-
-            for category_index, category in enumerate(category_sections):
-                self.logger.info(f"\n{'='*60}")
-                self.logger.info(f"Processing category {category_index + 1}/{len(category_sections)}: '{category['name']}'")
-                self.logger.info(f"{'='*60}")
-
-                # CRITICAL: Reset view state before processing each new category (except the first)
-                # This ensures we're at the benefits view, not stuck on a procedure detail page
-                if category_index > 0:
-                    self.logger.info(f"Resetting to benefits view before processing category '{category['name']}'")
-                    self._click_back_to_benefits_view()
-                    # Removed sleep - API call provides natural delay
-
-                    # IMPORTANT: After reset, refresh the category info from the current page
-                    # because JSF IDs may have changed
-                    self.logger.info(f"Refreshing category list after reset")
-                    response = self.session.get("https://www.unitedconcordia.com/tuctpi/subscriber.xhtml")
-                    if response.status_code == 200:
-                        soup = BeautifulSoup(response.text, 'html.parser')
-                        category_sections = self._find_category_sections(soup)
-                        if category_index < len(category_sections):
-                            category = category_sections[category_index]
-                            self.logger.info(f"Updated JSF ID for '{category['name']}': {category['jsf_id']}")
-
-                # Extract data for this category - pass the category info directly
-                category_result = self.extract_single_category_data(
-                    target_category_index=category_index,
-                    category_info=category
+            category_sections, located, unmapped = self._prepare_targeted_run(page, benefits_summary, requested)
+            remaining = set(requested)
+            category_entries = {}
+            for category_index in self._targeted_category_order(located, unmapped, remaining):
+                name, entry = self._extract_category_entry(
+                    category_index, category_sections[category_index], len(category_sections), only_codes=set(remaining)
                 )
+                category_entries[category_index] = (name, entry)
+                remaining -= {record['procedure_code'] for record in entry['procedures'].values()}
 
-                if category_result and category_result.get('procedures'):
-                    category_procedures = category_result['procedures']
-                    # Store procedures under category name
-                    procedures_by_category[category['name']] = {
-                        'category_index': category_index,
-                        'procedure_count': len(category_procedures),
-                        'procedures': category_procedures
-                    }
-                    total_processed += len(category_procedures)
-                    self.logger.info(f"✓ Category '{category['name']}' complete: {len(category_procedures)} procedures")
-                else:
-                    self.logger.warning(f"✗ No procedures found in category '{category['name']}'")
-                    # Still add the category with empty procedures
-                    procedures_by_category[category['name']] = {
-                        'category_index': category_index,
-                        'procedure_count': 0,
-                        'procedures': {}
-                    }
+            return self._finish_targeted_extraction(benefits_summary, category_sections, category_entries,
+                                                    requested, remaining, output_file)
 
-                # No sleep needed between categories - each has many API calls already
-
-            # Create final comprehensive results
-            final_results = {
-                'benefits_summary': benefits_summary or {},  # Summary data from default page
-                'extraction_summary': {
-                    'total_categories_processed': len(category_sections),
-                    'total_procedures_extracted': total_processed,
-                    'categories': [cat['name'] for cat in category_sections],
-                    'extraction_method': 'All categories comprehensive extraction',
-                    'extraction_date': time.strftime('%Y-%m-%d %H:%M:%S')
-                },
-                'procedures_by_category': procedures_by_category
-            }
+        except ExtractionCancelled:
+            return self._finish_cancelled(benefits_summary, category_sections, output_file)
+        except SessionExpired as e:
+            self.logger.error(f"Targeted extraction stopped: {e}")
+            self._publish_failure(e)
+            raise
+        except Exception as e:
+            self.logger.error(f"Targeted extraction failed: {e}")
+            self._publish_failure(e)
+            return None
+
+    def _begin_targeted_run(self, procedure_codes):
+        requested = {code.strip().upper() for code in procedure_codes if code and code.strip()}
+        if not requested:
+            raise ValueError("No procedure codes requested")
+        self._extraction_level = LEVEL_FULL
+        self._checkpoint_key = None
+        self._checkpointed_categories = {}
+        self._streamed_procedures = set()
+        self._run_entries = {}
+        self.detail_memo = None
+        self.logger.info(f"Requested {len(requested)} procedure codes")
+        return requested
+
+    def _prepare_targeted_run(self, page, benefits_summary, requested):
+        """Find the categories on the benefits page and, from the location map, which of them
+        list the requested codes. Returns (category_sections, {category_index: codes},
+        indices of categories the map has no entries for)"""
+        category_sections = self._find_category_sections(page.soup)
+        self.nav_state.on_page_refreshed()
+        self.nav_state.learn_category_ids(category_sections)
+        self._plan_context = None
+        self._location_plan_key = self.location_map.plan_key(benefits_summary) if self.location_map else None
+        self._start_detail_memo(benefits_summary)
+
+        known = self.location_map.get(self._location_plan_key) if self._location_plan_key else {}
+        # Locations from before a change to the plan's category list are ignored
+        mapped = {
+            category_index
+            for locations in known.values() for category_index, category_name in locations
+            if category_index < len(category_sections) and category_sections[category_index]['name'] == category_name
+        }
+        located = {}
+        for code in requested:
+            for category_index, _ in known.get(code, []):
+                if category_index in mapped:
+                    located.setdefault(category_index, set()).add(code)
+                    break
+        unmapped = [category_index for category_index in range(len(category_sections)) if category_index not in mapped]
+
+        self.logger.info(f"Found {len(category_sections)} categories ({len(mapped)} mapped); location map placed "
+                         f"{sum(len(codes) for codes in located.values())}/{len(requested)} requested codes "
+                         f"in {len(located)} categories")
+        return category_sections, located, unmapped
+
+    @staticmethod
+    def _targeted_category_order(located, unmapped, remaining):
+        """Yield the categories to expand: located ones still holding a missing code first,
+        then unmapped ones in page order for as long as any code is missing"""
+        for category_index in sorted(located):
+            if located[category_index] & remaining:
+                yield category_index
+        for category_index in unmapped:
+            if not remaining:
+                return
+            yield category_index
+
+    def _finish_targeted_extraction(self, benefits_summary, category_sections, category_entries, requested, missing,
+                                    output_file):
+        expanded = len(category_entries)
+        category_entries = {
+            category_index: (name, entry)
+            for category_index, (name, entry) in category_entries.items() if entry['procedure_count']
+        }
+        if missing:
+            self.logger.warning(f"Requested codes not listed in any category: {sorted(missing)}")
+        return self._finish_extraction(benefits_summary, category_sections, category_entries, output_file, {
+            'extraction_method': 'Targeted procedure codes',
+            'requested_codes': sorted(requested),
+            'missing_codes': sorted(missing),
+            'categories_expanded': expanded
+        })
 
-            # Save with comprehensive filename
-            filename = 'mypatientbenefitssummary.json'
+    def _begin_level(self, level):
+        if level not in EXTRACTION_METHODS:
+            raise ValueError(f"Unknown extraction level {level}")
+        self._extraction_level = level
+        self._streamed_procedures = set()
+        self._run_entries = {}
+        self.detail_memo = None
+        self.logger.info(f"Extraction level {level}: {EXTRACTION_METHODS[level]}")
+
+    def _summary_only_results(self, page, benefits_summary, output_file):
+        """Level 1: the benefits summary plus the category names, without expanding any category"""
+        if page.status_code != 200:
+            raise Exception(f"Could not access benefits page: {page.status_code}")
+        return self._finish_extraction(benefits_summary, self._find_category_sections(page.soup), {}, output_file)
+
+    def _prepare_category_run(self, page, benefits_summary):
+        """Find the categories on the benefits page and set up navigation and plan cache state"""
+        # Find all procedure category sections using helper function
+        category_sections = self._find_category_sections(page.soup)
+        self.nav_state.on_page_refreshed()
+        self.nav_state.learn_category_ids(category_sections)
+
+        self.logger.info(f"Found {len(category_sections)} categories to process")
+
+        # Plan-level data is shared by every patient on the same group/network
+        self._prepare_plan_context(benefits_summary)
+        self._location_plan_key = self.location_map.plan_key(benefits_summary) if self.location_map else None
+        self._start_detail_memo(benefits_summary)
+
+        # TESTING MODE: Only process first 2 categories to test benefits_summary extraction
+        # Set to None to process all categories
+        TEST_MODE_MAX_CATEGORIES = None
+
+        if TEST_MODE_MAX_CATEGORIES:
+            category_sections = category_sections[:TEST_MODE_MAX_CATEGORIES]
+            self.logger.info(f"⚠ TEST MODE: Only processing first {TEST_MODE_MAX_CATEGORIES} categories")
+        return category_sections
+
+    def _finish_cancelled(self, benefits_summary, category_sections, output_file):
+        """Save a cancelled run's completed categories plus the procedures done so far in the
+        ones it was in the middle of (listed in incomplete_categories)"""
+        self.logger.warning("Extraction cancelled - saving partial results")
+        category_entries = {}
+        incomplete = []
+        for category_index, (name, entry) in sorted(self._run_entries.items()):
+            if 'procedure_count' not in entry:
+                incomplete.append(name)
+                entry = {'category_index': category_index, 'procedure_count': len(entry['procedures']),
+                         'procedures': entry['procedures']}
+            category_entries[category_index] = (name, entry)
+        return self._finish_extraction(benefits_summary, category_sections, category_entries, output_file,
+                                       {'cancelled': True, 'incomplete_categories': incomplete}, cancelled=True)
+
+    def _finish_extraction(self, benefits_summary, category_sections, category_entries, output_file,
+                           summary_fields=None, cancelled=False):
+        """Merge category entries into the final results, save them and clear the checkpoint
+
+        summary_fields: extra or overriding extraction_summary entries
+        cancelled: partial results - the plan cache is not updated and the checkpoint is kept"""
+        # Merge in category order so the output is the same regardless of worker count
+        procedures_by_category = {}
+        total_processed = 0
+        failed_categories = []
+        for category_index in sorted(category_entries):
+            name, entry = category_entries[category_index]
+            procedures_by_category[name] = entry
+            total_processed += entry['procedure_count']
+            if entry.get('failed'):
+                failed_categories.append(name)
+        if not cancelled:
+            self._store_plan_categories(category_entries)
+
+        # Create final comprehensive results
+        final_results = {
+            'benefits_summary': benefits_summary or {},  # Summary data from default page
+            'extraction_summary': {
+                'total_categories_processed': len(category_entries),
+                'total_procedures_extracted': total_processed,
+                'categories': [cat['name'] for cat in category_sections],
+                'extraction_method': EXTRACTION_METHODS[self._extraction_level],
+                'extraction_level': self._extraction_level,
+                'failed_categories': failed_categories,
+                'extraction_date': time.strftime('%Y-%m-%d %H:%M:%S')
+            },
+            # Plain dicts for the caller; the compact records stay internal
+            'procedures_by_category': to_plain(procedures_by_category)
+        }
+        final_results['extraction_summary'].update(summary_fields or {})
+        if self._plan_context:
+            final_results['extraction_summary']['plan_cache'] = self._plan_cache_summary()
+        if self.detail_memo:
+            final_results['extraction_summary']['procedure_memo'] = self.detail_memo.summary()
+        final_results['request_metrics'] = self.metrics.summary()
+        if self.metrics_file:
+            self.metrics.export_jsonl(self.metrics_file)
+
+        self._emit('summary', extraction_summary=final_results['extraction_summary'],
+                   request_metrics=final_results['request_metrics'])
+
+        # Save with comprehensive filename (None: the caller only wants the result stream)
+        filename = output_file
+        if filename:
             self.save_debug_json(final_results, filename)
 
-            self.logger.info(f"\n{'='*60}")
-            self.logger.info(f"✓ ALL CATEGORIES EXTRACTION COMPLETE!")
-            self.logger.info(f"  Total categories: {len(category_sections)}")
-            self.logger.info(f"  Total procedures: {total_processed}")
+        # Finished - nothing left to resume for this patient (failed categories and procedures
+        # without detail data can still be resumed)
+        if (self._checkpoint_key and not cancelled and not failed_categories
+                and not self._missing_details(category_entries)):
+            self.checkpoint.clear(self._checkpoint_key)
+
+        self.logger.info(f"\n{'='*60}")
+        self.logger.info("⚠ EXTRACTION CANCELLED (partial results)" if cancelled else "✓ ALL CATEGORIES EXTRACTION COMPLETE!")
+        self.logger.info(f"  Total categories: {len(category_entries)}")
+        self.logger.info(f"  Total procedures: {total_processed}")
+        if failed_categories:
+            self.logger.warning(f"  Failed categories: {failed_categories}")
+        self.logger.info(f"  Navigation: {self.nav_state.summary()}")
+        if self.retry_counts or self.circuit_breaker.trips:
+            self.logger.info(f"  Retries: {self.retry_counts}, circuit breaker trips: {self.circuit_breaker.trips}")
+        if self.detail_memo and self.detail_memo.reused:
+            self.logger.info(f"  Duplicate procedures reused: {self.detail_memo.reused} "
+                             f"({self.detail_memo.requests_saved} requests saved)")
+        request_metrics = final_results['request_metrics']
+        self.logger.info(f"  Requests: {request_metrics['total_requests']} in {request_metrics['total_seconds']}s, "
+                         f"{request_metrics['total_bytes'] / 1024:.0f} KB")
+        if filename:
             self.logger.info(f"  Saved to: {filename}")
-            self.logger.info(f"{'='*60}")
+        self.logger.info(f"{'='*60}")
+
+        self._emit('complete', status='cancelled' if cancelled else 'success', output_file=filename)
+        self._progress('extraction_cancelled' if cancelled else 'extraction_complete',
+                       categories=len(category_entries), procedures=total_processed, output_file=filename)
+        return final_results
+
+    def _missing_details(self, category_entries):
+        """Number of procedures in a full extraction that kept basic data only (detail request failed)"""
+        if self._extraction_level < LEVEL_FULL:
+            return 0
+        return sum(1 for _, entry in category_entries.values() for record in entry['procedures'].values()
+                   if 'procedure_details' not in record)
+
+    def _extract_category_entry(self, category_index, category, total_categories, only_codes=None):
+        """Extract one category on this session and return (name, procedures_by_category entry)
+
+        only_codes: optional set of procedure codes - rows with other codes are left out"""
+        completed = self._begin_category_entry(category_index, category, total_categories)
+        if completed:
+            return completed
+        procedure_filter = only_codes
+
+        # Category tables are only clickable from the benefits view, so reset only if
+        # the server is still showing a procedure detail
+        diverged = self.nav_state.diverged
+        if self.nav_state.needs_reset_before_category():
+            self.logger.info(f"Resetting to benefits view before processing category '{category['name']}'")
+            self._click_back_to_benefits_view()
+        else:
+            self.nav_state.resets_skipped += 1
 
-            return final_results
+        # JSF IDs follow the learned index scheme, so the page only needs re-reading
+        # when a response showed the server state diverged
+        if diverged:
+            category = self._refresh_category_info(category_index, category)
+        else:
+            self.nav_state.refreshes_skipped += 1
+            category = dict(category, jsf_id=self.nav_state.category_jsf_id(category_index))
+
+        # Extract data for this category - pass the category info directly
+        category_result = self._extract_single_category(
+            target_category_index=category_index,
+            category_info=category,
+            procedure_filter=procedure_filter,
+            with_details=self._extraction_level >= LEVEL_FULL
+        )
 
-        except Exception as e:
-            self.logger.error(f"All categories extraction failed: {e}")
-            return None
+        if not category_result and self.nav_state.diverged:
+            # Expansion did not return the table we expected - re-read the page and retry once
+            self.logger.info(f"Navigation state diverged, retrying category '{category['name']}' after refresh")
+            self._click_back_to_benefits_view()
+            category = self._refresh_category_info(category_index, category)
+            category_result = self._extract_single_category(
+                target_category_index=category_index,
+                category_info=category,
+                procedure_filter=procedure_filter,
+                with_details=self._extraction_level >= LEVEL_FULL
+            )
+
+        return self._finish_category_entry(category_index, category, category_result)
+
+    def _begin_category_entry(self, category_index, category, total_categories):
+        """Resolve a category from the checkpoint where possible; returns its entry or None"""
+        self.logger.info(f"\n{'='*60}")
+        self.logger.info(f"Processing category {category_index + 1}/{total_categories}: '{category['name']}'")
+        self.logger.info(f"{'='*60}")
+        self._progress('category_started', index=category_index, total=total_categories, name=category['name'])
+
+        # Finished by an earlier, interrupted run
+        completed = self._checkpointed_category(category_index, category['name'])
+        if completed:
+            self.logger.info(f"✓ Category '{category['name']}' complete: {completed[1]['procedure_count']} procedures (checkpoint)")
+            return self._category_done(category_index, *completed)
+        return None
+
+    def _finish_category_entry(self, category_index, category, category_result):
+        """Build the (name, entry) pair for a category and checkpoint it"""
+        if category_result and category_result.get('procedures'):
+            category_procedures = category_result['procedures']
+            self._mark_plan_served(category_index, category_procedures)
+            self.logger.info(f"✓ Category '{category['name']}' complete: {len(category_procedures)} procedures")
+        elif category_result and category_result['extraction_summary']['total_procedures_in_category']:
+            # Expanded fine, but none of its rows passed the procedure filter
+            category_procedures = {}
+            self.logger.info(f"✓ Category '{category['name']}' has none of the requested procedures")
+        else:
+            self.logger.warning(f"✗ No procedures found in category '{category['name']}'")
+            # Still add the category with empty procedures
+            category_procedures = {}
+
+        entry = {
+            'category_index': category_index,
+            'procedure_count': len(category_procedures),
+            'procedures': category_procedures
+        }
+        if category_result is None:
+            # The category table (or its service history) could not be fetched
+            entry['failed'] = True
+        elif self._missing_details({category_index: (category['name'], entry)}):
+            # Procedures that kept basic data only are not checkpointed: a resumed run re-expands
+            # the category and re-fetches just those (the rest are restored per procedure)
+            self.logger.info(f"Category '{category['name']}' not checkpointed - some procedures have no detail data")
+        elif category_procedures:
+            self._checkpoint_category(category_index, category['name'], entry)
+        return self._category_done(category_index, category['name'], entry)
+
+    def _start_checkpoint(self):
+        """Key the checkpoint to the current patient and report anything resumable"""
+        self._checkpoint_key = None
+        self._checkpointed_categories = {}
+        # Only full extractions are worth resuming (and only they may fill a resumed run)
+        if not (self.checkpoint and self.current_member_id and self._extraction_level >= LEVEL_FULL):
+            return
+        self._checkpoint_key = self.checkpoint.member_key(self.current_member_id, self.current_dob)
+        # Read once per patient; categories completed during this run are never looked up again
+        self.checkpoint.purge_expired()
+        self._checkpointed_categories = self.checkpoint.load_categories(self._checkpoint_key)
+        if self._checkpointed_categories:
+            self.logger.info(f"Resuming extraction: {len(self._checkpointed_categories)} categories already completed")
+
+    def _checkpointed_category(self, category_index, category_name):
+        saved = self._checkpointed_categories.get(category_index)
+        if saved and saved[0] == category_name:
+            name, entry = saved
+            entry['procedures'] = {
+                unique_key: ProcedureRecord.from_dict(record) for unique_key, record in entry['procedures'].items()
+            }
+            return name, entry
+        return None
+
+    def _checkpoint_category(self, category_index, category_name, entry):
+        if self._checkpoint_key:
+            self.checkpoint.save_category(self._checkpoint_key, category_index, category_name, entry)
+
+    def _load_checkpointed_procedures(self, category_index):
+        if not self._checkpoint_key:
+            return {}
+        return {
+            row_index: (unique_key, ProcedureRecord.from_dict(record))
+            for row_index, (unique_key, record) in self.checkpoint.load_procedures(self._checkpoint_key, category_index).items()
+        }
 
-    def extract_single_category_data(self, target_category_index=0, category_info=None):
-        """Extract comprehensive procedure data for a single category only"""
+    def _checkpoint_procedure(self, category_index, row_index, unique_key, record):
+        if self._checkpoint_key:
+            self.checkpoint.save_procedure(self._checkpoint_key, category_index, row_index, unique_key, record)
+
+    def _share_run_state(self, worker):
+        """Give a worker session this run's plan cache lookup and checkpoint"""
+        worker._plan_context = self._plan_context
+        worker.checkpoint = self.checkpoint
+        worker._checkpoint_key = self._checkpoint_key
+        worker._checkpointed_categories = self._checkpointed_categories
+        worker._extraction_level = self._extraction_level
+        worker.location_map = self.location_map
+        worker.result_stream = self.result_stream
+        worker.progress = self.progress
+        worker.cancel_event = self.cancel_event
+        worker._run_entries = self._run_entries
+        worker._location_plan_key = self._location_plan_key
+        worker.detail_memo = self.detail_memo
+        worker.procedure_dictionary = self.procedure_dictionary
+
+    def _prepare_plan_context(self, benefits_summary):
+        """Look up the patient's plan in the plan cache (no-op without a cache or a known plan)"""
+        self._plan_context = None
+        # The cache holds procedure detail records, which lower levels do not produce
+        if not self.plan_cache or self._extraction_level < LEVEL_FULL:
+            return
+        plan_key = self.plan_cache.plan_key(benefits_summary)
+        if not plan_key:
+            self.logger.info("Plan cache: no Group / ID in benefits summary, extracting everything")
+            return
+
+        cached = self.plan_cache.get(plan_key)
+        self.logger.info(f"Plan cache: {len(cached)} cached categories for plan '{plan_key}'")
+        self._plan_context = {
+            'plan_key': plan_key,
+            'cached': cached,
+            'served': set(),
+            'procedures_served': 0,
+            # Parallel workers share this context
+            'lock': threading.Lock()
+        }
+
+    def _mark_plan_served(self, category_index, category_procedures):
+        """Count the category's records that took plan-level fields from the cache"""
+        if not self._plan_context:
+            return
+        served = sum(1 for record in category_procedures.values() if record.get('from_plan_cache'))
+        if not served:
+            return
+        with self._plan_context['lock']:
+            self._plan_context['served'].add(category_index)
+            self._plan_context['procedures_served'] += served
+
+    def _start_detail_memo(self, benefits_summary):
+        self.detail_memo = None
+        if self._extraction_level >= LEVEL_FULL:
+            self.detail_memo = ProcedureDetailMemo(PlanBenefitCache.plan_key(benefits_summary))
+
+    def _cached_related_procedures(self, category_name):
+        """{procedure code: related procedures} of the category from the plan cache ({} if not cached)"""
+        if not self._plan_context:
+            return {}
+        cached_category = self._plan_context['cached'].get(category_name)
+        if cached_category is None:
+            return {}
+        return {record['procedure_code']: record['related_procedures']
+                for record in cached_category['procedures'].values() if 'related_procedures' in record}
+
+    def _use_cached_related_procedures(self, detailed_data, related_procedures):
+        """Take the More... expansion from the plan cache instead of requesting it"""
+        detailed_data['related_procedures'] = list(related_procedures)
+        detailed_data['from_plan_cache'] = self.PLAN_CACHE_RULE
+        self.logger.info(f"    Related procedures from the plan cache ({len(related_procedures)}), More... not requested")
+
+    def _store_plan_categories(self, category_entries):
+        """Write fully extracted categories back to the plan cache, minus patient service history"""
+        if not self._plan_context:
+            return
+        for category_index, (name, entry) in category_entries.items():
+            if category_index in self._plan_context['served']:
+                continue
+            procedures = entry['procedures']
+            # Only cache categories where every procedure got its detail data
+            if not procedures or not all('procedure_details' in record for record in procedures.values()):
+                continue
+            plan_records = {
+                unique_key: {key: ([] if key == 'service_history' else value)
+                             for key, value in record.items() if key != 'from_plan_cache'}
+                for unique_key, record in procedures.items()
+            }
+            self.plan_cache.put_category(self._plan_context['plan_key'], name, category_index, plan_records)
+
+    def _plan_cache_summary(self):
+        return {
+            'rule': self.PLAN_CACHE_RULE['rule'],
+            'categories_from_cache': len(self._plan_context['served']),
+            'procedures_from_cache': self._plan_context['procedures_served']
+        }
+
+    def _refresh_category_info(self, category_index, category):
+        """Re-read the benefits page and return fresh category info (JSF IDs may have changed)"""
+        self.logger.info(f"Refreshing category list")
+        self.nav_state.refreshes_issued += 1
+        self.invalidate_page_snapshot()
+        return self._category_from_refreshed_page(self.get_subscriber_page(), category_index, category)
+
+    def _category_from_refreshed_page(self, page, category_index, category):
+        if page.status_code == 200:
+            category_sections = self._find_category_sections(page.soup)
+            self.nav_state.on_page_refreshed()
+            if category_index < len(category_sections):
+                category = category_sections[category_index]
+                self.logger.info(f"Updated JSF ID for '{category['name']}': {category['jsf_id']}")
+        return category
+
+    def open_worker_session(self):
+        """Open an independent authenticated session on the same patient (own cookies and ViewState)"""
+        if not (self.stored_username and self.current_member_id):
+            raise Exception("Must authenticate and search a patient before opening worker sessions")
+
+        worker = UnitedConcordiaPortalScraper(html_parser=self.html_parser, parse_fast_path=self.parse_fast_path,
+                                              retry_policy=self.retry_policy, pipeline_parse=self.pipeline_parse,
+                                              cancel_event=self.cancel_event)
+        worker.logger = self.logger
+        try:
+            worker.authenticate(self.stored_username, self.stored_password)
+            if not worker.navigate_to_benefits_portal():
+                raise Exception("Worker session failed to navigate to benefits portal")
+            if not worker.search_patient(self.current_member_id, self.current_dob):
+                raise Exception("Worker session failed to find patient")
+            if not worker.extract_viewstate_from_current_page():
+                raise Exception("Worker session could not extract ViewState")
+        except BaseException:
+            worker.close()
+            raise
+        return worker
+
+    def _absorb_worker_stats(self, worker):
+        """Count a finished worker session's requests and retries as this patient's"""
+        self.metrics.merge(worker.metrics)
+        for failure, count in worker.retry_counts.items():
+            self.retry_counts[failure] = self.retry_counts.get(failure, 0) + count
+        self.circuit_breaker.trips += worker.circuit_breaker.trips
+
+    def _extract_categories_parallel(self, category_sections, workers):
+        """Split categories round-robin across this session and (workers - 1) extra sessions"""
+        workers = min(workers, len(category_sections))
+        self.logger.info(f"Parallel extraction: {len(category_sections)} categories across {workers} sessions")
+
+        assignments = [list(range(worker_index, len(category_sections), workers)) for worker_index in range(workers)]
+        category_entries = {}
+        unfinished = []
+        extra_sessions = []
+        lock = threading.Lock()
+
+        def run_worker(worker_index):
+            indices = assignments[worker_index]
+            try:
+                # Worker 0 reuses this session, which is already on the patient's benefits page
+                scraper = self if worker_index == 0 else self.open_worker_session()
+                self._share_run_state(scraper)
+            except Exception as e:
+                self.logger.error(f"Worker {worker_index} could not open a session: {e}")
+                with lock:
+                    unfinished.extend(indices)
+                return
+            if scraper is not self:
+                with lock:
+                    extra_sessions.append(scraper)
+
+            for category_index in indices:
+                entry = scraper._extract_category_entry(
+                    category_index, category_sections[category_index], len(category_sections)
+                )
+                with lock:
+                    category_entries[category_index] = entry
+
+        try:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                list(executor.map(run_worker, range(workers)))
+        finally:
+            # Also on cancellation, so the partial results count every session's requests
+            for worker in extra_sessions:
+                self._absorb_worker_stats(worker)
+                worker.close()
+
+        # Categories whose worker never got a session fall back to this session
+        for category_index in sorted(unfinished):
+            category_entries[category_index] = self._extract_category_entry(
+                category_index, category_sections[category_index], len(category_sections)
+            )
+
+        return category_entries
+
+    def _category_expansion_payload(self, target_category):
+        return self._jsf_ajax_payload(
+            target_category['form_name'], target_category['jsf_id'],
+            "errorContainer printSelectionForm printSelectionChooserModalFooter servicesGroup benefitsDetailsSearch:hiddenTriggerForLoadingAllowances",
+            behavior_event="click"
+        )
+
+    def _handle_category_expansion(self, response_text, target_category, target_category_index):
+        """Decode a category expansion response and return its procedures (raises if none)"""
+        self.logger.info(f"✓ Category expanded successfully via API")
+
+        # Update ViewState from API response
+        decoded = decode_partial_response(response_text)
+        if self._apply_viewstate(decoded):
+            self.logger.info(f"  Updated ViewState after expansion")
+
+        # Parse procedures DYNAMICALLY from API response
+        basic_procedures = self._parse_category_procedures(decoded, target_category['name'])
+
+        if not basic_procedures:
+            self.nav_state.mark_diverged()
+            raise Exception(f"No procedures found in category '{target_category['name']}'")
+
+        self.logger.info(f"Found {len(basic_procedures)} procedures in target category")
+        if self._location_plan_key:
+            self.location_map.put_category(self._location_plan_key, target_category_index, target_category['name'],
+                                           list(basic_procedures))
+        self.nav_state.on_category_expanded(target_category_index)
+        self.nav_state.learn_detail_ids(basic_procedures)
+        return basic_procedures
+
+    @staticmethod
+    def _procedure_key(proc_code, proc_data):
+        return f"{proc_code}_{proc_data.get('procedure_name', 'Unknown').replace(' ', '_')}"
+
+    def _procedure_record(self, proc_code, proc_data, detailed_info):
+        """Return (unique_key, record, has_details) for one procedure row; the record falls
+        back to code and name when the detail request failed or returned another procedure"""
+        unique_key = self._procedure_key(proc_code, proc_data)
+        basic_record = {
+            'procedure_code': proc_code,
+            'procedure_name': proc_data.get('procedure_name', 'Unknown')
+        }
+
+        if not detailed_info:
+            self.logger.warning(f"  ✗ Failed to get detailed data for {proc_code}, keeping basic data")
+            return unique_key, ProcedureRecord.from_dict(basic_record), False
+
+        # CRITICAL: Verify the returned data matches the requested procedure
+        verified_code = detailed_info.get('verified_procedure_code')
+        if verified_code and verified_code != proc_code:
+            self.logger.error(f"  ✗ DATA MISMATCH: Requested {proc_code} but got {verified_code} - DISCARDING detailed data")
+            self.logger.warning(f"  Using basic data only for {proc_code} due to mismatch")
+            return unique_key, ProcedureRecord.from_dict(basic_record), False
+
+        # Only store procedure code, name, and detailed data (no basic/JSF fields)
+        comprehensive_data = {**basic_record, **detailed_info}
+
+        # Remove JSF-related and unnecessary fields
+        fields_to_remove = ['verified_procedure_code', 'basic_allowance', 'basic_coverage',
+                          'detail_jsf_id', 'jsf_components']
+        for field in fields_to_remove:
+            comprehensive_data.pop(field, None)
+        self._reference_procedure_dictionary(proc_code, comprehensive_data)
+
+        self.logger.info(f"  ✓ Got comprehensive data for {proc_code}")
+        return unique_key, ProcedureRecord.from_dict(comprehensive_data), True
+
+    def _store_procedure(self, target_category, target_category_index, index, proc_code, proc_data, detailed_info,
+                         comprehensive_procedures, requests=0):
+        """Add one procedure's record to the category results, stream, checkpoint and memoize it.
+        requests: how many requests fetching it took (0: not fetched here, nothing to memoize)
+        Returns 1 when the record has detailed data, else 0 (for processed_count)"""
+        unique_key, record, has_details = self._procedure_record(proc_code, proc_data, detailed_info)
+        comprehensive_procedures[unique_key] = record
+        self._run_entries[target_category_index] = (target_category['name'], {'procedures': comprehensive_procedures})
+        self._stream_procedure(target_category['name'], target_category_index, unique_key, record)
+        self._progress('procedure_done', code=proc_code, category=target_category['name'], has_details=has_details)
+        if has_details:
+            self._checkpoint_procedure(target_category_index, index, unique_key, record)
+            if self.detail_memo and requests:
+                self.detail_memo.put(proc_code, record, requests)
+        return int(has_details)
+
+    def _store_parsed_procedure(self, parsing, target_category, target_category_index, comprehensive_procedures):
+        """Wait for a pipelined procedure's parse and store it like _store_procedure
+
+        parsing: (index, proc_code, proc_data, future or None, requests) from _submit_procedure_detail, or None"""
+        if parsing is None:
+            return 0
+        index, proc_code, proc_data, detail, requests = parsing
+        detailed_info = None
+        if detail is not None:
+            try:
+                detailed_info = detail.result()
+            except Exception as e:
+                self.logger.error(f"Failed to parse procedure detail for {proc_code}: {e}")
+        return self._store_procedure(target_category, target_category_index, index, proc_code, proc_data,
+                                     detailed_info, comprehensive_procedures, requests)
+
+    def _reused_procedure(self, checkpointed, index, proc_code):
+        """Data for a row that needs no detail request: ('checkpoint', (unique_key, record)) when an
+        earlier run finished it, ('memo', detailed_info) when another category of this run fetched it, else None"""
+        saved = checkpointed.get(index)
+        if saved and saved[1].get('procedure_code') == proc_code:
+            return 'checkpoint', saved
+        memoized = self.detail_memo.get(proc_code) if self.detail_memo else None
+        if memoized is not None:
+            return 'memo', memoized
+        return None
+
+    def _store_reused_procedure(self, reused, target_category, target_category_index, index, proc_code, proc_data,
+                                comprehensive_procedures):
+        """Store a _reused_procedure result; returns 1 when it has detailed data, else 0"""
+        source, data = reused
+        if source == 'checkpoint':
+            comprehensive_procedures[data[0]] = data[1]
+            self._stream_procedure(target_category['name'], target_category_index, *data)
+            self.logger.info(f"  ✓ {proc_code} restored from checkpoint")
+            return 1
+        self.logger.info(f"  ✓ {proc_code} reused from an earlier category")
+        return self._store_procedure(target_category, target_category_index, index, proc_code, proc_data, data,
+                                     comprehensive_procedures)
+
+    def _reference_procedure_dictionary(self, proc_code, record):
+        """With a ProcedureDictionary, store the record's CDT entries if they are new and replace
+        them in the record by procedure_dictionary_ref (the code to look them up by)"""
+        if self.procedure_dictionary is None:
+            return
+        entries = record.get('procedure_dictionary')
+        if entries and proc_code not in self.procedure_dictionary:
+            self.procedure_dictionary.put(proc_code, entries)
+        if proc_code in self.procedure_dictionary:
+            record.pop('procedure_dictionary', None)
+            record['procedure_dictionary_ref'] = proc_code
+
+    def _category_table_results(self, target_category, target_category_index, basic_procedures):
+        """Level 2: one record per category table row, no detail requests"""
+        table_procedures = {
+            self._procedure_key(proc_code, proc_data): CategoryTableRow.from_dict({
+                key: value for key, value in proc_data.items() if key not in ('category', 'detail_jsf_id')
+            })
+            for proc_code, proc_data in basic_procedures.items()
+        }
+        return self._single_category_results(target_category, target_category_index, basic_procedures,
+                                             table_procedures, 0)
+
+    def _single_category_results(self, target_category, target_category_index, basic_procedures,
+                                 comprehensive_procedures, processed_count):
+        final_results = {
+            'extraction_summary': {
+                'target_category': target_category['name'],
+                'target_category_index': target_category_index,
+                'total_procedures_in_category': len(basic_procedures),
+                'procedures_with_detailed_data': processed_count,
+                'extraction_method': f'Single category focus: {target_category["name"]}',
+                'extraction_date': time.strftime('%Y-%m-%d %H:%M:%S')
+            },
+            'procedures': comprehensive_procedures
+        }
+
+        # Don't save individual category files - only save the final combined file
+
+        self.logger.info(f"✓ Single category extraction complete for '{target_category['name']}'!")
+        self.logger.info(f"  Total procedures in category: {len(comprehensive_procedures)}")
+        self.logger.info(f"  With detailed data: {processed_count}")
+
+        return final_results
+
+    def extract_single_category_data(self, target_category_index=0, category_info=None, procedure_filter=None,
+                                     with_details=True):
+        """Extract comprehensive procedure data for a single category only
+
+        procedure_filter: optional set of procedure codes - only those rows get a detail request
+        with_details: False returns just the category table rows (no detail requests)"""
+        return to_plain(self._extract_single_category(target_category_index, category_info, procedure_filter,
+                                                      with_details))
+
+    def _extract_single_category(self, target_category_index=0, category_info=None, procedure_filter=None,
+                                 with_details=True):
+        """extract_single_category_data with the procedures as compact uc_records records"""
         try:
             self.logger.info("=== EXTRACTING SINGLE CATEGORY DATA ===")
 
@@ -923,43 +2575,11 @@ class UnitedConcordiaPortalScraper:
                     raise Exception("Could not extract ViewState")
 
                 # Get the main benefits page to find all category sections
-                response = self.session.get("https://www.unitedconcordia.com/tuctpi/subscriber.xhtml")
-                if response.status_code != 200:
-                    raise Exception(f"Could not access benefits page: {response.status_code}")
-
-                soup = BeautifulSoup(response.text, 'html.parser')
-
-                # Find all procedure category sections
-                category_sections = []
-                hash_links = soup.find_all('table')
-                for table in hash_links:
-                    table_id = table.get('id', '')
-                    onclick = table.get('onclick', '')
-
-                    if re.match(r'j_id_n8:j_id_n9:\d+:j_id_na', table_id) and 'jsf.ajax.request' in onclick:
-                        category_text = ""
-                        is_expanded = False
-                        rows = table.find_all('tr')
-                        for row in rows:
-                            td = row.find('td')
-                            if td:
-                                text = td.get_text(strip=True)
-                                if 'glyphicon-plus' in str(td):
-                                    category_text = re.sub(r'[+\-−]', '', text).strip()
-                                    is_expanded = False
-                                    break
-                                elif 'glyphicon-minus' in str(td):
-                                    category_text = re.sub(r'[+\-−]', '', text).strip()
-                                    is_expanded = True
-                                    break
-
-                        if category_text:
-                            category_sections.append({
-                                'name': category_text,
-                                'jsf_id': table_id,
-                                'form_name': table_id.split(':')[0] if table_id else 'j_id_n8',
-                                'is_expanded': is_expanded
-                            })
+                page = self.get_subscriber_page()
+                if page.status_code != 200:
+                    raise Exception(f"Could not access benefits page: {page.status_code}")
+
+                category_sections = self._find_category_sections(page.soup)
 
                 if target_category_index >= len(category_sections):
                     raise Exception(f"Target category index {target_category_index} out of range. Found {len(category_sections)} categories")
@@ -971,48 +2591,22 @@ class UnitedConcordiaPortalScraper:
 
             # ALWAYS expand target category via API to get fresh data (even if appears expanded)
             self.logger.info(f"Expanding category via API: {target_category['name']}")
-            payload = {
-                f"{target_category['form_name']}_SUBMIT": "1",
-                "javax.faces.ViewState": self.current_viewstate,
-                "javax.faces.behavior.event": "click",
-                "javax.faces.partial.event": "click",
-                "javax.faces.source": target_category['jsf_id'],
-                "javax.faces.partial.ajax": "true",
-                "javax.faces.partial.execute": target_category['jsf_id'],
-                "javax.faces.partial.render": "errorContainer printSelectionForm printSelectionChooserModalFooter servicesGroup benefitsDetailsSearch:hiddenTriggerForLoadingAllowances",
-                target_category['form_name']: target_category['form_name']
-            }
-
             api_response = self.session.post(
-                "https://www.unitedconcordia.com/tuctpi/subscriber.xhtml",
-                data=payload,
-                headers={
-                    'Content-Type': 'application/x-www-form-urlencoded; charset=UTF-8',
-                    'X-Requested-With': 'XMLHttpRequest',
-                    'Faces-Request': 'partial/ajax'
-                }
+                self.SUBSCRIBER_URL,
+                data=self._category_expansion_payload(target_category),
+                headers=self.AJAX_HEADERS
             )
 
+            if self._is_session_expired_response(api_response.status_code, api_response.text):
+                raise SessionExpired(f"Session expired while expanding category '{target_category['name']}'")
             if api_response.status_code != 200:
                 raise Exception(f"Failed to expand target category: {api_response.status_code}")
 
-            self.logger.info(f"✓ Category expanded successfully via API")
-
-            # Update ViewState from API response
-            viewstate_match = re.search(r'<update id="j_id__v_0:javax\.faces\.ViewState:\d+"><!\[CDATA\[(.*?)\]\]></update>', api_response.text, re.DOTALL)
-            if viewstate_match:
-                self.current_viewstate = viewstate_match.group(1).strip()
-                self.logger.info(f"  Updated ViewState after expansion")
-
-            # Debug files disabled per user request - not needed anymore
-
-            # Parse procedures DYNAMICALLY from API response
-            basic_procedures = self._parse_category_procedures(api_response.text, target_category['name'])
-
-            if not basic_procedures:
-                raise Exception(f"No procedures found in category '{target_category['name']}'")
-
-            self.logger.info(f"Found {len(basic_procedures)} procedures in target category")
+            basic_procedures = self._handle_category_expansion(api_response.text, target_category, target_category_index)
+            self._progress('category_table', index=target_category_index, name=target_category['name'],
+                           procedures=len(basic_procedures))
+            if not with_details:
+                return self._category_table_results(target_category, target_category_index, basic_procedures)
 
             # Get detailed information for ALL procedures in the target category using index-based navigation
             comprehensive_procedures = {}
@@ -1021,87 +2615,85 @@ class UnitedConcordiaPortalScraper:
             # Convert to list to get indexed access
             procedures_list = list(basic_procedures.items())
 
-            for index, (proc_code, proc_data) in enumerate(procedures_list):
-                self.logger.info(f"Getting detailed info for {proc_code} (index {index}): {proc_data.get('procedure_name', 'N/A')}")
-
-                # CRITICAL: Click "Back to Benefits View" before navigating to next procedure
-                # This resets JSF state and prevents getting stuck on first procedure
-                if index > 0:
-                    self.logger.info(f"  Clicking 'Back to Benefits View' to reset state before navigating to {proc_code}")
-                    self._click_back_to_benefits_view()
-                    # Removed unnecessary sleep - the API call itself takes time
-
-                # Use index-based JSF ID from HAR analysis
-                index_based_jsf_id = f"j_id_n8:j_id_n9:{target_category_index}:j_id_ni:{index}:j_id_nm"
-                self.logger.info(f"  Using index-based JSF ID: {index_based_jsf_id}")
-
-                # Get detailed information using correct index-based navigation
-                detailed_info = self.get_comprehensive_procedure_detail(proc_code, index_based_jsf_id)
-
-                if detailed_info:
-                    # CRITICAL: Verify the returned data matches the requested procedure
-                    verified_code = detailed_info.get('verified_procedure_code')
-
-                    if verified_code and verified_code != proc_code:
-                        self.logger.error(f"  ✗ DATA MISMATCH: Requested {proc_code} but got {verified_code} - DISCARDING detailed data")
-                        # Store only procedure code and name for failed cases
-                        unique_key = f"{proc_code}_{proc_data.get('procedure_name', 'Unknown').replace(' ', '_')}"
-                        comprehensive_procedures[unique_key] = {
-                            'procedure_code': proc_code,
-                            'procedure_name': proc_data.get('procedure_name', 'Unknown')
-                        }
-                        self.logger.warning(f"  Using basic data only for {proc_code} due to mismatch")
-                    else:
-                        # Only store procedure code, name, and detailed data (no basic/JSF fields)
-                        comprehensive_data = {
-                            'procedure_code': proc_code,
-                            'procedure_name': proc_data.get('procedure_name', 'Unknown'),
-                            **detailed_info  # Detailed data from individual procedure call
-                        }
+            # Procedures already completed by an earlier, interrupted run
+            checkpointed = self._load_checkpointed_procedures(target_category_index)
 
-                        # Remove JSF-related and unnecessary fields
-                        fields_to_remove = ['verified_procedure_code', 'basic_allowance', 'basic_coverage',
-                                          'detail_jsf_id', 'jsf_components']
-                        for field in fields_to_remove:
-                            comprehensive_data.pop(field, None)
+            # Warm plan cache: related procedures (More...) of this plan's rows
+            cached_related = self._cached_related_procedures(target_category['name'])
 
-                        unique_key = f"{proc_code}_{proc_data.get('procedure_name', 'Unknown').replace(' ', '_')}"
-                        comprehensive_procedures[unique_key] = comprehensive_data
-                        processed_count += 1
+            # Pipelined mode: the procedure whose response is still being parsed
+            parsing = None
 
-                        self.logger.info(f"  ✓ Got comprehensive data for {proc_code}")
-                else:
-                    # Store only procedure code and name for failed cases
-                    unique_key = f"{proc_code}_{proc_data.get('procedure_name', 'Unknown').replace(' ', '_')}"
-                    comprehensive_procedures[unique_key] = {
-                        'procedure_code': proc_code,
-                        'procedure_name': proc_data.get('procedure_name', 'Unknown')
-                    }
-                    self.logger.warning(f"  ✗ Failed to get detailed data for {proc_code}, keeping basic data")
-
-                # No sleep needed - each API call already has natural delay
-
-            # Create final comprehensive results
-            final_results = {
-                'extraction_summary': {
-                    'target_category': target_category['name'],
-                    'target_category_index': target_category_index,
-                    'total_procedures_in_category': len(basic_procedures),
-                    'procedures_with_detailed_data': processed_count,
-                    'extraction_method': f'Single category focus: {target_category["name"]}',
-                    'extraction_date': time.strftime('%Y-%m-%d %H:%M:%S')
-                },
-                'procedures': comprehensive_procedures
-            }
+            try:
+                for index, (proc_code, proc_data) in enumerate(procedures_list):
+                    if procedure_filter is not None and proc_code not in procedure_filter:
+                        continue
 
-            # Don't save individual category files - only save the final combined file
+                    # Finished by an earlier run, or fetched from another category this run
+                    reused = self._reused_procedure(checkpointed, index, proc_code)
+                    if reused:
+                        processed_count += self._store_parsed_procedure(
+                            parsing, target_category, target_category_index, comprehensive_procedures
+                        )
+                        parsing = None
+                        processed_count += self._store_reused_procedure(
+                            reused, target_category, target_category_index, index, proc_code, proc_data,
+                            comprehensive_procedures
+                        )
+                        continue
+
+                    self.logger.info(f"Getting detailed info for {proc_code} (index {index}): {proc_data.get('procedure_name', 'N/A')}")
+                    self._progress('procedure_started', code=proc_code, name=proc_data.get('procedure_name', 'N/A'),
+                                   index=index)
+
+                    # Click "Back to Benefits View" before navigating to the next procedure only when
+                    # the server has shown it gets stuck on the previous procedure without it
+                    if self.nav_state.needs_reset_before_detail():
+                        self.logger.info(f"  Clicking 'Back to Benefits View' to reset state before navigating to {proc_code}")
+                        self._click_back_to_benefits_view()
+                    elif index > 0:
+                        self.nav_state.resets_skipped += 1
+
+                    # Use index-based JSF ID (scheme learned from the category table)
+                    index_based_jsf_id = self.nav_state.detail_jsf_id(target_category_index, index)
+                    self.logger.info(f"  Using index-based JSF ID: {index_based_jsf_id}")
+                    requests_before = len(self.metrics.records)
+
+                    if self.pipeline_parse:
+                        # Send this procedure's request, then store the previous one once its parse is done
+                        detail = self._submit_procedure_detail(proc_code, index_based_jsf_id,
+                                                               cached_related.get(proc_code))
+                        processed_count += self._store_parsed_procedure(
+                            parsing, target_category, target_category_index, comprehensive_procedures
+                        )
+                        parsing = (index, proc_code, proc_data, detail, len(self.metrics.records) - requests_before)
+                        continue
 
-            self.logger.info(f"✓ Single category extraction complete for '{target_category['name']}'!")
-            self.logger.info(f"  Total procedures in category: {len(comprehensive_procedures)}")
-            self.logger.info(f"  With detailed data: {processed_count}")
+                    # Get detailed information using correct index-based navigation
+                    detailed_info = self.get_comprehensive_procedure_detail(
+                        proc_code, index_based_jsf_id, related_procedures=cached_related.get(proc_code)
+                    )
+                    processed_count += self._store_procedure(
+                        target_category, target_category_index, index, proc_code, proc_data, detailed_info,
+                        comprehensive_procedures, len(self.metrics.records) - requests_before
+                    )
+
+                    # No sleep needed - each API call already has natural delay
+            except (ExtractionCancelled, SessionExpired):
+                # The previous procedure's response already arrived: finish its parse and checkpoint it
+                self._store_parsed_procedure(parsing, target_category, target_category_index, comprehensive_procedures)
+                raise
+
+            processed_count += self._store_parsed_procedure(
+                parsing, target_category, target_category_index, comprehensive_procedures
+            )
 
-            return final_results
+            return self._single_category_results(
+                target_category, target_category_index, basic_procedures, comprehensive_procedures, processed_count
+            )
 
+        except SessionExpired:
+            raise
         except Exception as e:
             self.logger.error(f"Single category extraction failed: {e}")
             return None
@@ -1111,7 +2703,7 @@ class UnitedConcordiaPortalScraper:
         try:
             self.logger.info(f"    Parsing procedure details from full page for {procedure_code}")
 
-            soup = BeautifulSoup(html_content, 'html.parser')
+            soup = self._soup(html_content)
 
             detailed_data = {
                 'procedure_details': {},
@@ -1162,69 +2754,120 @@ class UnitedConcordiaPortalScraper:
             self.logger.error(f"Failed to parse procedure details for {procedure_code}: {e}")
             return {}
 
-    def get_comprehensive_procedure_detail(self, procedure_code, jsf_id, max_retries=3):
-        """Get ALL detailed information for a specific procedure with verification"""
-        try:
-            self.logger.info(f"    Requesting detailed info for {procedure_code} with JSF ID: {jsf_id}")
-
-            form_name = jsf_id.split(':')[0]
+    @staticmethod
+    def _is_session_expired_response(status_code, response_text):
+        """An AJAX response that is a login page, an auth error or a ViewExpired error"""
+        if status_code in (401, 403, 440):
+            return True
+        if status_code != 200:
+            return False
+        # Redirected to a login page instead of answering the AJAX request
+        if '<partial-response' not in response_text[:1000]:
+            return True
+        if '<error' in response_text:
+            error = decode_partial_response(response_text).error or {}
+            return 'ViewExpired' in error.get('error-name', '')
+        return False
 
-            # Step 1: Get basic procedure detail with retry logic
-            for attempt in range(max_retries):
-                payload = {
-                    f"{form_name}_SUBMIT": "1",
-                    "javax.faces.ViewState": self.current_viewstate,
-                    "javax.faces.behavior.event": "action",
-                    "javax.faces.partial.event": "click",
-                    "javax.faces.source": jsf_id,
-                    "javax.faces.partial.ajax": "true",
-                    "javax.faces.partial.execute": jsf_id,
-                    "javax.faces.partial.render": "ben-summary-2",
-                    form_name: form_name
-                }
-
-                self.logger.info(f"    Making POST request for {procedure_code} (attempt {attempt + 1}/{max_retries})")
-                response = self.session.post("https://www.unitedconcordia.com/tuctpi/subscriber.xhtml", data=payload)
-
-                if response.status_code != 200:
-                    self.logger.error(f"Failed to get procedure detail: {response.status_code}")
-                    return None
-
-                # Save debug file for individual procedure responses to troubleshoot duplicate data
-                # self.save_debug_html(response.text, f"detail_{procedure_code}_attempt{attempt + 1}_response.xml")
-
-                # Update ViewState
-                viewstate_match = re.search(r'<update id="j_id__v_0:javax\.faces\.ViewState:\d+"><!\[CDATA\[(.*?)\]\]></update>', response.text, re.DOTALL)
-                if viewstate_match:
-                    self.current_viewstate = viewstate_match.group(1).strip()
-                    self.logger.info(f"    Updated ViewState for {procedure_code}")
-                else:
-                    self.logger.warning(f"    No ViewState update found for {procedure_code}")
+    def _classify_detail_response(self, status_code, response_text):
+        """Return None for a usable partial response, else the RetryPolicy failure kind.
+        Also feeds the circuit breaker"""
+        if status_code >= 500 or status_code == 429:
+            failure = RetryPolicy.SERVER_ERROR
+        elif self._is_session_expired_response(status_code, response_text):
+            failure = RetryPolicy.SESSION_EXPIRED
+        elif status_code != 200:
+            failure = RetryPolicy.FATAL
+        elif '<error' in response_text:
+            failure = RetryPolicy.SERVER_ERROR
+        else:
+            failure = None
+
+        if failure == RetryPolicy.SERVER_ERROR:
+            if self.circuit_breaker.record_failure():
+                self.logger.warning(f"    Portal degraded - pausing this session for {self.circuit_breaker.cooldown:.0f}s")
+        elif failure is None:
+            self.circuit_breaker.record_success()
+        if failure is not None:
+            self.logger.warning(f"    Procedure detail failed: {failure} (HTTP {status_code})")
+        return failure
+
+    def _detail_retry_delay(self, failure, attempt, max_attempts, optimistic):
+        """Seconds to wait before retrying a procedure detail, or None to give up"""
+        if failure == RetryPolicy.FATAL:
+            return None
+        if attempt >= max_attempts - 1:
+            self.logger.error(f"    Failed to get correct procedure after {max_attempts} attempts ({failure})")
+            return None
+        self.retry_counts[failure] = self.retry_counts.get(failure, 0) + 1
+        # An optimistic mismatch only means the server needs a reset - retry right away
+        if failure == RetryPolicy.MISMATCH and optimistic:
+            return 0
+        delay = self.retry_policy.delay(failure, attempt + 1)
+        self.logger.info(f"    Retrying after {failure} in {delay:.1f}s...")
+        return delay
+
+    def _wait_for_circuit_breaker(self):
+        pause = self.circuit_breaker.pause_seconds()
+        if pause:
+            self.logger.warning(f"    Circuit breaker open - waiting {pause:.1f}s before the next request")
+            self._pause(pause)
+
+    def _recover_session(self):
+        """Get a working ViewState back after the view or login expired, then re-open the
+        category the procedure rows belong to"""
+        expanded = self.nav_state.expanded_category
+        try:
+            self.logger.info("    Session or view expired - recovering")
+            if not self.is_session_valid():
+                self.reauthenticate()
+                # Same patient: keep its window, including the new login
+                records = self.metrics.records
+                found = self.search_patient(self.current_member_id, self.current_dob)
+                self.metrics.records = records + self.metrics.records
+                if not found:
+                    return False
+            self.invalidate_page_snapshot()
+            if not self.extract_viewstate_from_current_page():
+                return False
+            if expanded is None:
+                self.nav_state.on_page_refreshed()
+                return True
+            category = self._category_from_refreshed_page(self.get_subscriber_page(), expanded, None)
+            if category is None:
+                return False
+            response = self.session.post(
+                self.SUBSCRIBER_URL, data=self._category_expansion_payload(category), headers=self.AJAX_HEADERS
+            )
+            if response.status_code != 200:
+                return False
+            self._handle_category_expansion(response.text, category, expanded)
+            return True
+        except Exception as e:
+            self.logger.error(f"    Session recovery failed: {e}")
+            return False
 
-                # CRITICAL: Verify we got the correct procedure in the response
-                returned_proc_code = self._extract_procedure_code_from_response(response.text)
+    def get_comprehensive_procedure_detail(self, procedure_code, jsf_id, max_retries=None, related_procedures=None):
+        """Get ALL detailed information for a specific procedure with verification
 
-                if returned_proc_code == procedure_code:
-                    self.logger.info(f"    ✓ Verified: Response contains correct procedure {procedure_code}")
-                    break
-                else:
-                    self.logger.warning(f"    ✗ Mismatch: Expected {procedure_code}, got {returned_proc_code} (attempt {attempt + 1})")
-                    if attempt < max_retries - 1:
-                        self.logger.info(f"    Retrying with longer delay...")
-                        time.sleep(3)  # Longer delay before retry
-                    else:
-                        self.logger.error(f"    Failed to get correct procedure after {max_retries} attempts")
-                        return None
+        related_procedures: the plan cache's More... expansion for this procedure, used instead
+        of requesting it"""
+        try:
+            self.logger.info(f"    Requesting detailed info for {procedure_code} with JSF ID: {jsf_id}")
 
-            # Parse the detailed information
-            detailed_data = self.parse_comprehensive_procedure_response(response.text, procedure_code)
+            # Step 1: Get basic procedure detail with retry logic
+            verified = self._request_procedure_detail(procedure_code, jsf_id, max_retries)
+            if verified is None:
+                return None
+            decoded, returned_proc_code = verified
 
-            # Add the verified procedure code to the data
-            detailed_data['verified_procedure_code'] = returned_proc_code
+            detailed_data = self._procedure_detail_data(decoded, procedure_code, returned_proc_code)
 
             # Step 2: Expand "More..." button for related procedures if it exists
             more_button_jsf_id = detailed_data.get('jsf_components', {}).get('more_button')
-            if more_button_jsf_id:
+            if more_button_jsf_id and related_procedures is not None:
+                self._use_cached_related_procedures(detailed_data, related_procedures)
+            elif more_button_jsf_id:
                 self.logger.info(f"  Expanding 'More...' button for {procedure_code}")
                 expanded_related = self.expand_more_related_procedures(more_button_jsf_id, procedure_code)
 
@@ -1233,17 +2876,170 @@ class UnitedConcordiaPortalScraper:
 
             return detailed_data
 
+        except SessionExpired:
+            raise
         except Exception as e:
             self.logger.error(f"Failed to get comprehensive procedure detail: {e}")
             return None
 
+    def _submit_procedure_detail(self, procedure_code, jsf_id, related_procedures=None):
+        """Pipelined get_comprehensive_procedure_detail: send the detail (and More...) requests here,
+        parse on the parse thread. Returns a Future of the detailed data, or None when the request failed"""
+        try:
+            self.logger.info(f"    Requesting detailed info for {procedure_code} with JSF ID: {jsf_id}")
+
+            verified = self._request_procedure_detail(procedure_code, jsf_id)
+            if verified is None:
+                return None
+            decoded, returned_proc_code = verified
+
+            # The next request only depends on the navigation buttons, so read those without parsing
+            more_button_jsf_id, back_button_id = self._detail_navigation_ids(decoded.first_payload or '')
+            self.nav_state.learn_back_button(back_button_id)
+            more_html = None
+            if not more_button_jsf_id:
+                related_procedures = None
+            elif related_procedures is None:
+                self.logger.info(f"  Expanding 'More...' button for {procedure_code}")
+                more_html = self._request_more_related_procedures(more_button_jsf_id, procedure_code)
+
+            return self._parse_executor.submit(
+                self._parse_procedure_detail, decoded, procedure_code, returned_proc_code, more_html, related_procedures
+            )
+
+        except SessionExpired:
+            raise
+        except Exception as e:
+            self.logger.error(f"Failed to get comprehensive procedure detail: {e}")
+            return None
+
+    def _parse_procedure_detail(self, decoded, procedure_code, returned_proc_code, more_html, related_procedures=None):
+        """Parse-thread half of _submit_procedure_detail; touches no session or navigation state"""
+        detailed_data = self.parse_comprehensive_procedure_response(decoded, procedure_code)
+        detailed_data['verified_procedure_code'] = returned_proc_code
+        if related_procedures is not None:
+            self._use_cached_related_procedures(detailed_data, related_procedures)
+        elif more_html:
+            expanded_related = self._related_procedure_links(more_html)
+            if expanded_related:
+                detailed_data['related_procedures'] = expanded_related
+        return detailed_data
+
+    def _detail_navigation_ids(self, html_content):
+        """(more_button, back_button) JSF IDs of a procedure detail response, read with regexes.
+        Same buttons as _parse_related_procedures/_parse_jsf_components find in the parsed tree"""
+        more_button_jsf_id = None
+        for section in extract_element_html(html_content, 'div', 'proc-related-procedures')[:1]:
+            for attributes, link_html in self.LINK_PATTERN.findall(section):
+                text = unescape(re.sub(r'<[^>]*>|\s+', '', link_html))
+                if 'more' in text.lower() and '...' in text:
+                    more_button_jsf_id = self._onclick_target(attributes)
+                    break
+
+        back_match = self.BACK_BUTTON_PATTERN.search(html_content)
+        back_button_id = self._onclick_target(back_match.group(0)) if back_match else None
+        return more_button_jsf_id, back_button_id
+
+    def _onclick_target(self, tag_html):
+        """JSF ID a link clicks via getElementById in its onclick attribute"""
+        onclick = self.ONCLICK_PATTERN.search(tag_html)
+        if not onclick:
+            return None
+        target = self.ONCLICK_TARGET_PATTERN.search(unescape(onclick.group(1) or onclick.group(2)))
+        return target.group(1) if target else None
+
+    def _request_procedure_detail(self, procedure_code, jsf_id, max_retries=None):
+        """POST the detail click until the response shows the requested procedure (RetryPolicy).
+        Returns (decoded, returned_proc_code), or None after giving up"""
+        form_name = jsf_id.split(':')[0]
+        max_attempts = max_retries or self.retry_policy.max_attempts
+
+        for attempt in range(max_attempts):
+            self._wait_for_circuit_breaker()
+            optimistic = self.nav_state.is_optimistic_detail()
+
+            payload = self._jsf_ajax_payload(form_name, jsf_id, "ben-summary-2")
+
+            self.logger.info(f"    Making POST request for {procedure_code} (attempt {attempt + 1}/{max_attempts})")
+            self.metrics.pending_attempt = attempt
+            try:
+                response = self.session.post(self.SUBSCRIBER_URL, data=payload)
+                failure = self._classify_detail_response(response.status_code, response.text)
+            except requests.RequestException as e:
+                self.metrics.pending_attempt = 0
+                self.logger.warning(f"    Request error for {procedure_code}: {e}")
+                failure = RetryPolicy.SERVER_ERROR
+
+            if failure is None:
+                decoded, returned_proc_code = self._check_procedure_detail_response(
+                    response.text, procedure_code, optimistic, attempt
+                )
+                if returned_proc_code == procedure_code:
+                    break
+                failure = RetryPolicy.MISMATCH
+
+            delay = self._detail_retry_delay(failure, attempt, max_attempts, optimistic)
+            if delay is None:
+                if failure == RetryPolicy.SESSION_EXPIRED:
+                    raise SessionExpired(f"Session expired while fetching {procedure_code}")
+                return None
+            self._pause(delay)
+            if failure == RetryPolicy.MISMATCH:
+                self._click_back_to_benefits_view()
+            elif failure == RetryPolicy.SESSION_EXPIRED and not self._recover_session():
+                raise SessionExpired(f"Session expired while fetching {procedure_code} and could not be recovered")
+
+        return decoded, returned_proc_code
+
+    def _check_procedure_detail_response(self, response_text, procedure_code, optimistic, attempt):
+        """Decode a procedure detail response and update the navigation state from it
+
+        Returns (decoded, returned_proc_code); a mismatch means the caller should reset and retry"""
+        # Update ViewState
+        decoded = decode_partial_response(response_text)
+        if self._apply_viewstate(decoded):
+            self.logger.info(f"    Updated ViewState for {procedure_code}")
+        else:
+            self.logger.warning(f"    No ViewState update found for {procedure_code}")
+
+        # CRITICAL: Verify we got the correct procedure in the response
+        returned_proc_code = self._extract_procedure_code_from_response(decoded)
+
+        if returned_proc_code:
+            self.nav_state.on_procedure_detail()
+
+        if returned_proc_code == procedure_code:
+            self.logger.info(f"    ✓ Verified: Response contains correct procedure {procedure_code}")
+            if optimistic:
+                self.logger.info(f"    Server navigates between procedures without a reset - skipping resets this session")
+                self.nav_state.detail_needs_reset = False
+        else:
+            self.logger.warning(f"    ✗ Mismatch: Expected {procedure_code}, got {returned_proc_code} (attempt {attempt + 1})")
+            if optimistic:
+                # Server stayed on the previous procedure - it needs a reset between procedures
+                self.logger.info(f"    Server requires 'Back to Benefits View' between procedures")
+                self.nav_state.detail_needs_reset = True
+            else:
+                self.nav_state.mark_diverged()
+        return decoded, returned_proc_code
+
+    def _procedure_detail_data(self, decoded, procedure_code, returned_proc_code):
+        """Parse a verified procedure detail response"""
+        detailed_data = self.parse_comprehensive_procedure_response(decoded, procedure_code)
+
+        # Add the verified procedure code to the data
+        detailed_data['verified_procedure_code'] = returned_proc_code
+        self.nav_state.learn_back_button(detailed_data.get('jsf_components', {}).get('back_button'))
+        return detailed_data
+
     def _extract_procedure_code_from_response(self, xml_content):
         """Extract the actual procedure code from the response to verify correct navigation"""
         try:
             # Look for the procedure header like: <h2 class="h4">D0120: Periodic Evaluation</h2>
-            cdata_match = re.search(r'<!\[CDATA\[(.*?)\]\]>', xml_content, re.DOTALL)
-            if cdata_match:
-                html_content = cdata_match.group(1)
+            if not isinstance(xml_content, PartialResponse):
+                xml_content = decode_partial_response(xml_content)
+            html_content = xml_content.first_payload
+            if html_content:
                 # Extract procedure code from header
                 header_match = re.search(r'<h2[^>]*>(D\d{4}):', html_content)
                 if header_match:
@@ -1257,59 +3053,49 @@ class UnitedConcordiaPortalScraper:
         """Click 'Back to Benefits View' button to reset JSF state between procedure navigations"""
         try:
             # Based on HAR analysis: j_id_oo:j_id_op is the "Back to Benefits View" button
-            payload = {
-                "j_id_oo_SUBMIT": "1",
-                "javax.faces.ViewState": self.current_viewstate,
-                "javax.faces.behavior.event": "action",
-                "javax.faces.partial.event": "click",
-                "javax.faces.source": "j_id_oo:j_id_op",
-                "javax.faces.partial.ajax": "true",
-                "javax.faces.partial.execute": "j_id_oo:j_id_op",
-                "javax.faces.partial.render": "ben-summary-2",
-                "j_id_oo": "j_id_oo"
-            }
-
-            response = self.session.post(
-                "https://www.unitedconcordia.com/tuctpi/subscriber.xhtml",
-                data=payload,
-                headers={
-                    'Content-Type': 'application/x-www-form-urlencoded; charset=UTF-8',
-                    'X-Requested-With': 'XMLHttpRequest',
-                    'Faces-Request': 'partial/ajax'
-                }
-            )
+            back_id = self.nav_state.back_button_id
+            payload = self._jsf_ajax_payload(back_id.split(':')[0], back_id, "ben-summary-2")
+            self.nav_state.resets_issued += 1
 
-            if response.status_code == 200:
-                # Update ViewState
-                viewstate_match = re.search(r'<update id="j_id__v_0:javax\.faces\.ViewState:\d+"><!\[CDATA\[(.*?)\]\]></update>', response.text, re.DOTALL)
-                if viewstate_match:
-                    self.current_viewstate = viewstate_match.group(1).strip()
-                    self.logger.info(f"    ✓ Successfully clicked 'Back to Benefits View' and updated ViewState")
-                    return True
-                else:
-                    self.logger.warning(f"    Back navigation succeeded but ViewState not updated")
-                    return True
-            else:
-                self.logger.error(f"    Failed to click 'Back to Benefits View': {response.status_code}")
-                return False
+            response = self.session.post(self.SUBSCRIBER_URL, data=payload, headers=self.AJAX_HEADERS)
+            return self._handle_back_response(response.status_code, response.text)
 
         except Exception as e:
             self.logger.error(f"Failed to click back button: {e}")
             return False
 
+    def _handle_back_response(self, status_code, response_text):
+        if status_code == 200:
+            self.nav_state.on_benefits_view()
+            # Update ViewState
+            if self._apply_viewstate(decode_partial_response(response_text)):
+                self.logger.info(f"    ✓ Successfully clicked 'Back to Benefits View' and updated ViewState")
+            else:
+                self.logger.warning(f"    Back navigation succeeded but ViewState not updated")
+            return True
+        self.logger.error(f"    Failed to click 'Back to Benefits View': {status_code}")
+        return False
+
     def parse_comprehensive_procedure_response(self, xml_content, procedure_code):
         """Parse ALL sections from the procedure detail response"""
         try:
             self.logger.info(f"    Parsing response for {procedure_code}")
 
             # Extract CDATA content
-            cdata_match = re.search(r'<!\[CDATA\[(.*?)\]\]>', xml_content, re.DOTALL)
-            if not cdata_match:
+            if not isinstance(xml_content, PartialResponse):
+                xml_content = decode_partial_response(xml_content)
+            html_content = xml_content.first_payload
+            if html_content is None:
                 self.logger.warning(f"    No CDATA found in response for {procedure_code}")
                 return {}
 
-            html_content = cdata_match.group(1)
-            soup = BeautifulSoup(html_content, 'html.parser')
+            # CDT entries already in the shared dictionary are not parsed again
+            dictionary_known = self.procedure_dictionary is not None and procedure_code in self.procedure_dictionary
+
+            if self.parse_fast_path:
+                soup = self._detail_fragment_soup(html_content, skip_dictionary=dictionary_known)
+            else:
+                soup = self._soup(html_content)
 
             self.logger.info(f"    Parsing HTML content for {procedure_code}, length: {len(html_content)}")
             
@@ -1339,7 +3125,8 @@ class UnitedConcordiaPortalScraper:
             self._parse_policy_details(soup, detailed_data)
             
             # 6. Extract Procedure Dictionary
-            self._parse_procedure_dictionary(soup, detailed_data)
+            if not dictionary_known:
+                self._parse_procedure_dictionary(soup, detailed_data)
             
             # 7. Extract JSF Component IDs (for navigation)
             self._parse_jsf_components(soup, detailed_data)
@@ -1497,65 +3284,52 @@ class UnitedConcordiaPortalScraper:
 
     def expand_more_related_procedures(self, more_jsf_id, procedure_code):
         """Expand the 'More...' button to get all related procedures"""
+        html_content = self._request_more_related_procedures(more_jsf_id, procedure_code)
+        if html_content is None:
+            return []
+        return self._related_procedure_links(html_content)
+
+    def _request_more_related_procedures(self, more_jsf_id, procedure_code):
+        """Click 'More...' and apply the new ViewState; returns the related procedures HTML, None on failure"""
         try:
             self.logger.info(f"    Expanding More button for {procedure_code}")
 
-            form_name = more_jsf_id.split(':')[0]
-            payload = {
-                f"{form_name}_SUBMIT": "1",
-                "javax.faces.ViewState": self.current_viewstate,
-                "javax.faces.behavior.event": "action",
-                "javax.faces.partial.event": "click",
-                "javax.faces.source": more_jsf_id,
-                "javax.faces.partial.ajax": "true",
-                "javax.faces.partial.execute": more_jsf_id,
-                "javax.faces.partial.render": "proc-related-procedures",
-                form_name: form_name
-            }
+            payload = self._jsf_ajax_payload(more_jsf_id.split(':')[0], more_jsf_id, "proc-related-procedures")
+            response = self.session.post(self.SUBSCRIBER_URL, data=payload, headers=self.AJAX_HEADERS)
 
-            response = self.session.post(
-                "https://www.unitedconcordia.com/tuctpi/subscriber.xhtml",
-                data=payload,
-                headers={
-                    'Content-Type': 'application/x-www-form-urlencoded; charset=UTF-8',
-                    'X-Requested-With': 'XMLHttpRequest',
-                    'Faces-Request': 'partial/ajax'
-                }
-            )
-            
             if response.status_code == 200:
-                # Update ViewState
-                viewstate_match = re.search(r'<update id="j_id__v_0:javax\.faces\.ViewState:\d+"><!\[CDATA\[(.*?)\]\]></update>', response.text, re.DOTALL)
-                if viewstate_match:
-                    self.current_viewstate = viewstate_match.group(1).strip()
-                
-                # Parse expanded related procedures
-                cdata_match = re.search(r'<!\[CDATA\[(.*?)\]\]>', response.text, re.DOTALL)
-                if cdata_match:
-                    html_content = cdata_match.group(1)
-                    soup = BeautifulSoup(html_content, 'html.parser')
-                    
-                    expanded_procedures = []
-                    procedure_links = soup.find_all('a', href='#')
-                    for link in procedure_links:
-                        text = link.get_text(strip=True)
-
-                        # Check if it's a procedure link (starts with D followed by 4 digits)
-                        if re.match(r'D\d{4}', text):
-                            expanded_procedures.append(
-                                text.replace('>', '').strip()
-                            )
-                    
-                    # Process expanded related procedures without saving debug files
-                    self.logger.info(f"    Found {len(expanded_procedures)} expanded related procedures")
-                    return expanded_procedures
-            
-            return []
-            
+                return self._more_related_html(response.text)
+            return None
+
         except Exception as e:
             self.logger.error(f"Failed to expand more related procedures: {e}")
-            return []
-    
+            return None
+
+    def _more_related_html(self, response_text):
+        # Update ViewState
+        decoded = decode_partial_response(response_text)
+        self._apply_viewstate(decoded)
+        return decoded.first_payload
+
+    def _related_procedure_links(self, html_content):
+        """Parse expanded related procedures"""
+        soup = self._soup(html_content)
+
+        expanded_procedures = []
+        procedure_links = soup.find_all('a', href='#')
+        for link in procedure_links:
+            text = link.get_text(strip=True)
+
+            # Check if it's a procedure link (starts with D followed by 4 digits)
+            if re.match(r'D\d{4}', text):
+                expanded_procedures.append(
+                    text.replace('>', '').strip()
+                )
+
+        # Process expanded related procedures without saving debug files
+        self.logger.info(f"    Found {len(expanded_procedures)} expanded related procedures")
+        return expanded_procedures
+
 if __name__ == "__main__":
     scraper = UnitedConcordiaPortalScraper()
 
@@ -1644,4 +3418,6 @@ if __name__ == "__main__":
     except Exception as e:
         print(f"Scraping failed: {e}")
         import traceback
-        traceback.print_exc()
\ No newline at end of file
+        traceback.print_exc()
+    finally:
+        scraper.close()
\ No newline at end of file
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Benchmark: JSF partial-response decoding
+Compares the old per-handler regex scans with decode_partial_response()
+over captured AJAX responses (e.g. category_expansion_*_response.xml)
+"""
+
+import argparse
+import glob
+import os
+import re
+import sys
+import time
+
+from APIScrapper_v3 import decode_partial_response
+
+VIEWSTATE_PATTERN = re.compile(r'<update id="j_id__v_0:javax\.faces\.ViewState:\d+"><!\[CDATA\[(.*?)\]\]></update>', re.DOTALL)
+CDATA_PATTERN = re.compile(r'<!\[CDATA\[(.*?)\]\]>', re.DOTALL)
+
+
+def legacy_scan(text):
+    """What each POST handler did before: ViewState regex, first CDATA, then all CDATA"""
+    viewstate_match = VIEWSTATE_PATTERN.search(text)
+    viewstate = viewstate_match.group(1).strip() if viewstate_match else None
+    first_match = CDATA_PATTERN.search(text)
+    first = first_match.group(1) if first_match else None
+    payloads = CDATA_PATTERN.findall(text)
+    return viewstate, first, payloads
+
+
+def decoder_scan(text):
+    decoded = decode_partial_response(text)
+    return decoded.viewstate, decoded.first_payload, decoded.payloads
+
+
+def synthetic_response(rows):
+    """Category-expansion-shaped response, for when no captures are available"""
+    body = "".join(
+        f'<tr><td>D{1000 + i}</td><td><a href="#" onclick="document.getElementById(\'j_id_n8:j_id_n9:0:j_id_ni:{i}:j_id_nm\').click()">'
+        f'Procedure {i} &gt;</a></td><td>Yes</td><td>$10.00</td><td>100%</td><td>2 per year</td><td>No</td><td>Yes</td></tr>'
+        for i in range(rows)
+    )
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?>\n<partial-response id="j_id__v_0"><changes>'
+        f'<update id="servicesGroup"><![CDATA[<table id="benefitDetailAllServiceProceduresList"><tbody>{body}</tbody></table>]]></update>'
+        '<update id="errorContainer"><![CDATA[<div></div>]]></update>'
+        f'<update id="j_id__v_0:javax.faces.ViewState:1"><![CDATA[{"x" * 4000}]]></update>'
+        '</changes></partial-response>'
+    )
+
+
+def time_it(func, responses, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        for text in responses:
+            func(text)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('paths', nargs='*', help="Captured response files or directories (default: *_response.xml here)")
+    parser.add_argument('--iterations', type=int, default=50)
+    parser.add_argument('--synthetic', type=int, metavar='ROWS',
+                        help="Benchmark a generated category response with ROWS procedures instead")
+    args = parser.parse_args()
+
+    if args.synthetic:
+        responses = [synthetic_response(args.synthetic)]
+    else:
+        files = []
+        for path in args.paths or ['.']:
+            if os.path.isdir(path):
+                files.extend(sorted(glob.glob(os.path.join(path, '*_response.xml'))))
+            else:
+                files.append(path)
+        if not files:
+            print("No captured responses found - pass files/directories or use --synthetic ROWS")
+            return 1
+        responses = []
+        for filename in files:
+            with open(filename, encoding='utf-8') as f:
+                responses.append(f.read())
+
+    # Both approaches must agree before timing means anything
+    mismatches = 0
+    for text in responses:
+        old_viewstate, old_first, old_payloads = legacy_scan(text)
+        new_viewstate, new_first, new_payloads = decoder_scan(text)
+        if (old_viewstate and old_viewstate != new_viewstate) or old_first != new_first or old_payloads != new_payloads:
+            mismatches += 1
+
+    total_bytes = sum(len(text) for text in responses)
+    legacy = time_it(legacy_scan, responses, args.iterations)
+    decoder = time_it(decoder_scan, responses, args.iterations)
+    per_pass = args.iterations * len(responses)
+
+    print(f"Responses: {len(responses)} ({total_bytes / 1024:.1f} KB), iterations: {args.iterations}")
+    print(f"Legacy regex scans:  {legacy * 1000 / per_pass:.3f} ms/response")
+    print(f"Partial decoder:     {decoder * 1000 / per_pass:.3f} ms/response")
+    print(f"Speedup:             {legacy / decoder:.2f}x")
+    print(f"Output mismatches:   {mismatches}")
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
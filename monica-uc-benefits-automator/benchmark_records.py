@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Benchmark: memory held by procedure records
+Compares plain dicts (what the parser returns) with uc_records.ProcedureRecord for the
+same records, measured with tracemalloc. Records are built from captured procedure
+detail responses (default: tests/fixtures/procedure_detail.xml), each copy decoded
+separately as every detail response is, with its own procedure code and name.
+"""
+
+import argparse
+import gc
+import json
+import logging
+import os
+import sys
+import tracemalloc
+
+from APIScrapper_v3 import UnitedConcordiaPortalScraper
+from uc_records import ProcedureRecord
+
+DEFAULT_CAPTURE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'tests', 'fixtures', 'procedure_detail.xml')
+
+
+def parsed_details(paths):
+    scraper = UnitedConcordiaPortalScraper()
+    scraper.logger.setLevel(logging.WARNING)
+    details = []
+    for path in paths:
+        with open(path, encoding='utf-8') as f:
+            details.append(scraper.parse_comprehensive_procedure_response(f.read(), 'benchmark'))
+    scraper.close()
+    return [json.dumps({key: value for key, value in detail.items() if key != 'jsf_components'}) for detail in details]
+
+
+def fresh_record(serialized, index, distinct_codes):
+    """One detail as the parser would return it: new str objects, own code and name"""
+    record = json.loads(serialized)
+    code = f"D{1000 + index % distinct_codes:04d}"
+    record['procedure_code'] = code
+    record['procedure_name'] = f"Procedure {code}"
+    return record
+
+
+def measure(build, count):
+    gc.collect()
+    tracemalloc.start()
+    held = build(count)
+    gc.collect()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del held
+    return current
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('captures', nargs='*', default=[DEFAULT_CAPTURE], help="Procedure detail responses (*.xml)")
+    parser.add_argument('--records', type=int, default=20000, help="Records to hold (e.g. 100 patients x 200 procedures)")
+    parser.add_argument('--distinct-codes', type=int, default=400, help="Different procedure codes among them")
+    args = parser.parse_args()
+
+    details = parsed_details(args.captures)
+
+    def as_dicts(count):
+        return [fresh_record(details[i % len(details)], i, args.distinct_codes) for i in range(count)]
+
+    def as_records(count):
+        return [ProcedureRecord.from_dict(fresh_record(details[i % len(details)], i, args.distinct_codes))
+                for i in range(count)]
+
+    dict_bytes = measure(as_dicts, args.records)
+    record_bytes = measure(as_records, args.records)
+
+    print(f"Captures: {len(details)}, records: {args.records}, distinct codes: {args.distinct_codes}")
+    print(f"dict records:      {dict_bytes / 1024 / 1024:8.2f} MB  ({dict_bytes / args.records:.0f} B/record)")
+    print(f"ProcedureRecord:   {record_bytes / 1024 / 1024:8.2f} MB  ({record_bytes / args.records:.0f} B/record)")
+    print(f"Ratio:             {dict_bytes / record_bytes:.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Golden-file check for the UC parsers
+Proves every HTML parser backend / fast path produces byte-identical output
+to the reference (html.parser, full tree) on captured portal responses.
+
+Captures are the responses saved during an extraction: category expansion and
+procedure detail partial responses (*.xml) and full benefits pages (*.html).
+tests/fixtures holds synthetic captures of each kind with their goldens
+(checked by tests/test_golden_parser.py).
+
+    python golden_parser_check.py fixtures/ --update   # write goldens from the reference parser
+    python golden_parser_check.py fixtures/            # compare every backend against them
+"""
+
+import argparse
+import glob
+import json
+import logging
+import os
+import sys
+import time
+
+from APIScrapper_v3 import UnitedConcordiaPortalScraper, LXML_AVAILABLE
+
+REFERENCE = ('html.parser', False)
+
+
+def backend_configurations():
+    configurations = [('html.parser', False), ('html.parser', True)]
+    if LXML_AVAILABLE:
+        configurations += [('lxml', False), ('lxml', True)]
+    return configurations
+
+
+def make_scraper(html_parser, fast_path):
+    scraper = UnitedConcordiaPortalScraper(html_parser=html_parser, parse_fast_path=fast_path)
+    scraper.logger.setLevel(logging.WARNING)
+    return scraper
+
+
+def parse_capture(scraper, text):
+    """Run the parser that matches this kind of capture and serialize its output"""
+    if 'procedureDetailInfoTable1' in text:
+        result = scraper.parse_comprehensive_procedure_response(text, 'golden')
+    elif 'benefitDetailAllServiceProceduresList' in text:
+        result = scraper._parse_category_procedures(text, 'golden')
+    else:
+        soup = scraper._soup(text)
+        result = {
+            'benefits_summary': scraper.parse_benefits_summary(soup),
+            'category_sections': scraper._find_category_sections(soup)
+        }
+    return json.dumps(result, indent=2, sort_keys=True, ensure_ascii=False).encode('utf-8')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('fixtures', help="Directory of captured *.xml / *.html responses")
+    parser.add_argument('--update', action='store_true', help="(Re)write the .golden files from the reference parser")
+    args = parser.parse_args()
+
+    captures = sorted(glob.glob(os.path.join(args.fixtures, '*.xml')) + glob.glob(os.path.join(args.fixtures, '*.html')))
+    if not captures:
+        print(f"No captured responses in {args.fixtures}")
+        return 1
+
+    scrapers = {configuration: make_scraper(*configuration) for configuration in backend_configurations()}
+    timings = {configuration: 0.0 for configuration in scrapers}
+    failures = 0
+
+    for capture in captures:
+        with open(capture, encoding='utf-8') as f:
+            text = f.read()
+        golden_path = capture + '.golden'
+
+        if args.update:
+            with open(golden_path, 'wb') as f:
+                f.write(parse_capture(scrapers[REFERENCE], text))
+            print(f"wrote {golden_path}")
+            continue
+
+        if not os.path.exists(golden_path):
+            print(f"MISSING  {golden_path} (run with --update)")
+            failures += 1
+            continue
+        with open(golden_path, 'rb') as f:
+            golden = f.read()
+
+        for configuration, scraper in scrapers.items():
+            start = time.perf_counter()
+            output = parse_capture(scraper, text)
+            timings[configuration] += time.perf_counter() - start
+            if output != golden:
+                print(f"DIFF     {os.path.basename(capture)} [{configuration[0]}, fast_path={configuration[1]}]")
+                failures += 1
+
+    if not args.update:
+        print(f"\n{len(captures)} captures, {failures} differences")
+        for (html_parser, fast_path), elapsed in timings.items():
+            print(f"  {html_parser:<12} fast_path={str(fast_path):<5} {elapsed * 1000:8.1f} ms")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -8,81 +8,27 @@ import tkinter as tk
 from tkinter import ttk, scrolledtext, messagebox
 import threading
 import logging
+import os
+import queue
+import time
 from datetime import datetime
-from APIScrapper_v3 import UnitedConcordiaPortalScraper
+from APIScrapper_v3 import (UnitedConcordiaPortalScraper, ExtractionCancelled, ProgressEvent, DEFAULT_SESSION_FILE,
+                            LEVEL_SUMMARY, LEVEL_CATEGORIES, LEVEL_FULL)
 import sys
 
-class CleanLogHandler(logging.Handler):
-    """Handler that creates clean, user-friendly log messages"""
+# The extraction thread never touches Tk: it (and the scraper) put ProgressEvents on a queue
+# that the Tk thread drains on a timer, at most MAX_EVENTS_PER_POLL per tick
+EVENT_POLL_MS = 100
+MAX_EVENTS_PER_POLL = 500
 
-    def __init__(self, log_widget):
-        super().__init__()
-        self.log_widget = log_widget
-        self.current_category = None
-        self.procedure_count = 0
-
-    def emit(self, record):
-        msg = record.getMessage()
-
-        # Filter and simplify messages
-        clean_msg = None
-
-        if "OAuth authentication" in msg:
-            clean_msg = "🔐 Logging into United Concordia portal..."
-        elif "OAuth login successful" in msg:
-            clean_msg = "✅ Login successful!"
-        elif "Navigating to benefits portal" in msg:
-            clean_msg = "🚀 Navigating to benefits portal..."
-        elif "SUCCESS: Direct OAM POST successful" in msg:
-            clean_msg = "✅ Successfully accessed portal"
-        elif "Searching for patient" in msg:
-            clean_msg = f"🔍 Searching for patient..."
-        elif "Success indicator found" in msg and "member name" in msg:
-            clean_msg = "✅ Patient found! Loading benefits data..."
-        elif "Extracting benefits summary" in msg:
-            clean_msg = "📊 Extracting benefits summary (Network, Patient Info, Policy)..."
-        elif "Extracted 5 summary sections" in msg or "Extracted" in msg and "summary sections" in msg:
-            clean_msg = "✅ Benefits summary extracted successfully"
-        elif "Processing category" in msg:
-            import re
-            match = re.search(r"category (\d+)/(\d+): '([^']+)'", msg)
-            if match:
-                num, total, name = match.groups()
-                self.current_category = name
-                clean_msg = f"\n📁 Category {num}/{total}: {name}"
-        elif "Found" in msg and "procedures in target category" in msg:
-            import re
-            match = re.search(r"Found (\d+) procedures", msg)
-            if match:
-                count = match.group(1)
-                clean_msg = f"   ➜ Found {count} procedures in this category"
-        elif "Getting detailed info for" in msg and "(index" in msg:
-            import re
-            match = re.search(r"for ([A-Z0-9]+) \(index (\d+)\): (.+)", msg)
-            if match:
-                code, idx, name = match.groups()
-                self.procedure_count += 1
-                clean_msg = f"   ⚙️  Extracting {code}: {name}"
-        elif "✓ Got comprehensive data for" in msg:
-            import re
-            match = re.search(r"for ([A-Z0-9]+)", msg)
-            if match:
-                code = match.group(1)
-                clean_msg = f"   ✅ {code} complete"
-        elif "✓ Category" in msg and "complete:" in msg:
-            import re
-            match = re.search(r"'([^']+)' complete: (\d+) procedures", msg)
-            if match:
-                name, count = match.groups()
-                clean_msg = f"✅ {name}: {count} procedures extracted\n"
-        elif "ALL CATEGORIES EXTRACTION COMPLETE" in msg:
-            clean_msg = "\n🎉 ✅ EXTRACTION COMPLETE! All data saved successfully."
-
-        if clean_msg:
-            timestamp = datetime.now().strftime('%H:%M:%S')
-            self.log_widget.insert(tk.END, f"[{timestamp}] {clean_msg}\n")
-            self.log_widget.see(tk.END)
-            self.log_widget.update()
+# Opt-in (UC_WARMUP=1): Enter in the password field logs in and opens the benefits portal in
+# the background, so Start only pays for the patient search and extraction. Never automatic,
+# and never for the credentials the form is pre-filled with.
+# A warm session older than WARMUP_MAX_AGE seconds is not used (the portal may have dropped it)
+WARMUP_ENABLED = os.environ.get('UC_WARMUP') == '1'
+WARMUP_MAX_AGE = 15 * 60
+# How often Start, waiting on a warm-up still logging in, checks for Cancel
+WARMUP_POLL_SECONDS = 0.2
 
 class BenefitsExtractorGUI:
     def __init__(self, root):
@@ -124,6 +70,9 @@ class BenefitsExtractorGUI:
         self.password_entry = ttk.Entry(cred_frame, show="*", width=40)
         self.password_entry.insert(0, "SmileyTooth4771!")
         self.password_entry.grid(row=1, column=1, sticky=(tk.W, tk.E), padx=5, pady=5)
+        self.password_entry.bind('<Return>', self.warm_up)
+        # Built-in defaults: a warm-up only starts for credentials the user entered
+        self.default_credentials = (self.username_entry.get().strip(), self.password_entry.get().strip())
 
         # Patient Info Section
         patient_frame = ttk.LabelFrame(main_frame, text="Patient Information", padding="10")
@@ -140,6 +89,16 @@ class BenefitsExtractorGUI:
         self.dob_entry.insert(0, "02/17/2010")
         self.dob_entry.grid(row=1, column=1, sticky=(tk.W, tk.E), padx=5, pady=5)
 
+        ttk.Label(patient_frame, text="Detail Level:").grid(row=2, column=0, sticky=tk.W, pady=5)
+        self.level_options = {
+            "Full detail (all procedures)": LEVEL_FULL,
+            "Category tables (fast)": LEVEL_CATEGORIES,
+            "Benefits summary only": LEVEL_SUMMARY
+        }
+        self.level_combo = ttk.Combobox(patient_frame, values=list(self.level_options), state='readonly', width=37)
+        self.level_combo.current(0)
+        self.level_combo.grid(row=2, column=1, sticky=(tk.W, tk.E), padx=5, pady=5)
+
         # Progress Section
         self.progress_label = ttk.Label(main_frame, text="Ready to extract",
                                        font=('Arial', 10))
@@ -177,12 +136,23 @@ class BenefitsExtractorGUI:
 
         self.running = False
 
+        self.events = queue.Queue()
+        # Set by Cancel; the scraper stops after the request in flight and saves partial results
+        self.cancel_event = threading.Event()
+        self.current_category = None
+        self.procedures_done = 0
+        self.root.after(EVENT_POLL_MS, self.drain_events)
+
+        # Background login started by Enter in the password field (UC_WARMUP=1), taken over by Start
+        self.warmup = None
+
     def start_extraction(self):
         # Validate inputs
         username = self.username_entry.get().strip()
         password = self.password_entry.get().strip()
         member_id = self.member_id_entry.get().strip()
         dob = self.dob_entry.get().strip()
+        level = self.level_options[self.level_combo.get()]
 
         if not all([username, password, member_id, dob]):
             messagebox.showerror("Error", "All fields are required!")
@@ -196,73 +166,250 @@ class BenefitsExtractorGUI:
         # Clear logs
         self.log_text.delete(1.0, tk.END)
         self.log_text.insert(tk.END, "🚀 Starting extraction...\n\n")
+        self.current_category = None
+        self.procedures_done = 0
+        self.cancel_event = threading.Event()
 
         # Start progress bar
         self.progress_bar.start()
 
         # Run extraction in thread
+        warmup = self.take_warmup(username, password)
         thread = threading.Thread(target=self.run_extraction,
-                                 args=(username, password, member_id, dob))
+                                 args=(username, password, member_id, dob, level, self.cancel_event, warmup))
         thread.daemon = True
         thread.start()
 
-    def run_extraction(self, username, password, member_id, dob):
+    def run_extraction(self, username, password, member_id, dob, level=LEVEL_FULL, cancel_event=None, warmup=None):
+        """Extraction thread: reports only through self.events"""
+        scraper = None
         try:
-            # Setup logging
-            log_handler = CleanLogHandler(self.log_text)
-            log_handler.setLevel(logging.INFO)
-
-            scraper = UnitedConcordiaPortalScraper()
-            scraper.logger.addHandler(log_handler)
-            scraper.logger.setLevel(logging.INFO)
+            scraper = self.warm_scraper(warmup, cancel_event)
+            if scraper:
+                scraper.cancel_event = cancel_event
+                self.update_status("Using warm portal session...", "🔥 Using the portal session warmed up in the background")
+            else:
+                scraper = UnitedConcordiaPortalScraper(session_file=DEFAULT_SESSION_FILE, progress=self.events,
+                                                       cancel_event=cancel_event)
+                # Progress comes from events; INFO logging of every request only slows the run down
+                scraper.logger.setLevel(logging.WARNING)
 
-            # Run extraction
-            self.update_status("Authenticating...")
-            scraper.authenticate(username, password)
+                # Run extraction
+                self.update_status("Authenticating...", "🔐 Logging into United Concordia portal...")
+                scraper.authenticate(username, password)
 
-            self.update_status("Navigating to portal...")
-            if not scraper.navigate_to_benefits_portal():
-                raise Exception("Failed to navigate to portal")
+                self.update_status("Navigating to portal...", "🚀 Navigating to benefits portal...")
+                if not scraper.navigate_to_benefits_portal():
+                    raise Exception("Failed to navigate to portal")
 
-            self.update_status("Searching for patient...")
+            self.update_status("Searching for patient...", "🔍 Searching for patient...")
             if not scraper.search_patient(member_id, dob):
                 raise Exception("Patient not found")
 
-            self.update_status("Extracting benefits data...")
-            results = scraper.extract_all_categories_data()
-
-            if results:
-                summary = results.get('extraction_summary', {})
-                self.update_status("✅ Extraction Complete!")
-                messagebox.showinfo(
-                    "Success",
-                    f"Extraction Complete!\n\n"
-                    f"Categories: {summary.get('total_categories_processed', 0)}\n"
-                    f"Procedures: {summary.get('total_procedures_extracted', 0)}\n\n"
-                    f"Saved to: mypatientbenefitssummary.json"
-                )
-            else:
+            self.update_status("Extracting benefits data...",
+                               "✅ Patient found! Loading benefits data...\n"
+                               "📊 Extracting benefits summary (Network, Patient Info, Policy)...")
+            results = scraper.extract_all_categories_data(level=level)
+            if not results:
                 raise Exception("Extraction failed")
+            self.post('finished', summary=results.get('extraction_summary', {}))
 
+        except ExtractionCancelled:
+            # Cancelled before the extraction itself started - nothing to save
+            self.post('finished', summary={'cancelled': True})
         except Exception as e:
-            self.log_text.insert(tk.END, f"\n❌ ERROR: {str(e)}\n")
-            messagebox.showerror("Error", str(e))
+            self.post('finished', error=str(e))
         finally:
-            self.progress_bar.stop()
-            self.start_button.config(state='normal')
-            self.cancel_button.config(state='disabled')
-            self.running = False
+            if scraper:
+                scraper.close()
+
+    def warm_up(self, _event=None):
+        """Enter in the password field: start a background login for the credentials in the form
+        (UC_WARMUP=1 only, and not for the built-in defaults)"""
+        credentials = (self.username_entry.get().strip(), self.password_entry.get().strip())
+        if not WARMUP_ENABLED or self.running or not all(credentials):
+            return
+        if credentials == self.default_credentials:
+            self.post('status', text=None, log="ℹ️  Warm-up skipped: enter your own portal credentials first")
+            return
+        if self.warmup and self.warmup['credentials'] == credentials:
+            return
+        if self.warmup:
+            self.discard_warmup(self.warmup)
+        self.warmup = {'credentials': credentials, 'started': time.time(), 'scraper': None,
+                       'discarded': False, 'lock': threading.Lock()}
+        self.warmup['thread'] = threading.Thread(target=self.run_warmup, args=(self.warmup,), daemon=True)
+        self.warmup['thread'].start()
+
+    def run_warmup(self, warmup):
+        """Warm-up thread: authenticate and open the benefits portal; reports only through self.events"""
+        scraper = None
+        try:
+            scraper = UnitedConcordiaPortalScraper(session_file=DEFAULT_SESSION_FILE, progress=self.events)
+            scraper.logger.setLevel(logging.WARNING)
+            scraper.authenticate(*warmup['credentials'])
+            if not scraper.navigate_to_benefits_portal():
+                raise Exception("Failed to navigate to portal")
+            with warmup['lock']:
+                if not warmup['discarded']:
+                    warmup['scraper'], scraper = scraper, None
+            if scraper:
+                # Replaced or cancelled while logging in
+                scraper.close()
+                return
+            self.post('status', text=None, log="🔥 Portal session warmed up - Start goes straight to the patient search")
+        except Exception as e:
+            if scraper:
+                scraper.close()
+            self.post('status', text=None, log=f"⚠️  Background warm-up failed ({e}); Start will log in as usual")
+
+    def discard_warmup(self, warmup):
+        """Drop a warm-up that will not be used, closing its session (now, or when its login finishes)"""
+        with warmup['lock']:
+            warmup['discarded'] = True
+            scraper, warmup['scraper'] = warmup['scraper'], None
+        if scraper:
+            scraper.close()
+
+    def take_warmup(self, username, password):
+        """Hand the warm-up for these credentials to an extraction (each warm session is used once)"""
+        warmup, self.warmup = self.warmup, None
+        if warmup and warmup['credentials'] == (username, password):
+            return warmup
+        if warmup:
+            self.discard_warmup(warmup)
+        return None
+
+    def warm_scraper(self, warmup, cancel_event=None):
+        """Extraction thread: the warmed-up scraper, waiting for a warm-up still in progress
+        (ExtractionCancelled if Cancel is pressed meanwhile), or None to log in from scratch"""
+        if not warmup:
+            return None
+        while warmup['thread'].is_alive():
+            if cancel_event and cancel_event.is_set():
+                self.discard_warmup(warmup)
+                raise ExtractionCancelled()
+            warmup['thread'].join(WARMUP_POLL_SECONDS)
+        if time.time() - warmup['started'] > WARMUP_MAX_AGE:
+            self.discard_warmup(warmup)
+            return None
+        return warmup['scraper']
+
+    def post(self, kind, **data):
+        self.events.put(ProgressEvent(kind, data, time.time()))
+
+    def update_status(self, text, log_message=None):
+        """Thread-safe: the status label and log are updated by drain_events"""
+        self.post('status', text=text, log=log_message)
+
+    def drain_events(self):
+        """Tk timer: apply queued events in one batch, then re-arm"""
+        lines = []
+        status = None
+        try:
+            for _ in range(MAX_EVENTS_PER_POLL):
+                event = self.events.get_nowait()
+                line, event_status = self.describe_event(event)
+                if line:
+                    lines.append(f"[{datetime.fromtimestamp(event.timestamp).strftime('%H:%M:%S')}] {line}\n")
+                status = event_status or status
+                if event.kind == 'finished':
+                    self.finish_extraction(event.data, lines)
+                    lines, status = [], None
+        except queue.Empty:
+            pass
+
+        if lines:
+            self.log_text.insert(tk.END, ''.join(lines))
+            self.log_text.see(tk.END)
+        if status:
+            self.progress_label.config(text=status)
+        self.root.after(EVENT_POLL_MS, self.drain_events)
+
+    def describe_event(self, event):
+        """(log line or None, status label text or None) for one event"""
+        data = event.data
+        if event.kind == 'status':
+            return data['log'], data['text']
+        if event.kind == 'benefits_summary':
+            return "✅ Benefits summary extracted successfully", None
+        if event.kind == 'category_started':
+            self.current_category = f"Category {data['index'] + 1}/{data['total']}: {data['name']}"
+            return f"\n📁 {self.current_category}", self.category_status()
+        if event.kind == 'category_table':
+            return f"   ➜ Found {data['procedures']} procedures in this category", None
+        if event.kind == 'procedure_started':
+            return f"   ⚙️  Extracting {data['code']}: {data['name']}", None
+        if event.kind == 'procedure_done':
+            self.procedures_done += 1
+            return (f"   ✅ {data['code']} complete" if data['has_details'] else None), self.category_status()
+        if event.kind == 'category_done':
+            return f"✅ {data['name']}: {data['procedures']} procedures extracted\n", None
+        if event.kind == 'extraction_complete':
+            return "\n🎉 ✅ EXTRACTION COMPLETE! All data saved successfully.", None
+        if event.kind == 'extraction_cancelled':
+            return (f"\n⚠️  Extraction cancelled - partial results saved "
+                    f"({data['categories']} categories, {data['procedures']} procedures)"), None
+        return None, None
+
+    def category_status(self):
+        return f"{self.current_category} · {self.procedures_done} procedures extracted"
+
+    def finish_extraction(self, data, lines):
+        """Runs on the Tk thread once the extraction thread is done"""
+        if lines:
+            self.log_text.insert(tk.END, ''.join(lines))
+            self.log_text.see(tk.END)
+        self.progress_bar.stop()
+        self.start_button.config(state='normal')
+        self.cancel_button.config(state='disabled')
+        self.running = False
+
+        if 'error' in data:
+            self.log_text.insert(tk.END, f"\n❌ ERROR: {data['error']}\n")
+            self.progress_label.config(text="Extraction failed")
+            messagebox.showerror("Error", data['error'])
+            return
 
-    def update_status(self, text):
-        self.progress_label.config(text=text)
-        self.root.update()
+        summary = data['summary']
+        if summary.get('cancelled'):
+            self.progress_label.config(text="Extraction cancelled")
+            if 'total_procedures_extracted' in summary:
+                messagebox.showinfo(
+                    "Cancelled",
+                    f"Extraction cancelled.\n\n"
+                    f"Partial results ({summary['total_procedures_extracted']} procedures) "
+                    f"saved to: mypatientbenefitssummary.json"
+                )
+            return
+
+        failed = summary.get('failed_categories') or []
+        if failed:
+            self.progress_label.config(text="⚠️ Extraction incomplete")
+            messagebox.showwarning(
+                "Incomplete",
+                f"Extraction finished, but {len(failed)} categories could not be extracted:\n"
+                f"{', '.join(failed)}\n\n"
+                f"Partial results saved to: mypatientbenefitssummary.json"
+            )
+            return
+
+        self.progress_label.config(text="✅ Extraction Complete!")
+        messagebox.showinfo(
+            "Success",
+            f"Extraction Complete!\n\n"
+            f"Categories: {summary.get('total_categories_processed', 0)}\n"
+            f"Procedures: {summary.get('total_procedures_extracted', 0)}\n\n"
+            f"Saved to: mypatientbenefitssummary.json"
+        )
 
     def cancel_extraction(self):
-        self.running = False
-        self.progress_bar.stop()
-        self.start_button.config(state='normal')
+        """Ask the scraper to stop; buttons are reset when its 'finished' event arrives"""
+        self.cancel_event.set()
         self.cancel_button.config(state='disabled')
-        self.log_text.insert(tk.END, "\n⚠️  Extraction cancelled by user\n")
+        self.progress_label.config(text="Cancelling...")
+        self.log_text.insert(tk.END, "\n⚠️  Extraction cancelled by user - stopping after the current request\n")
+        self.log_text.see(tk.END)
 
 if __name__ == "__main__":
     root = tk.Tk()
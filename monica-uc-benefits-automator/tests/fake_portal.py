@@ -0,0 +1,324 @@
+"""
+Scripted stand-in for the UC portal, so whole extractions run offline in the tests
+Serves the OAuth login, the patient search, the benefits page and the JSF partial
+responses the scraper drives (category expansion, procedure detail, More...,
+Back to Benefits View), with the same element IDs as the synthetic captures in
+tests/fixtures. Every request is logged as (action, detail) in FakePortal.requests.
+
+    python tests/fake_portal.py   # re-record tests/fixtures/replay_session
+"""
+
+import json
+import os
+import sys
+from urllib.parse import parse_qsl
+
+from requests.adapters import BaseAdapter
+from requests.models import Response
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(TESTS_DIR))
+
+from APIScrapper_v3 import UnitedConcordiaPortalScraper  # noqa: E402
+from uc_records import to_json  # noqa: E402
+from uc_replay import record_session, run_extraction, save_manifest  # noqa: E402
+
+# Synthetic uc_replay recording of this portal (regenerate with: python tests/fake_portal.py)
+REPLAY_FIXTURE_DIR = os.path.join(TESTS_DIR, 'fixtures', 'replay_session')
+EXPECTED_RESULTS_FILE = 'expected_results.json'
+
+# (category name, procedure codes in table order); D0120 is listed in two categories
+CATEGORIES = [
+    ("Diagnostic & Preventive", ["D0120", "D0140", "D0150"]),
+    ("Radiographs", ["D0210", "D0220", "D0120"]),
+    ("Cleanings", ["D1110", "D1120"]),
+    ("Restorative", ["D2140", "D2150", "D2330"]),
+]
+
+# A code's row name can differ between the categories listing it
+ROW_NAMES = {
+    ("Radiographs", "D0120"): "Periodic evaluation with radiographs",
+}
+
+# member id -> (dob, codes with service history)
+PATIENTS = {
+    "00964917": ("02/17/2010", ["D0120", "D1110"]),
+    "00123456": ("05/01/1984", ["D2140"]),
+}
+
+MORE_BUTTON_ID = "j_id_q1:j_id_q2"
+BACK_BUTTON_ID = "j_id_oo:j_id_op"
+DICTIONARY_TEXT = "Oral evaluation or procedure, see CDT nomenclature"
+
+
+def _page(body):
+    # Padded like real portal pages (the portal check wants substantial content)
+    return f"<html><head><title>Portal</title></head><body>{body}<div>{'&nbsp; ' * 200}</div></body></html>"
+
+
+def _link(jsf_id, text):
+    return f'<a href="#" onclick="document.getElementById(\'{jsf_id}\').click()">{text}</a>'
+
+
+class FakePortal:
+    """One browser session's view of the portal: login state, ViewState and current view
+
+    needs_back: like the live portal, a detail click while a procedure is shown returns
+    that procedure again until Back to Benefits View is clicked
+    fail_codes: procedure code -> failing (HTTP 500) detail responses still to give
+    (None: every response fails)
+    snapshot_limit: list only that many codes in the benefits page's Service History Snapshot,
+    like a snapshot that does not show all of the patient's history"""
+
+    def __init__(self, categories=CATEGORIES, patients=PATIENTS, needs_back=True):
+        self.categories = categories
+        self.patients = patients
+        self.needs_back = needs_back
+        self.fail_codes = {}
+        self.snapshot_limit = None
+        self.requests = []
+        self.viewstate = 1
+        self.logged_in = False
+        self.patient = None
+        self.expanded = None
+        self.shown_procedure = None
+
+    def row_name(self, category_index, code):
+        return ROW_NAMES.get((self.categories[category_index][0], code), f"Procedure {code}")
+
+    def detail_requests(self, code=None):
+        """Procedure codes detail clicks were answered with (only `code` when given)"""
+        return [detail for action, detail in self.requests if action == 'detail' and code in (None, detail)]
+
+    def respond(self, method, url, body):
+        """(status, text) for one request; body is the form-encoded request body"""
+        if isinstance(body, bytes):
+            body = body.decode('utf-8')
+        form = dict(parse_qsl(body or '', keep_blank_values=True))
+        if method == 'GET':
+            return self._get(url)
+        if 'auth.fake/consent' in url:
+            self.requests.append(('consent', None))
+            return 200, _page("consent accepted")
+        if 'auth.fake/challenge' in url:
+            self.requests.append(('challenge', None))
+            self.logged_in = form.get('password') is not None
+            return 200, _page("welcome")
+        if 'index.xhtml' in url:
+            return self._search(form)
+        if 'subscriber.xhtml' in url:
+            return self._ajax(form)
+        return 404, "not found"
+
+    def _get(self, url):
+        if url.endswith('/login'):
+            self.requests.append(('login', None))
+            action = ("https://auth.fake/consent?bmctx=B&amp;challenge_url=https%3A%2F%2Fauth.fake%2Fchallenge"
+                      "&amp;request_id=1&amp;resource_url=portal")
+            return 200, _page(f'<form action="{action}"><input name="enc_post_data" value="E"/></form>')
+        if not self.logged_in:
+            return 401, "login required"
+        if 'index.xhtml' in url:
+            self.requests.append(('portal', None))
+            return 200, self._index_page()
+        if 'subscriber.xhtml' in url:
+            self.requests.append(('benefits', None))
+            self.expanded = None
+            self.shown_procedure = None
+            return 200, self._benefits_page()
+        return 404, "not found"
+
+    def _search(self, form):
+        member_id = form.get('search:search1')
+        self.requests.append(('search', member_id))
+        patient = self.patients.get(member_id)
+        if not patient or patient[0] != form.get('search:search2'):
+            return 200, _page("<p>No matching member was found</p>")
+        self.patient = member_id
+        self.expanded = None
+        self.shown_procedure = None
+        return 200, _page("<p>Member name, coverage, allowance and deductible</p>")
+
+    def _ajax(self, form):
+        source = form.get('javax.faces.source', '')
+        if form.get('javax.faces.ViewState') != f"VS{self.viewstate}":
+            self.requests.append(('expired', source))
+            return 200, ('<?xml version="1.0" encoding="UTF-8"?><partial-response><error>'
+                         '<error-name>javax.faces.application.ViewExpiredException</error-name>'
+                         '</error></partial-response>')
+        if source.endswith(':j_id_na'):
+            category_index = int(source.split(':')[2])
+            self.requests.append(('category', category_index))
+            self.expanded = category_index
+            self.shown_procedure = None
+            return 200, self._partial('servicesGroup', self._category_table(category_index))
+        if source.endswith(':j_id_nm'):
+            return self._detail(source)
+        if source == BACK_BUTTON_ID:
+            self.requests.append(('back', None))
+            self.shown_procedure = None
+            return 200, self._partial('ben-summary-2', '<div>benefits</div>')
+        if source == MORE_BUTTON_ID:
+            self.requests.append(('more', self.shown_procedure))
+            links = ''.join(f'<a href="#">{code} &gt;</a>' for code in ("D0140", "D0150", "D0160"))
+            return 200, self._partial('proc-related-procedures', f'<div>{links}</div>')
+        return 404, "not found"
+
+    def _detail(self, source):
+        parts = source.split(':')
+        category_index, row_index = int(parts[2]), int(parts[4])
+        if self.expanded != category_index:
+            self.requests.append(('detail', None))
+            return 200, self._partial('ben-summary-2', '<div>nothing selected</div>')
+        code = self.categories[category_index][1][row_index]
+        if self.needs_back and self.shown_procedure:
+            code = self.shown_procedure
+        remaining = self.fail_codes.get(code, 0)
+        if remaining is None or remaining > 0:
+            self.requests.append(('failed', code))
+            if remaining:
+                self.fail_codes[code] = remaining - 1
+            return 500, "Internal Server Error"
+        self.requests.append(('detail', code))
+        self.shown_procedure = code
+        return 200, self._partial('ben-summary-2', self._procedure_panel(code))
+
+    def _partial(self, update_id, html):
+        self.viewstate += 1
+        return ('<?xml version="1.0" encoding="UTF-8"?>\n<partial-response id="j_id__v_0"><changes>'
+                f'<update id="{update_id}"><![CDATA[{html}]]></update>'
+                f'<update id="j_id__v_0:javax.faces.ViewState:1"><![CDATA[VS{self.viewstate}]]></update>'
+                '</changes></partial-response>')
+
+    def _index_page(self):
+        return _page(
+            '<p>Search by member id and date of birth to check subscriber eligibility</p>'
+            '<form id="search" action="/tuctpi/index.xhtml">'
+            '<input type="text" name="search:search1" placeholder="Member ID"/>'
+            '<input type="text" name="search:search2" placeholder="MM/DD/YYYY"/>'
+            '<input type="hidden" name="search_SUBMIT" value="1"/>'
+            f'<input type="hidden" name="javax.faces.ViewState" value="VS{self.viewstate}"/>'
+            '<input type="submit" name="search:btn" value="Search"/></form>'
+        )
+
+    def _benefits_page(self):
+        dob, history = self.patients[self.patient]
+        categories = ''.join(
+            f'<table id="j_id_n8:j_id_n9:{index}:j_id_na" onclick="jsf.ajax.request(this,event)">'
+            f'<tr><td><span class="glyphicon glyphicon-plus"></span>+ {name}</td></tr></table>'
+            for index, (name, _) in enumerate(self.categories)
+        )
+        snapshot = ''.join(f'<tr><td>01/15/2025</td><td>{code}</td><td>3</td><td>O</td></tr>'
+                           for code in history[:self.snapshot_limit])
+        return _page(
+            f'<form id="j_id_n8"><input type="hidden" name="javax.faces.ViewState" value="VS{self.viewstate}"/>'
+            f'{categories}</form>'
+            '<div id="your-network-individual-network">Concordia Advantage</div>'
+            '<div id="policy-info-group-network">Concordia Plus</div>'
+            '<div class="verticalLine">Group / ID<br/>FEDVIP 123 / 456<br/>Timely Filing<br/>1 year</div>'
+            f'<div class="member-information"><table><tr><td>Member ID</td><td>{self.patient}</td></tr>'
+            f'<tr><td>Date of Birth</td><td>{dob}</td></tr></table></div>'
+            '<table aria-label="Deductibles and Maximums"><thead><tr><th>Type</th><th>Amount</th></tr></thead>'
+            '<tbody><tr><td>Deductible</td><td>$50.00</td></tr></tbody></table>'
+            '<table><thead><tr><th>Date</th><th>Procedure</th><th>Tooth</th><th>Surface</th></tr></thead>'
+            f'<tbody>{snapshot}</tbody></table>'
+        )
+
+    def _category_table(self, category_index):
+        rows = ''
+        for row_index, code in enumerate(self.categories[category_index][1]):
+            detail_id = f"j_id_n8:j_id_n9:{category_index}:j_id_ni:{row_index}:j_id_nm"
+            rows += (f'<tr><td>{code}</td><td>{_link(detail_id, self.row_name(category_index, code) + " &gt;")}</td>'
+                     '<td>Yes</td><td>$42.00</td><td>100%</td><td>2 per year</td><td>No</td><td>Yes</td></tr>')
+        return ('<div><table id="benefitDetailAllServiceProceduresList" class="hidden"><tbody></tbody></table>'
+                f'<table id="benefitDetailAllServiceProceduresList" class="table"><tbody>{rows}</tbody></table></div>')
+
+    def _procedure_panel(self, code):
+        history = ''.join(
+            f'<tr><td>01/15/2025</td><td>{code}</td><td>3</td><td>O</td></tr>'
+            for _ in range(code in self.patients[self.patient][1])
+        )
+        return (
+            f'<div id="benefitProcedurePanel"><h2 class="h4">{code}: Procedure {code}</h2>'
+            '<table id="procedureDetailInfoTable1"><tbody><tr><td>Yes</td><td>$42.00\n per visit</td><td>100%</td>'
+            '<td>2 per year</td><td>No</td><td>Yes</td></tr></tbody></table>'
+            '<table id="procedureDetailInfoTable2"><tbody><tr><td>You pay <b>0%</b></td></tr></tbody></table>'
+            '<div id="proc-related-procedures"><a href="#">D0140 &gt;</a><a href="#">D0150 &gt;</a>'
+            f'{_link(MORE_BUTTON_ID, "<span>More...</span>")}</div>'
+            f'<table id="procedureServiceHistoryPanelList"><tbody>{history}</tbody></table>'
+            '<div id="policyDetails"><table><tbody><tr><td>Frequency</td><td>2 per year</td></tr></tbody></table></div>'
+            f'<div id="proc-dictionary"><table><tr><td>Code</td><td><span>{code}</span></td></tr>'
+            f'<tr><td>Nomenclature</td><td>{DICTIONARY_TEXT}</td></tr></table></div>'
+            f'{_link(BACK_BUTTON_ID, "Back to Benefits View")}</div>'
+        )
+
+
+class FakePortalAdapter(BaseAdapter):
+    """requests transport adapter answering from a FakePortal"""
+
+    def __init__(self, portal):
+        super().__init__()
+        self.portal = portal
+
+    def send(self, request, **kwargs):
+        status, text = self.portal.respond(request.method, request.url, request.body)
+        response = Response()
+        response.status_code = status
+        response.reason = "OK" if status == 200 else "Error"
+        response._content = text.encode('utf-8')
+        response.encoding = 'utf-8'
+        response.headers['Content-Type'] = 'text/xml' if text.startswith('<?xml') else 'text/html'
+        response.url = request.url
+        response.request = request
+        return response
+
+    def close(self):
+        pass
+
+
+def mount(scraper, portal=None):
+    """Route the scraper's session to a FakePortal (a new one unless given); returns the portal"""
+    portal = portal or FakePortal()
+    scraper.session.mount('https://', FakePortalAdapter(portal))
+    return portal
+
+
+def open_scraper(member_id="00964917", portal=None, **options):
+    """A quiet scraper logged in to a FakePortal with the patient found; returns (scraper, portal)"""
+    scraper = UnitedConcordiaPortalScraper(**options)
+    scraper.logger.disabled = True
+    portal = mount(scraper, portal)
+    scraper.authenticate("user", "secret", reuse_session=False)
+    if not scraper.navigate_to_benefits_portal():
+        raise AssertionError("fake portal page not recognised")
+    if not scraper.search_patient(member_id, portal.patients[member_id][0]):
+        raise AssertionError(f"patient {member_id} not found")
+    return scraper, portal
+
+
+def stable_results(results):
+    """Extraction results as JSON without what changes between runs (dates, latencies, bytes)"""
+    stable = json.loads(json.dumps(results, default=to_json))
+    stable['extraction_summary'].pop('extraction_date', None)
+    stable['request_metrics'] = {action: stats['requests'] for action, stats in stable['request_metrics']['by_action'].items()}
+    return stable
+
+
+def record_replay_fixture(fixture_dir=REPLAY_FIXTURE_DIR, member_id="00964917"):
+    """Record one fake portal extraction with uc_replay, plus its stable results as the golden"""
+    scraper = UnitedConcordiaPortalScraper()
+    scraper.logger.disabled = True
+    portal = FakePortal()
+    dob = portal.patients[member_id][0]
+    with scraper:
+        adapter = record_session(scraper, fixture_dir, FakePortalAdapter(portal))
+        results = run_extraction(scraper, "user", "secret", member_id, dob, None)
+    save_manifest(fixture_dir, member_id, dob, adapter.count, stable_results(results)['extraction_summary'])
+    with open(os.path.join(fixture_dir, EXPECTED_RESULTS_FILE), 'w', encoding='utf-8') as f:
+        json.dump(stable_results(results), f, indent=1, sort_keys=True)
+        f.write('\n')
+    return adapter.count
+
+
+if __name__ == '__main__':
+    print(f"Recorded {record_replay_fixture()} exchanges to {REPLAY_FIXTURE_DIR}")
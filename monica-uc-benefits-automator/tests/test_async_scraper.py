@@ -0,0 +1,272 @@
+"""
+The httpx (HTTP/2) async scraper against the blocking one: the same script run on both
+against the fake portal must send the same requests and give the same results, and every
+blocking method that sends requests or waits must have a coroutine override
+"""
+
+import ast
+import asyncio
+import inspect
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+import httpx
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, TESTS_DIR)
+
+from fake_portal import FakePortal, open_scraper, stable_results  # noqa: E402
+import APIScrapper_v3  # noqa: E402
+from APIScrapper_v3 import LEVEL_CATEGORIES, LEVEL_SUMMARY, RetryPolicy, UnitedConcordiaPortalScraper  # noqa: E402
+from uc_async_scraper import AsyncUnitedConcordiaPortalScraper, HTTP2_AVAILABLE  # noqa: E402
+from uc_store import ExtractionCheckpoint, PlanBenefitCache  # noqa: E402
+
+NO_WAIT = RetryPolicy(base_delays={RetryPolicy.SERVER_ERROR: 0.0}, jitter=0.0)
+OTHER_PATIENT = '00123456'
+
+# Methods that only set up or tear down the HTTP session; the async class replaces them differently
+SESSION_SEAMS = {'__init__', '__exit__', 'close', '_cookie_jar'}
+
+
+def fake_portal_transport(portal):
+    """httpx transport answering from a FakePortal (like fake_portal.FakePortalAdapter for requests)"""
+    def handle(request):
+        status, text = portal.respond(request.method, str(request.url), request.content)
+        content_type = 'text/xml' if text.startswith('<?xml') else 'text/html'
+        return httpx.Response(status, text=text, headers={'Content-Type': content_type})
+    return httpx.MockTransport(handle)
+
+
+async def open_async_scraper(portal, member_id="00964917", **options):
+    """open_scraper for AsyncUnitedConcordiaPortalScraper"""
+    scraper = AsyncUnitedConcordiaPortalScraper(transport=fake_portal_transport(portal), **options)
+    scraper.logger.disabled = True
+    await scraper.authenticate("user", "secret", reuse_session=False)
+    if not await scraper.navigate_to_benefits_portal():
+        raise AssertionError("fake portal page not recognised")
+    if not await scraper.search_patient(member_id, portal.patients[member_id][0]):
+        raise AssertionError(f"patient {member_id} not found")
+    return scraper
+
+
+async def call(result):
+    """Await a scraper method's result on the async scraper, pass it through on the blocking one"""
+    return await result if inspect.isawaitable(result) else result
+
+
+def blocking_methods():
+    """Methods of UnitedConcordiaPortalScraper that use the requests session or wait (sleep, a
+    parse Future's result), plus every method calling one of them"""
+    with open(inspect.getsourcefile(APIScrapper_v3), encoding='utf-8') as f:
+        module = ast.parse(f.read())
+    scraper_class = next(node for node in module.body
+                         if isinstance(node, ast.ClassDef) and node.name == UnitedConcordiaPortalScraper.__name__)
+    methods = {node.name: node for node in scraper_class.body if isinstance(node, ast.FunctionDef)}
+
+    calls, blocking = {}, set()
+    for name, method in methods.items():
+        attributes = {node.attr for node in ast.walk(method) if isinstance(node, ast.Attribute)}
+        calls[name] = attributes & set(methods)
+        if attributes & {'session', 'sleep', 'result'}:
+            blocking.add(name)
+    blocking -= SESSION_SEAMS
+
+    grown = True
+    while grown:
+        callers = {name for name, called in calls.items() if called & blocking} - SESSION_SEAMS - blocking
+        blocking |= callers
+        grown = bool(callers)
+    return blocking
+
+
+class AsyncParityTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir)
+
+    def store(self, store_class):
+        """A new store in its own file (one per scraper, so both runs start cold)"""
+        store = store_class(os.path.join(self.tmp_dir, f'store{len(os.listdir(self.tmp_dir))}.sqlite3'))
+        self.addCleanup(store.close)
+        return store
+
+    def run_both(self, script, portal_factory=FakePortal, options_factory=dict):
+        """Run `script(scraper, portal)` on a blocking and an async scraper, each on its own
+        fake portal; returns ((sync result, sync requests), (async result, async requests))"""
+        sync_scraper, sync_portal = open_scraper(portal=portal_factory(), **options_factory())
+        with sync_scraper:
+            sync_result = asyncio.run(script(sync_scraper, sync_portal))
+
+        async def run_async():
+            portal = portal_factory()
+            async with await open_async_scraper(portal, **options_factory()) as scraper:
+                return await script(scraper, portal), portal
+
+        async_result, async_portal = asyncio.run(run_async())
+        return (sync_result, sync_portal.requests), (async_result, async_portal.requests)
+
+    def assert_same_run(self, script, portal_factory=FakePortal, options_factory=dict):
+        (sync_result, sync_requests), (async_result, async_requests) = self.run_both(
+            script, portal_factory, options_factory
+        )
+        self.assertEqual(async_requests, sync_requests)
+        self.assertEqual(async_result, sync_result)
+        return sync_result
+
+    def test_full_extraction(self):
+        async def script(scraper, portal):
+            return stable_results(await call(scraper.extract_all_categories_data(output_file=None)))
+
+        for needs_back in (True, False):
+            for pipeline_parse in (False, True):
+                with self.subTest(needs_back=needs_back, pipeline_parse=pipeline_parse):
+                    results = self.assert_same_run(script, lambda: FakePortal(needs_back=needs_back),
+                                                   lambda: {'pipeline_parse': pipeline_parse})
+                    self.assertEqual(results['extraction_summary']['total_procedures_extracted'], 11)
+
+    def test_lower_levels(self):
+        for level in (LEVEL_SUMMARY, LEVEL_CATEGORIES):
+            async def script(scraper, portal):
+                return stable_results(await call(scraper.extract_all_categories_data(output_file=None, level=level)))
+
+            with self.subTest(level=level):
+                self.assert_same_run(script)
+
+    def test_procedure_codes(self):
+        async def script(scraper, portal):
+            return stable_results(await call(scraper.extract_procedure_codes(['D2150', 'D0120'], output_file=None)))
+
+        results = self.assert_same_run(script)
+        codes = {record['procedure_code'] for category in results['procedures_by_category'].values()
+                 for record in category['procedures'].values()}
+        self.assertEqual(codes, {'D2150', 'D0120'})
+
+    def test_single_category(self):
+        async def script(scraper, portal):
+            return await call(scraper.extract_single_category_data(target_category_index=3))
+
+        (sync_result, sync_requests), (async_result, async_requests) = self.run_both(script)
+        self.assertEqual(async_requests, sync_requests)
+        sync_result['extraction_summary'].pop('extraction_date')
+        async_result['extraction_summary'].pop('extraction_date')
+        self.assertEqual(async_result, sync_result)
+        self.assertIs(type(async_result['procedures']), dict)
+
+    def test_detail_retries_and_basic_data_fallback(self):
+        async def script(scraper, portal):
+            results = stable_results(await call(scraper.extract_all_categories_data(output_file=None)))
+            return results, scraper.retry_counts
+
+        for failing in (2, None):
+            def portal_factory():
+                portal = FakePortal(needs_back=False)
+                portal.fail_codes['D2150'] = failing
+                return portal
+
+            with self.subTest(failing=failing):
+                results, retry_counts = self.assert_same_run(script, portal_factory,
+                                                             lambda: {'retry_policy': NO_WAIT})
+                self.assertEqual(retry_counts, {RetryPolicy.SERVER_ERROR: 2})
+
+    def test_expired_view_is_recovered(self):
+        class ExpiringPortal(FakePortal):
+            """Expires the view once, on the first detail click of Restorative row 1"""
+            expired = False
+
+            def _ajax(self, form):
+                if form.get('javax.faces.source', '').startswith('j_id_n8:j_id_n9:3:j_id_ni:1:') and not self.expired:
+                    self.expired = True
+                    self.viewstate += 1
+                return super()._ajax(form)
+
+        async def script(scraper, portal):
+            return stable_results(await call(scraper.extract_all_categories_data(output_file=None)))
+
+        (sync_result, sync_requests), (async_result, async_requests) = self.run_both(
+            script, lambda: ExpiringPortal(needs_back=False), lambda: {'retry_policy': NO_WAIT}
+        )
+        self.assertEqual(async_requests, sync_requests)
+        self.assertEqual(async_result, sync_result)
+        self.assertEqual([action for action, _ in async_requests].count('expired'), 1)
+        self.assertEqual(async_result['extraction_summary']['total_procedures_extracted'], 11)
+
+    def test_warm_plan_cache(self):
+        async def script(scraper, portal):
+            await call(scraper.extract_all_categories_data(output_file=None))
+            await call(scraper.search_patient(OTHER_PATIENT, portal.patients[OTHER_PATIENT][0]))
+            return stable_results(await call(scraper.extract_all_categories_data(output_file=None)))
+
+        results = self.assert_same_run(script, lambda: FakePortal(needs_back=False),
+                                       lambda: {'plan_cache': self.store(PlanBenefitCache)})
+        self.assertEqual(results['extraction_summary']['plan_cache']['procedures_from_cache'], 11)
+
+    def test_checkpoint_resume(self):
+        async def script(scraper, portal):
+            portal.fail_codes['D2150'] = None
+            await call(scraper.extract_all_categories_data(output_file=None))
+            portal.fail_codes.clear()
+            first_run_requests = len(portal.requests)
+            return first_run_requests, stable_results(await call(scraper.extract_all_categories_data(output_file=None)))
+
+        def options_factory():
+            return {'checkpoint': self.store(ExtractionCheckpoint), 'retry_policy': NO_WAIT}
+
+        (sync_result, sync_requests), (async_result, async_requests) = self.run_both(
+            script, lambda: FakePortal(needs_back=False), options_factory
+        )
+        self.assertEqual(async_requests, sync_requests)
+        self.assertEqual(async_result, sync_result)
+        # The second run only fetches the detail the first one gave up on
+        first_run_requests, _ = sync_result
+        self.assertEqual([detail for action, detail in sync_requests[first_run_requests:] if action == 'detail'],
+                         ['D2150'])
+
+    def test_batch(self):
+        def script_in(output_dir):
+            async def script(scraper, portal):
+                patients = [(member_id, portal.patients[member_id][0]) for member_id in ('00964917', OTHER_PATIENT)]
+                report = await call(scraper.extract_patients_batch(patients, output_dir=output_dir))
+                saved = []
+                for patient in report['patients']:
+                    with open(patient.pop('output_file'), encoding='utf-8') as f:
+                        saved.append(stable_results(json.load(f)))
+                    patient.pop('seconds')
+                return report['patients'], saved
+            return script
+
+        output_dirs = iter([os.path.join(self.tmp_dir, 'sync'), os.path.join(self.tmp_dir, 'async')])
+        (sync_result, sync_requests), (async_result, async_requests) = self.run_both(
+            lambda scraper, portal: script_in(next(output_dirs))(scraper, portal)
+        )
+        self.assertEqual(async_requests, sync_requests)
+        self.assertEqual(async_result, sync_result)
+        self.assertEqual([patient['status'] for patient in async_result[0]], ['success', 'success'])
+
+
+class AsyncStructureTest(unittest.TestCase):
+
+    def test_blocking_methods_have_coroutine_overrides(self):
+        methods = blocking_methods()
+        self.assertIn('_request_procedure_detail', methods)
+        self.assertIn('_store_parsed_procedure', methods)
+        for name in sorted(methods):
+            with self.subTest(method=name):
+                self.assertIn(name, vars(AsyncUnitedConcordiaPortalScraper))
+                self.assertTrue(inspect.iscoroutinefunction(getattr(AsyncUnitedConcordiaPortalScraper, name)))
+
+    def test_http2_client(self):
+        async def transport_http2():
+            async with AsyncUnitedConcordiaPortalScraper() as scraper:
+                scraper.logger.disabled = True
+                return scraper.http2, scraper.client._transport._pool._http2
+
+        self.assertEqual(asyncio.run(transport_http2()), (HTTP2_AVAILABLE, HTTP2_AVAILABLE))
+
+
+if __name__ == '__main__':
+    unittest.main()
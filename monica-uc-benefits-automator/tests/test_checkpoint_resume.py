@@ -0,0 +1,66 @@
+"""
+Resuming from an ExtractionCheckpoint re-fetches only what an earlier run did not finish,
+including procedures whose detail request failed (kept with basic data only)
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, TESTS_DIR)
+
+from fake_portal import FakePortal, open_scraper  # noqa: E402
+from APIScrapper_v3 import RetryPolicy  # noqa: E402
+from uc_store import ExtractionCheckpoint  # noqa: E402
+
+MEMBER_KEY = ExtractionCheckpoint.member_key('00964917', '02/17/2010')
+NO_WAIT = RetryPolicy(base_delays={RetryPolicy.SERVER_ERROR: 0.0}, jitter=0.0)
+
+
+class CheckpointResumeTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir)
+        self.checkpoint = ExtractionCheckpoint(os.path.join(self.tmp_dir, 'checkpoint.sqlite3'))
+        self.addCleanup(self.checkpoint.close)
+
+    def extract(self, portal):
+        scraper, portal = open_scraper(portal=portal, checkpoint=self.checkpoint, retry_policy=NO_WAIT)
+        with scraper:
+            return scraper.extract_all_categories_data(output_file=None), portal
+
+    def test_failed_detail_is_refetched_on_resume(self):
+        failing = FakePortal(needs_back=False)
+        failing.fail_codes['D2150'] = None
+        first, _ = self.extract(failing)
+
+        restorative = first['procedures_by_category']['Restorative']['procedures']
+        self.assertNotIn('procedure_details', restorative['D2150_Procedure_D2150'])
+        # The category with the basic-only record is not checkpointed, its detailed rows are
+        self.assertEqual(sorted(self.checkpoint.load_categories(MEMBER_KEY)), [0, 1, 2])
+        self.assertEqual(sorted(self.checkpoint.load_procedures(MEMBER_KEY, 3)), [0, 2])
+
+        second, portal = self.extract(FakePortal(needs_back=False))
+
+        self.assertEqual(portal.detail_requests(), ['D2150'])
+        self.assertEqual([detail for action, detail in portal.requests if action == 'category'], [3])
+        clean, _ = self.extract(FakePortal(needs_back=False))
+        self.assertEqual(second['procedures_by_category'], clean['procedures_by_category'])
+
+    def test_checkpoint_kept_until_every_detail_is_fetched(self):
+        failing = FakePortal(needs_back=False)
+        failing.fail_codes['D2150'] = None
+        self.extract(failing)
+        self.assertTrue(self.checkpoint.load_categories(MEMBER_KEY))
+
+        self.extract(FakePortal(needs_back=False))
+        self.assertEqual(self.checkpoint.load_categories(MEMBER_KEY), {})
+        self.assertEqual(self.checkpoint.load_procedures(MEMBER_KEY, 3), {})
+
+
+if __name__ == '__main__':
+    unittest.main()
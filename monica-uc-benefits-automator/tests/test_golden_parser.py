@@ -0,0 +1,56 @@
+"""
+Golden-file check of every parser backend on the synthetic captures in tests/fixtures
+(regenerate the goldens with: python golden_parser_check.py tests/fixtures --update)
+"""
+
+import glob
+import os
+import sys
+import unittest
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(TESTS_DIR))
+
+from APIScrapper_v3 import LXML_AVAILABLE  # noqa: E402
+from golden_parser_check import REFERENCE, backend_configurations, make_scraper, parse_capture  # noqa: E402
+
+FIXTURES_DIR = os.path.join(TESTS_DIR, 'fixtures')
+
+
+def load_captures():
+    captures = sorted(glob.glob(os.path.join(FIXTURES_DIR, '*.xml')) + glob.glob(os.path.join(FIXTURES_DIR, '*.html')))
+    for capture in captures:
+        with open(capture, encoding='utf-8') as f:
+            text = f.read()
+        with open(capture + '.golden', 'rb') as f:
+            golden = f.read()
+        yield os.path.basename(capture), text, golden
+
+
+class GoldenParserTest(unittest.TestCase):
+
+    def test_fixtures_cover_every_capture_kind(self):
+        names = [name for name, _, _ in load_captures()]
+        self.assertIn('category_expansion.xml', names)
+        self.assertIn('procedure_detail.xml', names)
+        self.assertIn('benefits_page.html', names)
+
+    def test_every_backend_matches_golden(self):
+        for configuration in backend_configurations():
+            scraper = make_scraper(*configuration)
+            for name, text, golden in load_captures():
+                with self.subTest(capture=name, html_parser=configuration[0], fast_path=configuration[1]):
+                    self.assertEqual(parse_capture(scraper, text), golden)
+
+    @unittest.skipUnless(LXML_AVAILABLE, "lxml is not installed")
+    def test_lxml_matches_html_parser(self):
+        reference = make_scraper(*REFERENCE)
+        for fast_path in (False, True):
+            scraper = make_scraper('lxml', fast_path)
+            for name, text, _ in load_captures():
+                with self.subTest(capture=name, fast_path=fast_path):
+                    self.assertEqual(parse_capture(scraper, text), parse_capture(reference, text))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+"""
+Pipelined parsing (pipeline_parse=True) must give the same results as parsing in line,
+and its regex read of the navigation buttons must agree with the parsed tree
+"""
+
+import os
+import sys
+import unittest
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, TESTS_DIR)
+
+from fake_portal import FakePortal, MORE_BUTTON_ID, open_scraper  # noqa: E402
+from APIScrapper_v3 import UnitedConcordiaPortalScraper, decode_partial_response  # noqa: E402
+
+FIXTURES_DIR = os.path.join(TESTS_DIR, 'fixtures')
+
+
+def extract(pipeline_parse, needs_back):
+    scraper, portal = open_scraper(portal=FakePortal(needs_back=needs_back), pipeline_parse=pipeline_parse)
+    with scraper:
+        results = scraper.extract_all_categories_data(output_file=None)
+    return results, portal.requests
+
+
+def detail_responses():
+    """Procedure detail payloads: the captured fixture plus fake portal panels with and without More..."""
+    with open(os.path.join(FIXTURES_DIR, 'procedure_detail.xml'), encoding='utf-8') as f:
+        yield 'procedure_detail.xml', decode_partial_response(f.read()).first_payload
+    portal = FakePortal()
+    portal.patient = '00964917'
+    panel = portal._procedure_panel('D0120')
+    yield 'fake_portal', panel
+    more_link = panel[panel.index('<a href="#" onclick="document.getElementById(\'%s\')' % MORE_BUTTON_ID):]
+    yield 'fake_portal_without_more', panel.replace(more_link[:more_link.index('</a>') + 4], '')
+
+
+class PipelineParseTest(unittest.TestCase):
+
+    def test_pipelined_results_match_inline_results(self):
+        for needs_back in (True, False):
+            with self.subTest(needs_back=needs_back):
+                inline, inline_requests = extract(False, needs_back)
+                pipelined, pipelined_requests = extract(True, needs_back)
+                self.assertEqual(pipelined['benefits_summary'], inline['benefits_summary'])
+                self.assertEqual(pipelined['procedures_by_category'], inline['procedures_by_category'])
+                self.assertEqual(pipelined['extraction_summary']['total_procedures_extracted'], 11)
+                # Same requests in the same order - only the parsing moved
+                self.assertEqual(pipelined_requests, inline_requests)
+
+    def test_navigation_ids_match_parsed_components(self):
+        for fast_path in (True, False):
+            scraper = UnitedConcordiaPortalScraper(parse_fast_path=fast_path)
+            scraper.logger.disabled = True
+            for name, html in detail_responses():
+                with self.subTest(capture=name, fast_path=fast_path):
+                    parsed = scraper.parse_comprehensive_procedure_response(
+                        f'<partial-response><changes><update id="ben-summary-2"><![CDATA[{html}]]></update>'
+                        '</changes></partial-response>', 'D0120'
+                    )
+                    components = parsed['jsf_components']
+                    self.assertEqual(scraper._detail_navigation_ids(html),
+                                     (components.get('more_button'), components.get('back_button')))
+                    self.assertIsNotNone(components.get('back_button'))
+            scraper.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,87 @@
+"""
+A warm PlanBenefitCache saves the plan-level More... requests but still fetches every
+procedure's service history, whatever the Service History Snapshot shows
+"""
+
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, TESTS_DIR)
+
+from fake_portal import FakePortal, open_scraper  # noqa: E402
+from APIScrapper_v3 import UnitedConcordiaPortalScraper  # noqa: E402
+from uc_records import to_json  # noqa: E402
+from uc_store import PlanBenefitCache  # noqa: E402
+
+
+def plain(procedures_by_category, drop=()):
+    """JSON form of the records, without the `drop` fields"""
+    return {
+        name: {key: {field: value for field, value in record.items() if field not in drop}
+               for key, record in json.loads(json.dumps(entry['procedures'], default=to_json)).items()}
+        for name, entry in procedures_by_category.items()
+    }
+
+
+class PlanCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir)
+        self.plan_cache = PlanBenefitCache(os.path.join(self.tmp_dir, 'plan_cache.sqlite3'))
+        self.addCleanup(self.plan_cache.close)
+
+    def extract(self, member_id, portal=None, **options):
+        scraper, portal = open_scraper(member_id, portal=portal or FakePortal(needs_back=False), **options)
+        with scraper:
+            return scraper.extract_all_categories_data(output_file=None), portal
+
+    def test_warm_cache_still_fetches_history_missing_from_snapshot(self):
+        self.extract('00964917', plan_cache=self.plan_cache)
+
+        # The second patient's D2140 history is not in the snapshot
+        portal = FakePortal(needs_back=False)
+        portal.snapshot_limit = 0
+        warm, portal = self.extract('00123456', portal=portal, plan_cache=self.plan_cache)
+        cold, cold_portal = self.extract('00123456')
+
+        d2140 = warm['procedures_by_category']['Restorative']['procedures']['D2140_Procedure_D2140']
+        self.assertEqual(len(d2140['service_history']), 1)
+        self.assertEqual(plain(warm['procedures_by_category'], drop={'from_plan_cache'}),
+                         plain(cold['procedures_by_category']))
+        # Same detail requests, none of the More... requests
+        self.assertEqual(portal.detail_requests(), cold_portal.detail_requests())
+        self.assertEqual([action for action, _ in portal.requests if action == 'more'], [])
+        self.assertEqual(len([action for action, _ in cold_portal.requests if action == 'more']), 10)
+
+    def test_cached_records_name_the_rule_applied(self):
+        cold, _ = self.extract('00964917', plan_cache=self.plan_cache)
+        warm, _ = self.extract('00123456', plan_cache=self.plan_cache)
+
+        self.assertNotIn('plan_cache', json.dumps(plain(cold['procedures_by_category'])))
+        for name, records in plain(warm['procedures_by_category']).items():
+            for key, record in records.items():
+                with self.subTest(category=name, procedure=key):
+                    self.assertEqual(record['from_plan_cache'], UnitedConcordiaPortalScraper.PLAN_CACHE_RULE)
+        self.assertEqual(warm['extraction_summary']['plan_cache'], {
+            'rule': 'service_history_fetched', 'categories_from_cache': 4, 'procedures_from_cache': 11
+        })
+
+    def test_cache_stores_no_patient_history(self):
+        self.extract('00964917', plan_cache=self.plan_cache)
+
+        cached = self.plan_cache.get('FEDVIP 123 / 456|Concordia Advantage|Concordia Plus')
+        self.assertEqual(sorted(cached), ['Cleanings', 'Diagnostic & Preventive', 'Radiographs', 'Restorative'])
+        for category in cached.values():
+            for record in category['procedures'].values():
+                self.assertEqual(record['service_history'], [])
+                self.assertNotIn('from_plan_cache', record)
+
+
+if __name__ == '__main__':
+    unittest.main()
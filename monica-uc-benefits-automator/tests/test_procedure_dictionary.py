@@ -0,0 +1,77 @@
+"""
+With a ProcedureDictionary, each CDT description is stored once and records keep only
+procedure_dictionary_ref, which resolves to the text the detail view showed
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, TESTS_DIR)
+
+from fake_portal import DICTIONARY_TEXT, FakePortal, open_scraper  # noqa: E402
+from uc_store import ProcedureDictionary  # noqa: E402
+
+
+def records(results):
+    for category in results['procedures_by_category'].values():
+        yield from category['procedures'].values()
+
+
+class ProcedureDictionaryTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir)
+        self.dictionary = ProcedureDictionary(os.path.join(self.tmp_dir, 'uc_cache.sqlite3'))
+        self.addCleanup(self.dictionary.close)
+
+    def test_description_stored_once_and_referenced(self):
+        portal = FakePortal(needs_back=False)
+        scraper, portal = open_scraper(portal=portal, procedure_dictionary=self.dictionary)
+        with mock.patch.object(self.dictionary, 'put', wraps=self.dictionary.put) as put, scraper:
+            first = scraper.extract_all_categories_data(output_file=None)
+            self.assertTrue(scraper.search_patient('00123456', '05/01/1984'))
+            second = scraper.extract_all_categories_data(output_file=None)
+
+        stored = [call.args[0] for call in put.call_args_list]
+        # D0120 is listed in two categories and both patients share every code
+        self.assertEqual(sorted(stored), sorted(set(stored)))
+        self.assertEqual(len(stored), 10)
+        for results in (first, second):
+            for record in records(results):
+                with self.subTest(code=record['procedure_code']):
+                    self.assertNotIn('procedure_dictionary', record)
+                    self.assertEqual(record['procedure_dictionary_ref'], record['procedure_code'])
+
+    def test_reference_resolves_to_original_text(self):
+        scraper, _ = open_scraper(portal=FakePortal(needs_back=False))
+        with scraper:
+            inline = {record['procedure_code']: record['procedure_dictionary']
+                      for record in records(scraper.extract_all_categories_data(output_file=None))}
+
+        scraper, _ = open_scraper(portal=FakePortal(needs_back=False), procedure_dictionary=self.dictionary)
+        with scraper:
+            referenced = list(records(scraper.extract_all_categories_data(output_file=None)))
+
+        for record in referenced:
+            entries = self.dictionary.get(record['procedure_dictionary_ref'])
+            self.assertEqual(entries, dict(inline[record['procedure_code']]))
+            self.assertEqual(entries['Nomenclature'], DICTIONARY_TEXT)
+
+    def test_dictionary_survives_reopening(self):
+        scraper, _ = open_scraper(portal=FakePortal(needs_back=False), procedure_dictionary=self.dictionary)
+        with scraper:
+            scraper.extract_all_categories_data(output_file=None)
+        reopened = ProcedureDictionary(self.dictionary.path)
+        self.addCleanup(reopened.close)
+        self.assertIn('D2330', reopened)
+        self.assertEqual(reopened.get('D2330'), {'Code': 'D2330', 'Nomenclature': DICTIONARY_TEXT})
+
+
+if __name__ == '__main__':
+    unittest.main()
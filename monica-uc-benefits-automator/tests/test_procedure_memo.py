@@ -0,0 +1,59 @@
+"""
+A CDT code listed in several categories is fetched once per run (ProcedureDetailMemo)
+"""
+
+import os
+import sys
+import unittest
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, TESTS_DIR)
+
+from fake_portal import FakePortal, open_scraper  # noqa: E402
+
+
+def record_for(results, category_name, code):
+    procedures = results['procedures_by_category'][category_name]['procedures'].values()
+    return next(record for record in procedures if record['procedure_code'] == code)
+
+
+class ProcedureMemoTest(unittest.TestCase):
+
+    def setUp(self):
+        self.scraper, self.portal = open_scraper(portal=FakePortal(needs_back=False))
+        self.addCleanup(self.scraper.close)
+
+    def test_repeated_code_is_requested_once(self):
+        results = self.scraper.extract_all_categories_data(output_file=None)
+
+        self.assertEqual(self.portal.detail_requests('D0120'), ['D0120'])
+        self.assertEqual(len(self.portal.detail_requests()), 10)
+        self.assertEqual(results['extraction_summary']['procedure_memo'],
+                         {'duplicate_procedures_reused': 1, 'requests_saved': 2})
+
+    def test_reused_record_keeps_its_own_row(self):
+        results = self.scraper.extract_all_categories_data(output_file=None)
+
+        first = record_for(results, 'Diagnostic & Preventive', 'D0120')
+        reused = record_for(results, 'Radiographs', 'D0120')
+        self.assertEqual(first['procedure_name'], 'Procedure D0120')
+        self.assertEqual(reused['procedure_name'], 'Periodic evaluation with radiographs')
+        self.assertIn('D0120_Periodic_evaluation_with_radiographs', results['procedures_by_category']['Radiographs']['procedures'])
+        self.assertEqual({key: value for key, value in reused.items() if key != 'procedure_name'},
+                         {key: value for key, value in first.items() if key != 'procedure_name'})
+
+    def test_memo_is_not_shared_between_patients(self):
+        first = self.scraper.extract_all_categories_data(output_file=None)
+        # Same plan (Group / ID), different patient on the same session
+        self.assertTrue(self.scraper.search_patient('00123456', '05/01/1984'))
+        second = self.scraper.extract_all_categories_data(output_file=None)
+
+        self.assertEqual(self.portal.detail_requests('D0120'), ['D0120', 'D0120'])
+        self.assertEqual(len(record_for(first, 'Radiographs', 'D0120')['service_history']), 1)
+        # The second patient has no D0120 history - nothing carried over from the first
+        self.assertEqual(record_for(second, 'Radiographs', 'D0120')['service_history'], [])
+        self.assertEqual(second['extraction_summary']['procedure_memo']['duplicate_procedures_reused'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,102 @@
+"""
+uc_records: both ProcedureRecord.from_dict paths (slotted record, or a plain dict for
+unknown fields), and plain dicts from the scraper's public methods
+"""
+
+import copy
+import json
+import os
+import sys
+import unittest
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, TESTS_DIR)
+
+from fake_portal import FakePortal, open_scraper  # noqa: E402
+from uc_records import ProcedureRecord, to_json, to_plain  # noqa: E402
+
+PARSED = {
+    'procedure_code': 'D1110',
+    'procedure_name': 'Prophylaxis - adult',
+    'procedure_details': {'covered': 'Yes', 'coverage': '100%'},
+    'related_procedures': ['D0140', 'D0150'],
+    'service_history': [{'date_of_service': '01/15/2025', 'procedure': 'D1110', 'tooth': '3', 'surface': 'O'}],
+    'procedure_dictionary': {'Code': 'D1110', 'Nomenclature': 'Prophylaxis'}
+}
+
+
+def assert_plain(test, value):
+    """Only dict, list and JSON scalars all the way down"""
+    if isinstance(value, dict):
+        test.assertIs(type(value), dict)
+        for item in value.values():
+            assert_plain(test, item)
+    elif isinstance(value, list):
+        for item in value:
+            assert_plain(test, item)
+    else:
+        test.assertIsInstance(value, (str, int, float, bool, type(None)))
+
+
+class FromDictTest(unittest.TestCase):
+
+    def test_known_fields_give_a_record(self):
+        record = ProcedureRecord.from_dict(copy.deepcopy(PARSED))
+
+        self.assertIsInstance(record, ProcedureRecord)
+        self.assertEqual(record['related_procedures'], ('D0140', 'D0150'))
+        self.assertEqual(record, PARSED)
+        self.assertEqual(json.loads(json.dumps(record, default=to_json)), PARSED)
+        with self.assertRaises(TypeError):
+            json.dumps(record)
+        with self.assertRaises(TypeError):
+            record['procedure_name'] = 'changed'
+
+        plain = to_plain(record)
+        assert_plain(self, plain)
+        self.assertEqual(plain, PARSED)
+        plain['related_procedures'].append('D0160')
+        self.assertEqual(record['related_procedures'], ('D0140', 'D0150'))
+
+    def test_unknown_fields_give_a_plain_dict(self):
+        parsed = dict(copy.deepcopy(PARSED), portal_note='New field')
+        record = ProcedureRecord.from_dict(parsed)
+
+        self.assertIs(type(record), dict)
+        self.assertEqual(record['portal_note'], 'New field')
+        # Still compacted: lists are tuples until converted back
+        self.assertEqual(record['related_procedures'], ('D0140', 'D0150'))
+        self.assertEqual(json.loads(json.dumps(record, default=to_json)), parsed)
+
+        plain = to_plain(record)
+        assert_plain(self, plain)
+        self.assertEqual(plain, parsed)
+
+    def test_from_dict_keeps_an_existing_record(self):
+        record = ProcedureRecord.from_dict(PARSED)
+        self.assertIs(ProcedureRecord.from_dict(record), record)
+
+
+class PublicResultsTest(unittest.TestCase):
+
+    def test_extraction_results_are_plain(self):
+        scraper, _ = open_scraper(portal=FakePortal(needs_back=False))
+        with scraper:
+            results = scraper.extract_all_categories_data(output_file=None)
+            single = scraper.extract_single_category_data(target_category_index=2)
+            table = scraper.extract_single_category_data(target_category_index=2, with_details=False)
+
+        for name, value in [('all categories', results), ('single category', single), ('category table', table)]:
+            with self.subTest(name):
+                assert_plain(self, value)
+                json.dumps(value)
+
+        record = results['procedures_by_category']['Cleanings']['procedures']['D1110_Procedure_D1110']
+        record['related_procedures'].append('D9999')
+        record['notes'] = 'edited by the caller'
+        self.assertEqual(single['procedures']['D1110_Procedure_D1110']['related_procedures'],
+                         ['D0140', 'D0150', 'D0160'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,106 @@
+"""
+uc_replay: the synthetic recording in tests/fixtures/replay_session replays
+authenticate -> search_patient -> extract_all_categories_data to the golden results,
+and requests are matched on method, URL and form fields with the ViewState ignored
+"""
+
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+import requests
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, TESTS_DIR)
+
+from fake_portal import EXPECTED_RESULTS_FILE, REPLAY_FIXTURE_DIR, stable_results  # noqa: E402
+from APIScrapper_v3 import UnitedConcordiaPortalScraper  # noqa: E402
+from uc_replay import (EXCHANGES_FILE, MANIFEST_FILE, REDACTED, ReplayAdapter, ReplayMiss,  # noqa: E402
+                       exchange_key, replay_session, run_extraction)
+
+URL = "https://www.unitedconcordia.com/tuctpi/subscriber.xhtml"
+
+
+def exchange(form, body, method='POST', url=URL):
+    return {'method': method, 'url': url, 'form': form, 'status': 200, 'reason': 'OK',
+            'headers': [['Content-Type', 'text/xml']], 'body': body}
+
+
+class ReplaySessionTest(unittest.TestCase):
+
+    def test_replay_matches_golden(self):
+        with open(os.path.join(REPLAY_FIXTURE_DIR, MANIFEST_FILE), encoding='utf-8') as f:
+            manifest = json.load(f)
+        with open(os.path.join(REPLAY_FIXTURE_DIR, EXPECTED_RESULTS_FILE), encoding='utf-8') as f:
+            expected = json.load(f)
+
+        scraper = UnitedConcordiaPortalScraper()
+        scraper.logger.disabled = True
+        with scraper:
+            adapter = replay_session(scraper, REPLAY_FIXTURE_DIR)
+            results = run_extraction(scraper, REDACTED, REDACTED, manifest['member_id'], manifest['dob'], None)
+
+        self.assertEqual(adapter.misses, [])
+        self.assertEqual(adapter.served, manifest['exchanges'])
+        self.assertEqual(stable_results(results), expected)
+
+    def test_recording_has_no_credentials(self):
+        with open(os.path.join(REPLAY_FIXTURE_DIR, EXCHANGES_FILE), encoding='utf-8') as f:
+            exchanges = [json.loads(line) for line in f]
+        credentials = [dict(item['form']) for item in exchanges if 'password' in dict(item['form'])]
+        self.assertEqual(len(credentials), 1)
+        self.assertEqual((credentials[0]['username'], credentials[0]['password']), (REDACTED, REDACTED))
+        self.assertFalse(any('secret' in json.dumps(item) for item in exchanges))
+
+
+class ExchangeKeyTest(unittest.TestCase):
+
+    FORM = [('javax.faces.source', 'j_id_oo:j_id_op'), ('javax.faces.ViewState', 'VS1')]
+
+    def test_viewstate_is_ignored(self):
+        self.assertEqual(exchange_key('POST', URL, self.FORM),
+                         exchange_key('post', URL + '#top', [('javax.faces.ViewState', 'VS9'), self.FORM[0]]))
+
+    def test_method_url_and_fields_matter(self):
+        key = exchange_key('POST', URL, self.FORM)
+        self.assertNotEqual(key, exchange_key('GET', URL, self.FORM))
+        self.assertNotEqual(key, exchange_key('POST', URL.replace('subscriber', 'index'), self.FORM))
+        self.assertNotEqual(key, exchange_key('POST', URL, [('javax.faces.source', 'j_id_q1:j_id_q2')]))
+        self.assertNotEqual(key, exchange_key('POST', URL, self.FORM + [('extra', '1')]))
+
+
+class ReplayAdapterTest(unittest.TestCase):
+
+    def setUp(self):
+        self.fixture_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.fixture_dir)
+        back = [('javax.faces.source', 'j_id_oo:j_id_op')]
+        with open(os.path.join(self.fixture_dir, EXCHANGES_FILE), 'w', encoding='utf-8') as f:
+            for item in (exchange(back + [('javax.faces.ViewState', 'VS1')], 'first'),
+                         exchange([('javax.faces.source', 'j_id_q1:j_id_q2')], 'more'),
+                         exchange(back + [('javax.faces.ViewState', 'VS2')], 'second')):
+                f.write(json.dumps(item) + '\n')
+        self.session = requests.Session()
+        self.adapter = ReplayAdapter(self.fixture_dir)
+        self.session.mount('https://', self.adapter)
+
+    def post(self, viewstate):
+        return self.session.post(URL, data={'javax.faces.source': 'j_id_oo:j_id_op',
+                                            'javax.faces.ViewState': viewstate}).text
+
+    def test_repeated_requests_replay_in_recorded_order(self):
+        self.assertEqual([self.post('VS7'), self.post('VS8'), self.post('VS9')], ['first', 'second', 'second'])
+        self.adapter.rewind()
+        self.assertEqual(self.post('VS1'), 'first')
+
+    def test_unrecorded_request_is_a_miss(self):
+        with self.assertRaises(ReplayMiss):
+            self.session.post(URL, data={'javax.faces.source': 'j_id_n8:j_id_n9:0:j_id_na'})
+        self.assertEqual(self.adapter.misses, [f"POST {URL}"])
+
+
+if __name__ == '__main__':
+    unittest.main()
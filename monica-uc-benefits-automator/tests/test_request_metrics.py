@@ -0,0 +1,97 @@
+"""
+RequestMetrics: action classification of the scraper's real request payloads, and the
+per-patient window opened by search_patient
+"""
+
+import os
+import sys
+import unittest
+from collections import Counter
+from urllib.parse import urlencode
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, TESTS_DIR)
+
+from fake_portal import BACK_BUTTON_ID, MORE_BUTTON_ID, FakePortal, open_scraper  # noqa: E402
+from APIScrapper_v3 import RequestMetrics, UnitedConcordiaPortalScraper  # noqa: E402
+
+# Fake portal request log action -> RequestMetrics action
+PORTAL_ACTIONS = {'category': 'category_expansion', 'detail': 'procedure_detail', 'back': 'back_navigation',
+                  'more': 'more_expansion', 'search': 'patient_search', 'benefits': 'benefits_page'}
+
+
+class ClassifyTest(unittest.TestCase):
+
+    def setUp(self):
+        self.scraper = UnitedConcordiaPortalScraper()
+        self.scraper.logger.disabled = True
+        self.scraper.current_viewstate = 'VS1'
+        self.addCleanup(self.scraper.close)
+
+    def payloads(self):
+        scraper = self.scraper
+        category = {'form_name': 'j_id_n8', 'jsf_id': 'j_id_n8:j_id_n9:3:j_id_na'}
+        detail_id = 'j_id_n8:j_id_n9:3:j_id_ni:12:j_id_nm'
+        index_page = FakePortal()._index_page()
+        _, search_form = scraper._search_submission(scraper._soup(index_page), '00964917', '02/17/2010')
+        subscriber, index = scraper.SUBSCRIBER_URL, scraper.base_url
+        return [
+            ('category expansion', 'POST', subscriber, scraper._category_expansion_payload(category), 'category_expansion'),
+            ('procedure detail', 'POST', subscriber, scraper._jsf_ajax_payload('j_id_n8', detail_id, 'ben-summary-2'),
+             'procedure_detail'),
+            ('back', 'POST', subscriber, scraper._jsf_ajax_payload('j_id_oo', BACK_BUTTON_ID, 'ben-summary-2'),
+             'back_navigation'),
+            ('more', 'POST', subscriber, scraper._jsf_ajax_payload('j_id_q1', MORE_BUTTON_ID, 'proc-related-procedures'),
+             'more_expansion'),
+            ('search', 'POST', index, search_form, 'patient_search'),
+            ('portal page', 'GET', index, {}, 'portal_page'),
+            ('benefits page', 'GET', subscriber, {}, 'benefits_page'),
+            ('login', 'POST', 'https://auth.fake/challenge', {'username': 'u', 'password': 'p'}, 'authentication'),
+        ]
+
+    def test_classify_real_payloads(self):
+        for name, method, url, form, expected in self.payloads():
+            with self.subTest(name):
+                self.assertEqual(RequestMetrics.classify(method, url, form), expected)
+
+    def test_record_parses_the_encoded_body(self):
+        metrics = RequestMetrics()
+        for name, method, url, form, expected in self.payloads():
+            metrics.record(method, url, urlencode(form).encode() if form else None, 200, 0.01, 10)
+        self.assertEqual([record['action'] for record in metrics.records],
+                         [expected for _, _, _, _, expected in self.payloads()])
+
+    def test_extraction_actions_match_portal_requests(self):
+        scraper, portal = open_scraper()
+        with scraper:
+            results = scraper.extract_all_categories_data(output_file=None)
+        counted = {action: stats['requests'] for action, stats in results['request_metrics']['by_action'].items()}
+        expected = Counter(PORTAL_ACTIONS[action] for action, _ in portal.requests if action in PORTAL_ACTIONS)
+        expected['portal_page'] = 1
+        self.assertEqual(counted, dict(expected))
+
+
+class StartPatientTest(unittest.TestCase):
+
+    def test_search_opens_a_new_window(self):
+        scraper, portal = open_scraper()
+        with scraper:
+            scraper.extract_all_categories_data(output_file=None)
+            self.assertTrue(scraper.search_patient('00123456', '05/01/1984'))
+
+            self.assertEqual(scraper.metrics.member_id, '00123456')
+            self.assertEqual([record['action'] for record in scraper.metrics.patient_records()],
+                             ['portal_page', 'patient_search'])
+            self.assertEqual(scraper.metrics.summary()['total_requests'], 2)
+
+    def test_start_patient_resets_records(self):
+        metrics = RequestMetrics()
+        metrics.start_patient('A')
+        metrics.record('GET', UnitedConcordiaPortalScraper.SUBSCRIBER_URL, None, 200, 0.5, 100)
+        metrics.start_patient('B')
+        self.assertEqual((metrics.member_id, metrics.records), ('B', []))
+        self.assertEqual(metrics.summary()['total_requests'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,71 @@
+"""
+Several scraper sessions streaming into one file (uc_batch --stream --concurrency N)
+write whole NDJSON lines: one lock per file, however the sessions were given it
+"""
+
+import io
+import json
+import os
+import sys
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, TESTS_DIR)
+
+from fake_portal import FakePortal, open_scraper  # noqa: E402
+from APIScrapper_v3 import ResultStream, UnitedConcordiaPortalScraper  # noqa: E402
+
+
+class SlowFile(io.StringIO):
+    """Writes each string in two halves with a thread switch in between, so unlocked
+    writers from several threads interleave"""
+
+    def write(self, text):
+        middle = len(text) // 2
+        super().write(text[:middle])
+        time.sleep(0.0001)
+        return super().write(text[middle:])
+
+
+class ResultStreamTest(unittest.TestCase):
+
+    def test_sessions_share_one_lock_per_file(self):
+        raw = io.StringIO()
+        first = UnitedConcordiaPortalScraper(result_stream=raw)
+        second = UnitedConcordiaPortalScraper(result_stream=raw)
+        shared = ResultStream(raw)
+        third = UnitedConcordiaPortalScraper(result_stream=shared)
+        other = UnitedConcordiaPortalScraper(result_stream=io.StringIO())
+
+        self.assertIs(third.result_stream, shared)
+        self.assertIs(first.result_stream.lock, second.result_stream.lock)
+        self.assertIs(first.result_stream.lock, shared.lock)
+        self.assertIsNot(first.result_stream.lock, other.result_stream.lock)
+        self.assertIsNone(UnitedConcordiaPortalScraper().result_stream)
+
+    def test_concurrent_sessions_write_whole_lines(self):
+        stream = SlowFile()
+        members = ['00964917', '00123456']
+
+        def extract(member_id):
+            # Each session wraps the raw file itself, as the thread-per-session callers do
+            scraper, _ = open_scraper(member_id, portal=FakePortal(needs_back=False), result_stream=stream)
+            with scraper:
+                return scraper.extract_all_categories_data(output_file=None)
+
+        with ThreadPoolExecutor(len(members)) as executor:
+            results = list(executor.map(extract, members))
+
+        events = [json.loads(line) for line in stream.getvalue().splitlines()]
+        for member_id, result in zip(members, results):
+            with self.subTest(member_id=member_id):
+                own = [event for event in events if event['member_id'] == member_id]
+                self.assertEqual(own[-1], {**own[-1], 'event': 'complete', 'status': 'success'})
+                self.assertEqual(sum(1 for event in own if event['event'] == 'procedure'),
+                                 result['extraction_summary']['total_procedures_extracted'])
+
+
+if __name__ == '__main__':
+    unittest.main()
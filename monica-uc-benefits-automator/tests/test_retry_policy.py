@@ -0,0 +1,159 @@
+"""
+RetryPolicy backoff schedule, the per-session CircuitBreaker, and the fallback to basic data
+once every attempt at a procedure detail has failed
+"""
+
+import os
+import sys
+import unittest
+from unittest import mock
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, TESTS_DIR)
+
+from fake_portal import FakePortal, open_scraper  # noqa: E402
+from APIScrapper_v3 import CircuitBreaker, RetryPolicy, UnitedConcordiaPortalScraper  # noqa: E402
+
+NO_WAIT = RetryPolicy(base_delays={RetryPolicy.SERVER_ERROR: 0.0}, jitter=0.0)
+PARTIAL = ('<?xml version="1.0" encoding="UTF-8"?>\n<partial-response id="j_id__v_0"><changes>'
+           '<update id="ben-summary-2"><![CDATA[<div></div>]]></update></changes></partial-response>')
+SERVER_ERROR_PARTIAL = ('<?xml version="1.0" encoding="UTF-8"?>\n<partial-response id="j_id__v_0"><error>'
+                        '<error-name>java.lang.NullPointerException</error-name></error></partial-response>')
+VIEW_EXPIRED_PARTIAL = ('<?xml version="1.0" encoding="UTF-8"?>\n<partial-response id="j_id__v_0"><error>'
+                        '<error-name>javax.faces.application.ViewExpiredException</error-name></error></partial-response>')
+
+
+class RetryDelayTest(unittest.TestCase):
+
+    def test_delay_schedule(self):
+        policy = RetryPolicy(jitter=0.0, max_delay=5.0)
+        cases = [
+            (RetryPolicy.MISMATCH, [0.5, 1.0, 2.0, 4.0, 5.0]),
+            (RetryPolicy.SERVER_ERROR, [2.0, 4.0, 5.0, 5.0]),
+            (RetryPolicy.SESSION_EXPIRED, [0.0, 0.0]),
+            ('unknown', [1.0, 2.0]),
+        ]
+        for kind, expected in cases:
+            with self.subTest(kind=kind):
+                self.assertEqual([policy.delay(kind, n) for n in range(1, len(expected) + 1)], expected)
+
+    def test_base_delays_override_and_jitter_bounds(self):
+        policy = RetryPolicy(base_delays={RetryPolicy.SERVER_ERROR: 1.0}, jitter=0.5)
+        self.assertEqual(policy.base_delays[RetryPolicy.MISMATCH], 0.5)
+        for _ in range(50):
+            self.assertTrue(1.0 <= policy.delay(RetryPolicy.SERVER_ERROR, 2) <= 3.0)
+
+
+class CircuitBreakerTest(unittest.TestCase):
+
+    def setUp(self):
+        patcher = mock.patch('APIScrapper_v3.time.monotonic', return_value=100.0)
+        self.clock = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.breaker = CircuitBreaker(failure_threshold=3, cooldown=30.0)
+
+    def test_opens_at_threshold(self):
+        self.assertEqual([self.breaker.record_failure() for _ in range(3)], [False, False, True])
+        self.assertEqual(self.breaker.trips, 1)
+        self.assertEqual(self.breaker.pause_seconds(), 30.0)
+        self.clock.return_value = 120.0
+        self.assertEqual(self.breaker.pause_seconds(), 10.0)
+
+    def test_success_resets_the_count(self):
+        self.breaker.record_failure()
+        self.breaker.record_failure()
+        self.breaker.record_success()
+        self.assertEqual([self.breaker.record_failure() for _ in range(2)], [False, False])
+        self.assertEqual(self.breaker.pause_seconds(), 0.0)
+
+    def test_half_open_probe(self):
+        for _ in range(3):
+            self.breaker.record_failure()
+        self.clock.return_value = 131.0
+        self.assertEqual(self.breaker.pause_seconds(), 0.0)
+        # One failed probe opens it again
+        self.assertTrue(self.breaker.record_failure())
+        self.assertEqual((self.breaker.trips, self.breaker.pause_seconds()), (2, 30.0))
+
+        self.clock.return_value = 162.0
+        # A successful probe closes it - the full threshold is needed to open it again
+        self.breaker.record_success()
+        self.assertEqual([self.breaker.record_failure() for _ in range(3)], [False, False, True])
+        self.assertEqual(self.breaker.trips, 3)
+
+
+class DetailFailureClassificationTest(unittest.TestCase):
+
+    def setUp(self):
+        self.scraper = UnitedConcordiaPortalScraper(retry_policy=RetryPolicy(breaker_threshold=2))
+        self.scraper.logger.disabled = True
+        self.addCleanup(self.scraper.close)
+
+    def test_failure_kinds(self):
+        cases = [
+            (200, PARTIAL, None),
+            (500, 'Internal Server Error', RetryPolicy.SERVER_ERROR),
+            (503, 'Service Unavailable', RetryPolicy.SERVER_ERROR),
+            (429, 'Too Many Requests', RetryPolicy.SERVER_ERROR),
+            (200, SERVER_ERROR_PARTIAL, RetryPolicy.SERVER_ERROR),
+            (200, VIEW_EXPIRED_PARTIAL, RetryPolicy.SESSION_EXPIRED),
+            (200, '<html><body>Please log in</body></html>', RetryPolicy.SESSION_EXPIRED),
+            (403, 'Forbidden', RetryPolicy.SESSION_EXPIRED),
+            (404, 'Not Found', RetryPolicy.FATAL),
+        ]
+        for status, text, expected in cases:
+            with self.subTest(status=status, text=text[:40]):
+                self.assertEqual(self.scraper._classify_detail_response(status, text), expected)
+
+    def test_only_server_errors_open_the_breaker(self):
+        breaker = self.scraper.circuit_breaker
+        for status, text in [(403, 'Forbidden'), (200, VIEW_EXPIRED_PARTIAL), (404, 'Not Found')] * 3:
+            self.scraper._classify_detail_response(status, text)
+        self.assertEqual((breaker.consecutive_failures, breaker.trips), (0, 0))
+
+        self.scraper._classify_detail_response(500, 'Internal Server Error')
+        self.scraper._classify_detail_response(403, 'Forbidden')
+        self.scraper._classify_detail_response(200, SERVER_ERROR_PARTIAL)
+        self.assertEqual(breaker.trips, 1)
+        self.assertGreater(breaker.pause_seconds(), 0.0)
+
+    def test_usable_response_closes_the_breaker(self):
+        self.scraper._classify_detail_response(500, 'Internal Server Error')
+        self.scraper._classify_detail_response(200, PARTIAL)
+        self.scraper._classify_detail_response(500, 'Internal Server Error')
+        self.assertEqual(self.scraper.circuit_breaker.trips, 0)
+
+
+class DetailRetryTest(unittest.TestCase):
+
+    def extract(self, portal):
+        scraper, portal = open_scraper(portal=portal, retry_policy=NO_WAIT)
+        with scraper:
+            results = scraper.extract_all_categories_data(output_file=None)
+        restorative = results['procedures_by_category']['Restorative']['procedures']
+        return scraper, portal, restorative['D2150_Procedure_D2150']
+
+    def test_retry_recovers_before_the_last_attempt(self):
+        portal = FakePortal(needs_back=False)
+        portal.fail_codes['D2150'] = 2
+        scraper, portal, record = self.extract(portal)
+
+        self.assertIn('procedure_details', record)
+        self.assertEqual([detail for action, detail in portal.requests if action == 'failed'], ['D2150', 'D2150'])
+        self.assertEqual(scraper.retry_counts, {RetryPolicy.SERVER_ERROR: 2})
+
+    def test_final_attempt_falls_back_to_basic_data(self):
+        portal = FakePortal(needs_back=False)
+        portal.fail_codes['D2150'] = None
+        scraper, portal, record = self.extract(portal)
+
+        self.assertEqual(dict(record), {'procedure_code': 'D2150', 'procedure_name': 'Procedure D2150'})
+        self.assertEqual([detail for action, detail in portal.requests if action == 'failed'],
+                         ['D2150'] * NO_WAIT.max_attempts)
+        # The rest of the category is still detailed
+        self.assertEqual(portal.detail_requests(), ['D0120', 'D0140', 'D0150', 'D0210', 'D0220',
+                                                    'D1110', 'D1120', 'D2140', 'D2330'])
+
+
+if __name__ == '__main__':
+    unittest.main()
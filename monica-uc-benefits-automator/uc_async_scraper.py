@@ -0,0 +1,1040 @@
+"""
+Asyncio variant of the United Concordia scraper on httpx.AsyncClient
+Same public methods as UnitedConcordiaPortalScraper, as coroutines. HTTP/2 is used
+when the h2 package is installed (pip install 'httpx[http2]'). Only the methods that
+send requests or wait are redefined here, each as the same sequence of requests as its
+blocking counterpart; payloads, response parsing, navigation state, retry decisions,
+plan cache, checkpoint and result building are the inherited helpers.
+tests/test_async_scraper.py checks both paths make the same requests and return the same results.
+
+    async with AsyncUnitedConcordiaPortalScraper() as scraper:
+        await scraper.authenticate(username, password)
+        await scraper.navigate_to_benefits_portal()
+        await scraper.search_patient(member_id, dob)
+        results = await scraper.extract_all_categories_data()
+"""
+
+import asyncio
+import logging
+import os
+import time
+from urllib.parse import urlparse
+
+import httpx
+
+from APIScrapper_v3 import (
+    UnitedConcordiaPortalScraper, ExtractionCancelled, SessionExpired, JSFNavigationState, PageSnapshot,
+    RetryPolicy, LEVEL_SUMMARY, LEVEL_FULL
+)
+from uc_records import to_plain
+
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+# httpx logs every request at INFO; keep the extraction log as readable as the requests-based one
+logging.getLogger('httpx').setLevel(logging.WARNING)
+
+
+class AsyncUnitedConcordiaPortalScraper(UnitedConcordiaPortalScraper):
+    """One portal session on one httpx.AsyncClient (its own cookies and ViewState)
+
+    http2: None uses HTTP/2 when h2 is installed. transport: optional httpx transport
+    for the client (the tests answer from tests/fake_portal.py)"""
+
+    def __init__(self, html_parser=None, parse_fast_path=True, plan_cache=None, checkpoint=None,
+                 session_file=None, retry_policy=None, metrics_file=None, location_map=None, result_stream=None,
+                 pipeline_parse=False, procedure_dictionary=None, progress=None, cancel_event=None, http2=None,
+                 transport=None):
+        super().__init__(html_parser=html_parser, parse_fast_path=parse_fast_path, plan_cache=plan_cache,
+                         checkpoint=checkpoint, session_file=session_file, retry_policy=retry_policy,
+                         metrics_file=metrics_file, location_map=location_map, result_stream=result_stream,
+                         pipeline_parse=pipeline_parse, procedure_dictionary=procedure_dictionary,
+                         progress=progress, cancel_event=cancel_event)
+        # Connection-specific headers are not allowed on HTTP/2 and keep-alive is the default anyway
+        headers = {key: value for key, value in self.session.headers.items() if key.lower() != 'connection'}
+        # The requests session is not used; dropping it makes a blocking path that was not ported fail loudly
+        self.session.close()
+        self.session = None
+
+        self.http2 = HTTP2_AVAILABLE if http2 is None else http2
+        self.client = httpx.AsyncClient(
+            http2=self.http2,
+            headers=headers,
+            timeout=30.0,
+            follow_redirects=True,
+            transport=transport,
+            event_hooks={
+                'request': [self._mark_request_start],
+                'response': [self._invalidate_snapshot_on_post_async, self._record_request_metrics_async,
+                             self._check_cancelled_async]
+            }
+        )
+
+    def __enter__(self):
+        raise TypeError("use 'async with' for AsyncUnitedConcordiaPortalScraper")
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
+
+    def close(self):
+        raise TypeError("use 'await scraper.aclose()' for AsyncUnitedConcordiaPortalScraper")
+
+    async def aclose(self):
+        """Release the HTTP connections and the pipelined-parse thread"""
+        if self._parse_executor is not None:
+            self._parse_executor.shutdown(wait=True)
+        await self.client.aclose()
+
+    async def _mark_request_start(self, request):
+        request.extensions['uc_started'] = time.perf_counter()
+
+    async def _invalidate_snapshot_on_post_async(self, response):
+        """Client response hook: any POST may change the server-side view"""
+        if response.request.method == 'POST':
+            self._page_snapshot = None
+
+    async def _record_request_metrics_async(self, response):
+        """Client response hook: the body is read here, so latency covers the whole response"""
+        await response.aread()
+        request = response.request
+        elapsed = time.perf_counter() - request.extensions.get('uc_started', time.perf_counter())
+        self.metrics.record(request.method, str(request.url), request.content, response.status_code,
+                            elapsed, len(response.content))
+
+    async def _check_cancelled_async(self, response):
+        self._check_cancelled()
+
+    async def _pause(self, seconds):
+        """asyncio.sleep that ends early with ExtractionCancelled when the run is cancelled"""
+        if self.cancel_event is None:
+            await asyncio.sleep(seconds)
+            return
+        deadline = time.monotonic() + seconds
+        # threading.Event cannot be awaited; poll it so a cancel still lands within a fraction of a second
+        while not self.cancel_event.is_set() and time.monotonic() < deadline:
+            await asyncio.sleep(min(0.1, deadline - time.monotonic()))
+        self._check_cancelled()
+
+    async def _wait_for_circuit_breaker(self):
+        pause = self.circuit_breaker.pause_seconds()
+        if pause:
+            self.logger.warning(f"    Circuit breaker open - waiting {pause:.1f}s before the next request")
+            await self._pause(pause)
+
+    def _cookie_jar(self):
+        return self.client.cookies.jar
+
+    async def get_subscriber_page(self):
+        """Return the subscriber.xhtml snapshot, fetching and parsing it only once until
+        the next POST. A non-200 response is returned but not cached"""
+        if self._page_snapshot is None:
+            snapshot = PageSnapshot(await self.client.get(self.SUBSCRIBER_URL), self.html_parser)
+            if snapshot.status_code != 200:
+                return snapshot
+            self._page_snapshot = snapshot
+        return self._page_snapshot
+
+    # ------------------------------------------------------------------
+    # Login, session reuse and patient search
+
+    async def authenticate(self, username, password, reuse_session=True):
+        """Handle OAuth authentication process
+
+        With a session_file, a saved session that still reaches the portal is reused
+        and the OAuth/OAM login is skipped"""
+        try:
+            self.stored_username = username
+            self.stored_password = password
+
+            if reuse_session and await self.restore_session(username):
+                return True
+
+            self.logger.info("Starting OAuth authentication process...")
+
+            login_response = await self.client.get('https://www.unitedconcordia.com/login')
+            if login_response.status_code != 200:
+                raise Exception(f"Failed to access OAuth page: {login_response.status_code}")
+
+            form_action, consent_data = self._oauth_consent_submission(login_response)
+
+            self.logger.info("Submitting OAuth consent...")
+            consent_response = await self.client.post(form_action, data=consent_data)
+            if consent_response.status_code != 200:
+                raise Exception(f"OAuth consent failed: {consent_response.status_code}")
+
+            challenge_url_decoded, auth_data = self._credential_submission(consent_response, username, password)
+            login_response = await self.client.post(
+                challenge_url_decoded,
+                data=auth_data,
+                headers={'Content-Type': 'application/x-www-form-urlencoded'}
+            )
+
+            self.logger.info(f"After credential submission: {login_response.url}")
+
+            if self._verify_login_success(login_response):
+                self.is_authenticated = True
+                self.logger.info("OAuth login successful")
+                self.save_session()
+                return True
+            raise Exception("Login failed - credentials may be invalid")
+
+        except Exception as e:
+            self.logger.error(f"OAuth authentication failed: {e}")
+            raise
+
+    async def restore_session(self, username):
+        """Load a saved session for this username and keep it only if the portal still accepts it"""
+        if not (self.session_file and os.path.exists(self.session_file)):
+            return False
+        try:
+            if not self._load_saved_session(username):
+                return False
+
+            if await self.is_session_valid():
+                return self._accept_saved_session()
+
+            self.logger.info("Saved session expired - logging in again")
+        except Exception as e:
+            self.logger.warning(f"Failed to restore session: {e}")
+
+        self._discard_saved_session()
+        return False
+
+    async def is_session_valid(self):
+        """Cheap probe: does the portal page still load without an OAM/login redirect?"""
+        try:
+            response = await self.client.get(self.base_url, follow_redirects=False)
+            return response.status_code == 200 and self._is_benefits_portal_page(response.text)
+        except Exception as e:
+            self.logger.warning(f"Session probe failed: {e}")
+            return False
+
+    async def reauthenticate(self):
+        """Start a clean login with the stored credentials (e.g. after the OAM session expired)"""
+        if not self.stored_username:
+            raise Exception("No stored credentials to re-authenticate with")
+        self._reset_login_state()
+        await self.authenticate(self.stored_username, self.stored_password, reuse_session=False)
+        if not await self.navigate_to_benefits_portal():
+            raise Exception("Failed to navigate to benefits portal after re-authentication")
+        return True
+
+    async def navigate_to_benefits_portal(self):
+        """Navigate to the benefits portal"""
+        try:
+            if not self.is_authenticated:
+                raise Exception("Must be authenticated before navigating to benefits portal")
+
+            self.logger.info("Navigating to benefits portal...")
+
+            portal_urls = [
+                "https://www.unitedconcordia.com/tuctpi/index.xhtml",
+                "https://www.unitedconcordia.com/tuctpi/subscriber.xhtml"
+            ]
+
+            for url in portal_urls:
+                try:
+                    self.logger.info(f"Attempting portal access: {url}")
+                    response = await self.client.get(url, follow_redirects=False)
+
+                    if response.status_code == 200:
+                        if self._is_benefits_portal_page(response.text):
+                            self.base_url = url
+                            self.logger.info(f"SUCCESS: Direct portal access successful")
+                            self.save_session()
+                            return True
+
+                    elif response.status_code in [301, 302, 303, 307, 308]:
+                        redirect_url = response.headers.get('Location')
+                        if redirect_url:
+                            if not redirect_url.startswith('http'):
+                                parsed_url = urlparse(url)
+                                redirect_url = f"{parsed_url.scheme}://{parsed_url.netloc}{redirect_url}"
+
+                            self.logger.info(f"Got redirect to: {redirect_url}")
+
+                            if 'oam' in redirect_url.lower() or 'cdsso' in redirect_url.lower():
+                                self.logger.info(f"Detected OAM authentication challenge")
+                                if await self._handle_oam_authentication(redirect_url):
+                                    self.save_session()
+                                    return True
+
+                except Exception as e:
+                    self.logger.warning(f"Portal access failed for {url}: {e}")
+                    continue
+
+            return False
+
+        except Exception as e:
+            self.logger.error(f"Navigation failed: {e}")
+            raise
+
+    async def _handle_oam_authentication(self, redirect_url):
+        """Handle Oracle Access Manager authentication challenge"""
+        try:
+            self.logger.info(f"Processing OAM authentication challenge: {redirect_url}")
+
+            oam_response = await self.client.get(redirect_url)
+            if oam_response.status_code != 200:
+                self.logger.error(f"OAM challenge request failed: {oam_response.status_code}")
+                return False
+
+            if 'window.location' in oam_response.text.lower():
+                self.logger.info(f"Excluding redirect/login page due to: window.location")
+                return await self._try_direct_oam_post(redirect_url)
+
+            if self._is_benefits_portal_page(oam_response.text):
+                self.base_url = str(oam_response.url)
+                self.logger.info(f"SUCCESS: Direct OAM POST successful")
+                return True
+
+            return await self._try_direct_oam_post(redirect_url)
+
+        except Exception as e:
+            self.logger.error(f"OAM authentication handling failed: {e}")
+            return False
+
+    async def _try_direct_oam_post(self, oam_url):
+        """Try direct POST to OAM endpoint with credentials"""
+        try:
+            self.logger.info("Attempting direct OAM credential submission...")
+
+            for endpoint, creds in self._oam_credential_submissions(oam_url):
+                try:
+                    self.logger.info(f"Trying direct OAM POST: {endpoint}")
+                    response = await self.client.post(
+                        endpoint,
+                        data=creds,
+                        headers={'Content-Type': 'application/x-www-form-urlencoded'}
+                    )
+                    if response.status_code == 200 and self._is_benefits_portal_page(response.text):
+                        self.base_url = str(response.url)
+                        self.logger.info(f"SUCCESS: Direct OAM POST successful")
+                        return True
+                except Exception as e:
+                    self.logger.debug(f"Direct OAM POST failed: {e}")
+                    continue
+
+            return False
+
+        except Exception as e:
+            self.logger.error(f"Direct OAM POST attempt failed: {e}")
+            return False
+
+    async def search_patient(self, member_id, dob):
+        """Search for patient using member ID and DOB"""
+        try:
+            if not self.is_authenticated:
+                raise Exception("Must be authenticated before searching")
+
+            self.logger.info(f"Searching for patient: {member_id}")
+
+            self.current_member_id = member_id
+            self.current_dob = dob
+            self.metrics.start_patient(member_id)
+
+            response = await self.client.get(self.base_url)
+            if response.status_code != 200:
+                raise Exception(f"Could not access portal page: {response.status_code}")
+
+            if not self._is_benefits_portal_page(response.text):
+                raise Exception("Not on the benefits portal page")
+
+            return await self._submit_search_form(self._soup(response.text), member_id, dob)
+
+        except Exception as e:
+            self.logger.error(f"Patient search failed: {e}")
+            raise
+
+    async def _submit_search_form(self, soup, member_id, dob):
+        """Find and submit the search form"""
+        form_action, search_data = self._search_submission(soup, member_id, dob)
+        return await self._perform_search_submission(form_action, search_data)
+
+    async def _perform_search_submission(self, form_action, search_data):
+        """Perform the actual search form submission"""
+        self.logger.info(f"Submitting search to: {form_action}")
+        search_response = await self.client.post(form_action, data=search_data)
+        if search_response.status_code == 200:
+            return self._verify_patient_found(search_response.text)
+        return False
+
+    # ------------------------------------------------------------------
+    # Batches
+
+    async def extract_patients_batch(self, patients, output_dir='.', workers=1, level=LEVEL_FULL, procedure_codes=None):
+        """Extract several patients one after another on this authenticated session
+
+        Re-authenticates only when the portal session has expired; returns the same
+        report as UnitedConcordiaPortalScraper.extract_patients_batch"""
+        if not self.is_authenticated:
+            raise Exception("Must be authenticated before running a batch")
+
+        os.makedirs(output_dir, exist_ok=True)
+        batch_start = time.time()
+        report = []
+
+        for position, (member_id, dob) in enumerate(patients, 1):
+            patient_start = time.time()
+            result = self._batch_patient_result(position, member_id, dob, output_dir)
+            output_file = result['output_file']
+
+            try:
+                results = None
+                for attempt in range(2):
+                    if attempt > 0:
+                        await self.reauthenticate()
+                        result['reauthenticated'] = True
+
+                    try:
+                        found = await self.search_patient(member_id, dob)
+                    except Exception:
+                        if attempt == 0 and not await self.is_session_valid():
+                            continue
+                        raise
+                    if not found:
+                        raise Exception("Patient not found")
+
+                    self.nav_state = JSFNavigationState()
+                    try:
+                        if procedure_codes:
+                            results = await self.extract_procedure_codes(procedure_codes, output_file=output_file)
+                        else:
+                            results = await self.extract_all_categories_data(workers=workers, output_file=output_file,
+                                                                             level=level)
+                    except SessionExpired as e:
+                        if attempt == 0:
+                            self.logger.warning(f"{e} - logging in again to resume")
+                            continue
+                        raise
+                    if attempt == 0 and self._batch_incomplete(results) and not await self.is_session_valid():
+                        continue
+                    break
+
+                self._complete_batch_result(result, results)
+            except ExtractionCancelled:
+                result.update({'status': 'cancelled', 'output_file': None})
+            except Exception as e:
+                self.logger.error(f"Batch patient {member_id} failed: {e}")
+                result.update({'status': 'failed', 'error': str(e), 'output_file': None})
+
+            result['seconds'] = round(time.time() - patient_start, 2)
+            report.append(result)
+            self.logger.info(f"Batch patient {member_id}: {result['status']} in {result['seconds']}s")
+            if result['status'] == 'cancelled':
+                break
+
+        return self._batch_report(report, time.time() - batch_start)
+
+    # ------------------------------------------------------------------
+    # Extraction
+
+    async def extract_viewstate_from_current_page(self):
+        """Extract ViewState from current benefits page"""
+        try:
+            return self._viewstate_from_page(await self.get_subscriber_page())
+        except Exception as e:
+            self.logger.error(f"Failed to extract ViewState: {e}")
+            return None
+
+    async def extract_benefits_summary(self):
+        """Extract all summary data from the benefits page"""
+        try:
+            self.logger.info("Extracting benefits summary data...")
+
+            page = await self.get_subscriber_page()
+            if page.status_code != 200:
+                self.logger.error(f"Could not access benefits page: {page.status_code}")
+                return None
+
+            return self.parse_benefits_summary(page.soup)
+
+        except Exception as e:
+            self.logger.error(f"Failed to extract benefits summary: {e}")
+            return None
+
+    async def extract_all_categories_data(self, workers=1, output_file='mypatientbenefitssummary.json',
+                                          level=LEVEL_FULL):
+        """Extract comprehensive procedure data for ALL categories
+
+        workers > 1 opens that many independent portal sessions (each with its own client
+        and ViewState) and runs their categories concurrently; level, cancel_event and
+        SessionExpired as in the blocking scraper"""
+        benefits_summary, category_sections = None, []
+        try:
+            self.logger.info("=== EXTRACTING ALL CATEGORIES DATA ===")
+            self._begin_level(level)
+            self._start_checkpoint()
+
+            self.logger.info("STEP 1: Extracting benefits summary (Network, Patient Info, Service History, Policy Info)...")
+            benefits_summary = await self.extract_benefits_summary()
+            self._check_cancelled()
+            if benefits_summary:
+                self.logger.info(f"✓ Extracted {len(benefits_summary)} summary sections")
+            else:
+                self.logger.warning("⚠ Could not extract benefits summary")
+            self._publish_benefits_summary(benefits_summary)
+
+            if level == LEVEL_SUMMARY:
+                return self._summary_only_results(await self.get_subscriber_page(), benefits_summary, output_file)
+
+            if not await self.extract_viewstate_from_current_page():
+                raise Exception("Could not extract ViewState")
+
+            page = await self.get_subscriber_page()
+            if page.status_code != 200:
+                raise Exception(f"Could not access benefits page: {page.status_code}")
+
+            category_sections = self._prepare_category_run(page, benefits_summary)
+
+            if workers > 1 and len(category_sections) > 1:
+                category_entries = await self._extract_categories_parallel(category_sections, workers)
+            else:
+                category_entries = {}
+                for category_index, category in enumerate(category_sections):
+                    category_entries[category_index] = await self._extract_category_entry(
+                        category_index, category, len(category_sections)
+                    )
+
+            return self._finish_extraction(benefits_summary, category_sections, category_entries, output_file)
+
+        except ExtractionCancelled:
+            return self._finish_cancelled(benefits_summary, category_sections, output_file)
+        except SessionExpired as e:
+            self.logger.error(f"All categories extraction stopped: {e}")
+            self._publish_failure(e)
+            raise
+        except Exception as e:
+            self.logger.error(f"All categories extraction failed: {e}")
+            self._publish_failure(e)
+            return None
+
+    async def extract_procedure_codes(self, procedure_codes, output_file='mypatientbenefitssummary.json'):
+        """Extract full procedure data for just the given CDT codes (see the blocking scraper)"""
+        benefits_summary, category_sections = None, []
+        try:
+            self.logger.info("=== EXTRACTING REQUESTED PROCEDURE CODES ===")
+            requested = self._begin_targeted_run(procedure_codes)
+
+            benefits_summary = await self.extract_benefits_summary()
+            self._check_cancelled()
+            self._publish_benefits_summary(benefits_summary)
+            if not await self.extract_viewstate_from_current_page():
+                raise Exception("Could not extract ViewState")
+
+            page = await self.get_subscriber_page()
+            if page.status_code != 200:
+                raise Exception(f"Could not access benefits page: {page.status_code}")
+
+            category_sections, located, unmapped = self._prepare_targeted_run(page, benefits_summary, requested)
+            remaining = set(requested)
+            category_entries = {}
+            for category_index in self._targeted_category_order(located, unmapped, remaining):
+                name, entry = await self._extract_category_entry(
+                    category_index, category_sections[category_index], len(category_sections), only_codes=set(remaining)
+                )
+                category_entries[category_index] = (name, entry)
+                remaining -= {record['procedure_code'] for record in entry['procedures'].values()}
+
+            return self._finish_targeted_extraction(benefits_summary, category_sections, category_entries,
+                                                    requested, remaining, output_file)
+
+        except ExtractionCancelled:
+            return self._finish_cancelled(benefits_summary, category_sections, output_file)
+        except SessionExpired as e:
+            self.logger.error(f"Targeted extraction stopped: {e}")
+            self._publish_failure(e)
+            raise
+        except Exception as e:
+            self.logger.error(f"Targeted extraction failed: {e}")
+            self._publish_failure(e)
+            return None
+
+    async def _extract_category_entry(self, category_index, category, total_categories, only_codes=None):
+        """Extract one category on this session and return (name, procedures_by_category entry)"""
+        completed = self._begin_category_entry(category_index, category, total_categories)
+        if completed:
+            return completed
+        procedure_filter = only_codes
+
+        # Same reset/refresh decisions as the blocking scraper
+        diverged = self.nav_state.diverged
+        if self.nav_state.needs_reset_before_category():
+            self.logger.info(f"Resetting to benefits view before processing category '{category['name']}'")
+            await self._click_back_to_benefits_view()
+        else:
+            self.nav_state.resets_skipped += 1
+
+        if diverged:
+            category = await self._refresh_category_info(category_index, category)
+        else:
+            self.nav_state.refreshes_skipped += 1
+            category = dict(category, jsf_id=self.nav_state.category_jsf_id(category_index))
+
+        category_result = await self._extract_single_category(
+            target_category_index=category_index,
+            category_info=category,
+            procedure_filter=procedure_filter,
+            with_details=self._extraction_level >= LEVEL_FULL
+        )
+
+        if not category_result and self.nav_state.diverged:
+            self.logger.info(f"Navigation state diverged, retrying category '{category['name']}' after refresh")
+            await self._click_back_to_benefits_view()
+            category = await self._refresh_category_info(category_index, category)
+            category_result = await self._extract_single_category(
+                target_category_index=category_index,
+                category_info=category,
+                procedure_filter=procedure_filter,
+                with_details=self._extraction_level >= LEVEL_FULL
+            )
+
+        return self._finish_category_entry(category_index, category, category_result)
+
+    async def _refresh_category_info(self, category_index, category):
+        """Re-read the benefits page and return fresh category info (JSF IDs may have changed)"""
+        self.logger.info(f"Refreshing category list")
+        self.nav_state.refreshes_issued += 1
+        self.invalidate_page_snapshot()
+        return self._category_from_refreshed_page(await self.get_subscriber_page(), category_index, category)
+
+    async def open_worker_session(self):
+        """Open an independent authenticated session on the same patient (own client and ViewState)"""
+        if not (self.stored_username and self.current_member_id):
+            raise Exception("Must authenticate and search a patient before opening worker sessions")
+
+        worker = AsyncUnitedConcordiaPortalScraper(html_parser=self.html_parser, parse_fast_path=self.parse_fast_path,
+                                                   retry_policy=self.retry_policy, pipeline_parse=self.pipeline_parse,
+                                                   cancel_event=self.cancel_event, http2=self.http2)
+        worker.logger = self.logger
+        try:
+            await worker.authenticate(self.stored_username, self.stored_password)
+            if not await worker.navigate_to_benefits_portal():
+                raise Exception("Worker session failed to navigate to benefits portal")
+            if not await worker.search_patient(self.current_member_id, self.current_dob):
+                raise Exception("Worker session failed to find patient")
+            if not await worker.extract_viewstate_from_current_page():
+                raise Exception("Worker session could not extract ViewState")
+        except BaseException:
+            await worker.aclose()
+            raise
+        return worker
+
+    async def _extract_categories_parallel(self, category_sections, workers):
+        """Split categories round-robin across this session and (workers - 1) extra sessions"""
+        workers = min(workers, len(category_sections))
+        self.logger.info(f"Parallel extraction: {len(category_sections)} categories across {workers} sessions")
+
+        assignments = [list(range(worker_index, len(category_sections), workers)) for worker_index in range(workers)]
+        category_entries = {}
+        unfinished = []
+
+        async def run_worker(worker_index):
+            indices = assignments[worker_index]
+            try:
+                # Worker 0 reuses this session, which is already on the patient's benefits page
+                scraper = self if worker_index == 0 else await self.open_worker_session()
+                self._share_run_state(scraper)
+            except Exception as e:
+                self.logger.error(f"Worker {worker_index} could not open a session: {e}")
+                unfinished.extend(indices)
+                return
+
+            try:
+                for category_index in indices:
+                    category_entries[category_index] = await scraper._extract_category_entry(
+                        category_index, category_sections[category_index], len(category_sections)
+                    )
+            finally:
+                # Also on cancellation, so the partial results count every session's requests
+                if scraper is not self:
+                    self._absorb_worker_stats(scraper)
+                    await scraper.aclose()
+
+        # Every worker finishes (a cancelled one within one request) before any error is raised
+        outcomes = await asyncio.gather(*(run_worker(worker_index) for worker_index in range(workers)),
+                                        return_exceptions=True)
+        for outcome in outcomes:
+            if isinstance(outcome, BaseException):
+                raise outcome
+
+        # Categories whose worker never got a session fall back to this session
+        for category_index in sorted(unfinished):
+            category_entries[category_index] = await self._extract_category_entry(
+                category_index, category_sections[category_index], len(category_sections)
+            )
+
+        return category_entries
+
+    async def extract_single_category_data(self, target_category_index=0, category_info=None, procedure_filter=None,
+                                           with_details=True):
+        """Extract comprehensive procedure data for a single category only
+
+        procedure_filter: optional set of procedure codes - only those rows get a detail request
+        with_details: False returns just the category table rows (no detail requests)"""
+        return to_plain(await self._extract_single_category(target_category_index, category_info, procedure_filter,
+                                                            with_details))
+
+    async def _extract_single_category(self, target_category_index=0, category_info=None, procedure_filter=None,
+                                       with_details=True):
+        """extract_single_category_data with the procedures as compact uc_records records"""
+        try:
+            self.logger.info("=== EXTRACTING SINGLE CATEGORY DATA ===")
+
+            if category_info:
+                target_category = category_info
+                self.logger.info(f"Using provided category info: '{target_category['name']}'")
+            else:
+                if not await self.extract_viewstate_from_current_page():
+                    raise Exception("Could not extract ViewState")
+
+                page = await self.get_subscriber_page()
+                if page.status_code != 200:
+                    raise Exception(f"Could not access benefits page: {page.status_code}")
+
+                category_sections = self._find_category_sections(page.soup)
+
+                if target_category_index >= len(category_sections):
+                    raise Exception(f"Target category index {target_category_index} out of range. Found {len(category_sections)} categories")
+                target_category = category_sections[target_category_index]
+
+            self.logger.info(f"Processing ONLY category {target_category_index + 1}: '{target_category['name']}'")
+            self.logger.info(f"Expanding category via API: {target_category['name']}")
+            api_response = await self.client.post(
+                self.SUBSCRIBER_URL,
+                data=self._category_expansion_payload(target_category),
+                headers=self.AJAX_HEADERS
+            )
+
+            if self._is_session_expired_response(api_response.status_code, api_response.text):
+                raise SessionExpired(f"Session expired while expanding category '{target_category['name']}'")
+            if api_response.status_code != 200:
+                raise Exception(f"Failed to expand target category: {api_response.status_code}")
+
+            basic_procedures = self._handle_category_expansion(api_response.text, target_category, target_category_index)
+            self._progress('category_table', index=target_category_index, name=target_category['name'],
+                           procedures=len(basic_procedures))
+            if not with_details:
+                return self._category_table_results(target_category, target_category_index, basic_procedures)
+
+            comprehensive_procedures = {}
+            processed_count = 0
+            checkpointed = self._load_checkpointed_procedures(target_category_index)
+            cached_related = self._cached_related_procedures(target_category['name'])
+            parsing = None
+
+            try:
+                for index, (proc_code, proc_data) in enumerate(basic_procedures.items()):
+                    if procedure_filter is not None and proc_code not in procedure_filter:
+                        continue
+
+                    reused = self._reused_procedure(checkpointed, index, proc_code)
+                    if reused:
+                        processed_count += await self._store_parsed_procedure(
+                            parsing, target_category, target_category_index, comprehensive_procedures
+                        )
+                        parsing = None
+                        processed_count += self._store_reused_procedure(
+                            reused, target_category, target_category_index, index, proc_code, proc_data,
+                            comprehensive_procedures
+                        )
+                        continue
+
+                    self.logger.info(f"Getting detailed info for {proc_code} (index {index}): {proc_data.get('procedure_name', 'N/A')}")
+                    self._progress('procedure_started', code=proc_code, name=proc_data.get('procedure_name', 'N/A'),
+                                   index=index)
+
+                    if self.nav_state.needs_reset_before_detail():
+                        self.logger.info(f"  Clicking 'Back to Benefits View' to reset state before navigating to {proc_code}")
+                        await self._click_back_to_benefits_view()
+                    elif index > 0:
+                        self.nav_state.resets_skipped += 1
+
+                    index_based_jsf_id = self.nav_state.detail_jsf_id(target_category_index, index)
+                    self.logger.info(f"  Using index-based JSF ID: {index_based_jsf_id}")
+                    requests_before = len(self.metrics.records)
+
+                    if self.pipeline_parse:
+                        detail = await self._submit_procedure_detail(proc_code, index_based_jsf_id,
+                                                                     cached_related.get(proc_code))
+                        processed_count += await self._store_parsed_procedure(
+                            parsing, target_category, target_category_index, comprehensive_procedures
+                        )
+                        parsing = (index, proc_code, proc_data, detail, len(self.metrics.records) - requests_before)
+                        continue
+
+                    detailed_info = await self.get_comprehensive_procedure_detail(
+                        proc_code, index_based_jsf_id, related_procedures=cached_related.get(proc_code)
+                    )
+                    processed_count += self._store_procedure(
+                        target_category, target_category_index, index, proc_code, proc_data, detailed_info,
+                        comprehensive_procedures, len(self.metrics.records) - requests_before
+                    )
+            except (ExtractionCancelled, SessionExpired):
+                # The previous procedure's response already arrived: finish its parse and checkpoint it
+                await self._store_parsed_procedure(parsing, target_category, target_category_index,
+                                                   comprehensive_procedures)
+                raise
+
+            processed_count += await self._store_parsed_procedure(
+                parsing, target_category, target_category_index, comprehensive_procedures
+            )
+
+            return self._single_category_results(
+                target_category, target_category_index, basic_procedures, comprehensive_procedures, processed_count
+            )
+
+        except SessionExpired:
+            raise
+        except Exception as e:
+            self.logger.error(f"Single category extraction failed: {e}")
+            return None
+
+    # ------------------------------------------------------------------
+    # Procedure detail and navigation
+
+    async def get_comprehensive_procedure_detail(self, procedure_code, jsf_id, max_retries=None,
+                                                 related_procedures=None):
+        """Get ALL detailed information for a specific procedure with verification
+
+        related_procedures: the plan cache's More... expansion for this procedure, used instead
+        of requesting it"""
+        try:
+            self.logger.info(f"    Requesting detailed info for {procedure_code} with JSF ID: {jsf_id}")
+
+            verified = await self._request_procedure_detail(procedure_code, jsf_id, max_retries)
+            if verified is None:
+                return None
+            decoded, returned_proc_code = verified
+
+            detailed_data = self._procedure_detail_data(decoded, procedure_code, returned_proc_code)
+
+            more_button_jsf_id = detailed_data.get('jsf_components', {}).get('more_button')
+            if more_button_jsf_id and related_procedures is not None:
+                self._use_cached_related_procedures(detailed_data, related_procedures)
+            elif more_button_jsf_id:
+                self.logger.info(f"  Expanding 'More...' button for {procedure_code}")
+                expanded_related = await self.expand_more_related_procedures(more_button_jsf_id, procedure_code)
+                if expanded_related:
+                    detailed_data['related_procedures'] = expanded_related
+
+            return detailed_data
+
+        except SessionExpired:
+            raise
+        except Exception as e:
+            self.logger.error(f"Failed to get comprehensive procedure detail: {e}")
+            return None
+
+    async def _submit_procedure_detail(self, procedure_code, jsf_id, related_procedures=None):
+        """Pipelined get_comprehensive_procedure_detail: the parse runs on the parse thread while the
+        event loop sends the next request. Returns a Future of the detailed data, or None"""
+        try:
+            self.logger.info(f"    Requesting detailed info for {procedure_code} with JSF ID: {jsf_id}")
+
+            verified = await self._request_procedure_detail(procedure_code, jsf_id)
+            if verified is None:
+                return None
+            decoded, returned_proc_code = verified
+
+            more_button_jsf_id, back_button_id = self._detail_navigation_ids(decoded.first_payload or '')
+            self.nav_state.learn_back_button(back_button_id)
+            more_html = None
+            if not more_button_jsf_id:
+                related_procedures = None
+            elif related_procedures is None:
+                self.logger.info(f"  Expanding 'More...' button for {procedure_code}")
+                more_html = await self._request_more_related_procedures(more_button_jsf_id, procedure_code)
+
+            return self._parse_executor.submit(
+                self._parse_procedure_detail, decoded, procedure_code, returned_proc_code, more_html, related_procedures
+            )
+
+        except SessionExpired:
+            raise
+        except Exception as e:
+            self.logger.error(f"Failed to get comprehensive procedure detail: {e}")
+            return None
+
+    async def _store_parsed_procedure(self, parsing, target_category, target_category_index,
+                                      comprehensive_procedures):
+        """Wait for a pipelined procedure's parse (without blocking the event loop) and store it"""
+        if parsing is None:
+            return 0
+        index, proc_code, proc_data, detail, requests = parsing
+        detailed_info = None
+        if detail is not None:
+            try:
+                detailed_info = await asyncio.wrap_future(detail)
+            except Exception as e:
+                self.logger.error(f"Failed to parse procedure detail for {proc_code}: {e}")
+        return self._store_procedure(target_category, target_category_index, index, proc_code, proc_data,
+                                     detailed_info, comprehensive_procedures, requests)
+
+    async def _request_procedure_detail(self, procedure_code, jsf_id, max_retries=None):
+        """POST the detail click until the response shows the requested procedure (RetryPolicy).
+        Returns (decoded, returned_proc_code), or None after giving up"""
+        form_name = jsf_id.split(':')[0]
+        max_attempts = max_retries or self.retry_policy.max_attempts
+
+        for attempt in range(max_attempts):
+            await self._wait_for_circuit_breaker()
+            optimistic = self.nav_state.is_optimistic_detail()
+            payload = self._jsf_ajax_payload(form_name, jsf_id, "ben-summary-2")
+
+            self.logger.info(f"    Making POST request for {procedure_code} (attempt {attempt + 1}/{max_attempts})")
+            self.metrics.pending_attempt = attempt
+            try:
+                response = await self.client.post(self.SUBSCRIBER_URL, data=payload)
+                failure = self._classify_detail_response(response.status_code, response.text)
+            except httpx.TransportError as e:
+                self.metrics.pending_attempt = 0
+                self.logger.warning(f"    Request error for {procedure_code}: {e}")
+                failure = RetryPolicy.SERVER_ERROR
+
+            if failure is None:
+                decoded, returned_proc_code = self._check_procedure_detail_response(
+                    response.text, procedure_code, optimistic, attempt
+                )
+                if returned_proc_code == procedure_code:
+                    break
+                failure = RetryPolicy.MISMATCH
+
+            delay = self._detail_retry_delay(failure, attempt, max_attempts, optimistic)
+            if delay is None:
+                if failure == RetryPolicy.SESSION_EXPIRED:
+                    raise SessionExpired(f"Session expired while fetching {procedure_code}")
+                return None
+            await self._pause(delay)
+            if failure == RetryPolicy.MISMATCH:
+                await self._click_back_to_benefits_view()
+            elif failure == RetryPolicy.SESSION_EXPIRED and not await self._recover_session():
+                raise SessionExpired(f"Session expired while fetching {procedure_code} and could not be recovered")
+
+        return decoded, returned_proc_code
+
+    async def _recover_session(self):
+        """Get a working ViewState back after the view or login expired, then re-open the
+        category the procedure rows belong to"""
+        expanded = self.nav_state.expanded_category
+        try:
+            self.logger.info("    Session or view expired - recovering")
+            if not await self.is_session_valid():
+                await self.reauthenticate()
+                # Same patient: keep its window, including the new login
+                records = self.metrics.records
+                found = await self.search_patient(self.current_member_id, self.current_dob)
+                self.metrics.records = records + self.metrics.records
+                if not found:
+                    return False
+            self.invalidate_page_snapshot()
+            if not await self.extract_viewstate_from_current_page():
+                return False
+            if expanded is None:
+                self.nav_state.on_page_refreshed()
+                return True
+            category = self._category_from_refreshed_page(await self.get_subscriber_page(), expanded, None)
+            if category is None:
+                return False
+            response = await self.client.post(
+                self.SUBSCRIBER_URL, data=self._category_expansion_payload(category), headers=self.AJAX_HEADERS
+            )
+            if response.status_code != 200:
+                return False
+            self._handle_category_expansion(response.text, category, expanded)
+            return True
+        except Exception as e:
+            self.logger.error(f"    Session recovery failed: {e}")
+            return False
+
+    async def _click_back_to_benefits_view(self):
+        """Click 'Back to Benefits View' button to reset JSF state between procedure navigations"""
+        try:
+            back_id = self.nav_state.back_button_id
+            payload = self._jsf_ajax_payload(back_id.split(':')[0], back_id, "ben-summary-2")
+            self.nav_state.resets_issued += 1
+
+            response = await self.client.post(self.SUBSCRIBER_URL, data=payload, headers=self.AJAX_HEADERS)
+            return self._handle_back_response(response.status_code, response.text)
+
+        except Exception as e:
+            self.logger.error(f"Failed to click back button: {e}")
+            return False
+
+    async def expand_more_related_procedures(self, more_jsf_id, procedure_code):
+        """Expand the 'More...' button to get all related procedures"""
+        html_content = await self._request_more_related_procedures(more_jsf_id, procedure_code)
+        if html_content is None:
+            return []
+        return self._related_procedure_links(html_content)
+
+    async def _request_more_related_procedures(self, more_jsf_id, procedure_code):
+        """Click 'More...' and apply the new ViewState; returns the related procedures HTML, None on failure"""
+        try:
+            self.logger.info(f"    Expanding More button for {procedure_code}")
+
+            payload = self._jsf_ajax_payload(more_jsf_id.split(':')[0], more_jsf_id, "proc-related-procedures")
+            response = await self.client.post(self.SUBSCRIBER_URL, data=payload, headers=self.AJAX_HEADERS)
+
+            if response.status_code == 200:
+                return self._more_related_html(response.text)
+            return None
+
+        except Exception as e:
+            self.logger.error(f"Failed to expand more related procedures: {e}")
+            return None
+
+
+async def extract_patients_concurrently(username, password, patients, concurrency=4, output_dir='.', level=LEVEL_FULL,
+                                       procedure_codes=None, **scraper_options):
+    """Run patients concurrently in one process: `concurrency` logged-in sessions, each
+    taking the next patient from a shared queue. Returns one combined batch report
+
+    scraper_options are passed to every session (html_parser, parse_fast_path, plan_cache,
+    checkpoint, retry_policy, metrics_file, location_map, result_stream, cancel_event, http2)"""
+    queue = asyncio.Queue()
+    for position, patient in enumerate(patients):
+        queue.put_nowait((position, patient))
+
+    batch_start = time.time()
+    results = []
+
+    async def run_session(slot):
+        async with AsyncUnitedConcordiaPortalScraper(**scraper_options) as scraper:
+            try:
+                await scraper.authenticate(username, password)
+                if not await scraper.navigate_to_benefits_portal():
+                    raise Exception("Failed to navigate to benefits portal")
+            except ExtractionCancelled:
+                return
+            except Exception as e:
+                scraper.logger.error(f"Session {slot} could not log in: {e}")
+                return
+
+            while not queue.empty():
+                position, patient = queue.get_nowait()
+                report = await scraper.extract_patients_batch([patient], output_dir=output_dir, level=level,
+                                                              procedure_codes=procedure_codes)
+                results.append((position, report['patients'][0]))
+                if report['patients'][0]['status'] == 'cancelled':
+                    return
+
+    await asyncio.gather(*(run_session(slot) for slot in range(max(1, min(concurrency, queue.qsize())))))
+
+    # Patients left behind because every session failed to log in (or the batch was cancelled)
+    cancel_event = scraper_options.get('cancel_event')
+    cancelled = cancel_event is not None and cancel_event.is_set()
+    while not queue.empty():
+        position, (member_id, dob) = queue.get_nowait()
+        results.append((position, {'member_id': member_id, 'dob': dob, 'output_file': None, 'reauthenticated': False,
+                                   'status': 'cancelled' if cancelled else 'failed',
+                                   'error': 'Cancelled' if cancelled else 'No logged-in session', 'seconds': 0.0}))
+
+    report = [result for _, result in sorted(results, key=lambda item: item[0])]
+    return UnitedConcordiaPortalScraper._batch_report(report, time.time() - batch_start)
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Batch extraction: many patients on a single United Concordia login
+
+The patient list is a CSV with member_id and dob columns, or a JSON list of
+{"member_id": ..., "dob": ...} objects (or [member_id, dob] pairs).
+
+    python uc_batch.py patients.csv --output-dir results/
+    UC_USERNAME=... UC_PASSWORD=... python uc_batch.py patients.json --report batch_report.json
+    python uc_batch.py patients.csv --concurrency 4    # 4 concurrent httpx (HTTP/2) sessions in one process
+    python uc_batch.py patients.csv --level 2          # category tables only, no procedure details
+    python uc_batch.py patients.csv --codes D0120,D0274,D1110   # just these procedures
+"""
+
+import argparse
+import asyncio
+import csv
+import json
+import os
+import sys
+
+from APIScrapper_v3 import UnitedConcordiaPortalScraper, ResultStream, DEFAULT_SESSION_FILE, LEVEL_FULL
+from uc_store import ProcedureDictionary, ProcedureLocationMap
+
+
+def load_patients(path):
+    """Return [(member_id, dob)] from a CSV or JSON patient list"""
+    with open(path, encoding='utf-8') as f:
+        if path.lower().endswith('.json'):
+            entries = json.load(f)
+        else:
+            entries = list(csv.DictReader(f))
+
+    patients = []
+    for entry in entries:
+        if isinstance(entry, dict):
+            entry = {key.strip().lower(): value for key, value in entry.items()}
+            member_id, dob = entry.get('member_id'), entry.get('dob')
+        else:
+            member_id, dob = entry
+        if member_id and dob:
+            patients.append((str(member_id).strip(), str(dob).strip()))
+    return patients
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('patients', help="CSV or JSON file with member_id and dob")
+    parser.add_argument('--username', default=os.environ.get('UC_USERNAME'))
+    parser.add_argument('--password', default=os.environ.get('UC_PASSWORD'))
+    parser.add_argument('--output-dir', default='batch_results', help="One JSON file per patient is written here")
+    parser.add_argument('--workers', type=int, default=1, help="Parallel portal sessions per patient")
+    parser.add_argument('--session-file', default=DEFAULT_SESSION_FILE,
+                        help="Saved login reused across runs while still valid ('' to always log in)")
+    parser.add_argument('--concurrency', type=int, default=1,
+                        help="Run patients on this many concurrent httpx sessions (uc_async_scraper)")
+    parser.add_argument('--level', type=int, choices=[1, 2, 3], default=LEVEL_FULL,
+                        help="1: benefits summary, 2: plus category tables, 3: plus procedure details")
+    parser.add_argument('--codes', help="Comma-separated CDT codes: extract only these procedures (overrides --level)")
+    parser.add_argument('--stream', help="Also write results to this file as NDJSON events while they are extracted")
+    parser.add_argument('--cdt-dictionary', action='store_true',
+                        help="Keep CDT dictionary entries in the shared SQLite store and reference them by code")
+    parser.add_argument('--pipeline-parse', action='store_true',
+                        help="Parse each procedure detail on a worker thread while the next request is sent")
+    parser.add_argument('--metrics-file', help="Append per-request timings (JSON lines) to this file")
+    parser.add_argument('--report', help="Also save the batch report (timings, failures) to this JSON file")
+    args = parser.parse_args()
+
+    if not (args.username and args.password):
+        print("Credentials required: --username/--password or UC_USERNAME/UC_PASSWORD")
+        return 1
+
+    patients = load_patients(args.patients)
+    if not patients:
+        print(f"No patients found in {args.patients}")
+        return 1
+
+    # Procedure locations learned on the first patient of a plan let the rest skip category discovery
+    procedure_codes = [code for code in (args.codes or '').split(',') if code.strip()] or None
+    location_map = ProcedureLocationMap() if procedure_codes else None
+    # One locked writer for every session of the batch (--concurrency runs several)
+    result_stream = ResultStream(open(args.stream, 'a', encoding='utf-8')) if args.stream else None
+    procedure_dictionary = ProcedureDictionary() if args.cdt_dictionary else None
+
+    if args.concurrency > 1:
+        from uc_async_scraper import extract_patients_concurrently
+        report = asyncio.run(extract_patients_concurrently(
+            args.username, args.password, patients, concurrency=args.concurrency, output_dir=args.output_dir,
+            level=args.level, procedure_codes=procedure_codes, metrics_file=args.metrics_file, location_map=location_map,
+            result_stream=result_stream, pipeline_parse=args.pipeline_parse, procedure_dictionary=procedure_dictionary
+        ))
+    else:
+        scraper = UnitedConcordiaPortalScraper(session_file=args.session_file or None, metrics_file=args.metrics_file,
+                                               location_map=location_map, result_stream=result_stream,
+                                               pipeline_parse=args.pipeline_parse,
+                                               procedure_dictionary=procedure_dictionary)
+        with scraper:
+            scraper.authenticate(args.username, args.password)
+            if not scraper.navigate_to_benefits_portal():
+                print("Failed to navigate to benefits portal")
+                return 1
+
+            report = scraper.extract_patients_batch(patients, output_dir=args.output_dir, workers=args.workers,
+                                                    level=args.level, procedure_codes=procedure_codes)
+    if result_stream:
+        result_stream.close()
+
+    print("\n" + "=" * 60)
+    print("BATCH SUMMARY")
+    print("=" * 60)
+    for result in report['patients']:
+        status = "✓" if result['status'] == 'success' else "✗"
+        if result['status'] == 'success':
+            detail = f"{result.get('procedures', 0)} procedures, {result.get('requests', 0)} requests"
+        else:
+            detail = result.get('error')
+        relogin = " (re-authenticated)" if result['reauthenticated'] else ""
+        print(f"{status} {result['member_id']:<15} {result['seconds']:>8.2f}s  {detail}{relogin}")
+    print(f"\n{report['succeeded']}/{len(report['patients'])} succeeded in {report['total_seconds']:.2f}s "
+          f"({report['patients_per_hour']:.1f} patients/hour)")
+
+    if args.report:
+        with open(args.report, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"Report saved to {args.report}")
+
+    return 0 if report['failed'] == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
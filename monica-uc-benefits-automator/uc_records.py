@@ -0,0 +1,177 @@
+"""
+Compact record types for UC procedure data
+
+Procedure records are read-only mappings over __slots__ with every string interned,
+so the "Yes"/"No" flags, limitation texts, category and procedure names repeated on
+every row (and every patient of a batch) are stored once. They read like the dicts
+they replace (record['procedure_code'], .get, .items) and only become the JSON shape
+(to_dict / to_json) when results are saved, streamed or cached. Results returned by the
+scraper's public methods are converted with to_plain, so callers get plain dicts and lists.
+"""
+
+import sys
+from collections.abc import Mapping
+
+_MISSING = object()
+
+
+def _compact(value):
+    """Interned copy of a parsed value: str interned, lists as tuples, dicts as _Pairs"""
+    if isinstance(value, str):
+        return sys.intern(value)
+    if isinstance(value, (list, tuple)):
+        return tuple(_compact(item) for item in value)
+    if isinstance(value, dict):
+        return _Pairs(value)
+    return value
+
+
+def _plain(value):
+    if isinstance(value, (_Record, _Pairs)):
+        return value.to_dict()
+    if isinstance(value, tuple):
+        return [_plain(item) for item in value]
+    return value
+
+
+def to_plain(value):
+    """Plain dicts and lists for results handed to callers: records and nested containers
+    converted, so the result can be mutated and passed to json.dumps without default="""
+    if isinstance(value, (_Record, _Pairs)):
+        return value.to_dict()
+    if isinstance(value, dict):
+        return {key: to_plain(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [to_plain(item) for item in value]
+    return value
+
+
+def to_json(value):
+    """json.dump(s) default= hook for record types"""
+    if isinstance(value, (_Record, _Pairs)):
+        return value.to_dict()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+class _Pairs(Mapping):
+    """Read-only mapping with free-form keys (procedure_dictionary), stored as two tuples"""
+
+    __slots__ = ('_keys', '_values')
+
+    def __init__(self, data):
+        self._keys = tuple(sys.intern(key) for key in data)
+        self._values = tuple(_compact(value) for value in data.values())
+
+    def __getitem__(self, key):
+        try:
+            return self._values[self._keys.index(key)]
+        except ValueError:
+            raise KeyError(key) from None
+
+    def __iter__(self):
+        return iter(self._keys)
+
+    def __len__(self):
+        return len(self._keys)
+
+    def to_dict(self):
+        return {key: _plain(value) for key, value in zip(self._keys, self._values)}
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.to_dict()!r})"
+
+
+class _Record(Mapping):
+    """Read-only mapping over __slots__; fields never set are absent, as in the JSON shape"""
+
+    __slots__ = ()
+
+    # field -> record type of the nested dict (or of each item of a nested list)
+    FIELD_TYPES = {}
+
+    def __init__(self, **values):
+        for field in self.__slots__:
+            object.__setattr__(self, field, values.get(field, _MISSING))
+
+    @classmethod
+    def from_dict(cls, data):
+        """Compact record for one parsed dict; a dict with fields this type does not know
+        is kept as a plain dict (strings still interned) so nothing is dropped"""
+        if isinstance(data, _Record):
+            return data
+        if not set(data) <= set(cls.__slots__):
+            return {sys.intern(key): _compact(value) for key, value in data.items()}
+        values = {}
+        for field, value in data.items():
+            field_type = cls.FIELD_TYPES.get(field)
+            if field_type and isinstance(value, dict):
+                values[field] = field_type.from_dict(value)
+            elif field_type and isinstance(value, list):
+                values[field] = tuple(field_type.from_dict(item) if isinstance(item, dict) else _compact(item)
+                                      for item in value)
+            else:
+                values[field] = _compact(value)
+        return cls(**values)
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is read-only")
+
+    def __getitem__(self, key):
+        if key in self.__slots__:
+            value = getattr(self, key)
+            if value is not _MISSING:
+                return value
+        raise KeyError(key)
+
+    def __iter__(self):
+        return (field for field in self.__slots__ if getattr(self, field) is not _MISSING)
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def to_dict(self):
+        return {field: _plain(getattr(self, field)) for field in self}
+
+    def __eq__(self, other):
+        if not isinstance(other, Mapping):
+            return NotImplemented
+        return self.to_dict() == _plain(other)
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.to_dict()!r})"
+
+
+class ProcedureDetails(_Record):
+    __slots__ = ('covered', 'allowance', 'coverage', 'limitations', 'applies_to_deductible', 'applies_to_maximum')
+
+
+class ServiceHistoryEntry(_Record):
+    __slots__ = ('date_of_service', 'procedure', 'tooth', 'surface')
+
+
+class PolicyDetail(_Record):
+    __slots__ = ('policy_type', 'description')
+
+
+class ProcedureRecord(_Record):
+    """One procedure as in procedures_by_category (level 3, or code and name only
+    when the detail request failed; from_plan_cache names the fields taken from the plan cache)"""
+
+    __slots__ = ('procedure_code', 'procedure_name', 'procedure_details', 'cost_share', 'related_procedures',
+                 'service_history', 'policy_details', 'procedure_dictionary', 'procedure_dictionary_ref',
+                 'from_plan_cache')
+
+    FIELD_TYPES = {
+        'procedure_details': ProcedureDetails,
+        'service_history': ServiceHistoryEntry,
+        'policy_details': PolicyDetail
+    }
+
+
+class CategoryTableRow(_Record):
+    """One row of a category table (level 2 records)"""
+
+    __slots__ = ('procedure_code', 'procedure_name', 'covered', 'allowance', 'coverage', 'limitation',
+                 'applies_to_deductible', 'applies_to_maximum')
@@ -0,0 +1,312 @@
+#!/usr/bin/env python3
+"""
+Record/replay harness for the UC JSF flow
+Records every request/response of one live extraction to a fixture directory,
+then replays the whole authenticate -> search -> extract_all_categories_data
+pipeline offline from those exchanges, so parser and navigation changes can
+be benchmarked without portal access.
+
+Requests are matched on method, URL and form fields (javax.faces.ViewState
+ignored); repeated identical requests get the recorded responses in order.
+Credentials and cookie values are redacted from the fixture, but a live
+recording still holds the patient's benefits data - keep those out of version
+control. tests/fixtures/replay_session is a synthetic recording of the fake
+portal in tests/fake_portal.py, replayed by tests/test_replay.py.
+
+    UC_USERNAME=... UC_PASSWORD=... python uc_replay.py record uc_fixtures/run1 --member-id 00964917 --dob 02/17/2010
+    python uc_replay.py replay uc_fixtures/run1 --repeat 5 --output replay_results.json
+"""
+
+import argparse
+import base64
+import http.client
+import io
+import json
+import logging
+import os
+import statistics
+import sys
+import time
+from collections import defaultdict
+from urllib.parse import parse_qsl
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3 import HTTPResponse
+from urllib3._collections import HTTPHeaderDict
+
+from APIScrapper_v3 import UnitedConcordiaPortalScraper
+
+EXCHANGES_FILE = "exchanges.jsonl"
+MANIFEST_FILE = "manifest.json"
+REDACTED = "REDACTED"
+
+# Form fields holding credentials (see _credential_submission/_oam_credential_submissions)
+CREDENTIAL_FIELDS = {'username', 'user', 'password'}
+IGNORED_FIELDS = {'javax.faces.ViewState'}
+
+# The body is stored decoded, so these no longer describe it
+DROPPED_HEADERS = {'content-encoding', 'content-length', 'transfer-encoding'}
+
+
+class ReplayMiss(requests.ConnectionError):
+    """No recorded exchange matches the request"""
+
+
+def _form_fields(body):
+    """Decoded (name, value) pairs of a form-encoded request body, credentials redacted"""
+    if not body:
+        return []
+    if isinstance(body, bytes):
+        body = body.decode('utf-8', errors='replace')
+    return [(name, REDACTED if name in CREDENTIAL_FIELDS else value)
+            for name, value in parse_qsl(body, keep_blank_values=True)]
+
+
+def exchange_key(method, url, form):
+    """What a replayed request is matched on: method, URL and form fields without the ViewState"""
+    fields = sorted((name, value) for name, value in form if name not in IGNORED_FIELDS)
+    return json.dumps([method.upper(), url.split('#')[0], fields])
+
+
+def _redact_set_cookie(value):
+    name, _, rest = value.partition('=')
+    attributes = rest.partition(';')[2]
+    return f"{name}={REDACTED}" + (f";{attributes}" if attributes else "")
+
+
+class _RecordedConnection:
+    """Stands in for the http.client response urllib3 wraps; requests reads Set-Cookie from msg"""
+
+    def __init__(self, msg):
+        self.msg = msg
+
+    def isclosed(self):
+        return True
+
+    def close(self):
+        pass
+
+
+class RecordingAdapter(HTTPAdapter):
+    """HTTPAdapter that appends every exchange to <fixture_dir>/exchanges.jsonl
+
+    upstream: adapter to record instead of the network (e.g. a test portal)"""
+
+    def __init__(self, fixture_dir, upstream=None, **kwargs):
+        super().__init__(**kwargs)
+        self.upstream = upstream
+        os.makedirs(fixture_dir, exist_ok=True)
+        self.path = os.path.join(fixture_dir, EXCHANGES_FILE)
+        self.count = 0
+        open(self.path, 'w').close()
+
+    def send(self, request, **kwargs):
+        response = (self.upstream or super()).send(request, **kwargs)
+        content = response.content
+        headers = []
+        raw_headers = response.raw.headers if response.raw is not None else response.headers
+        for name, value in raw_headers.items():
+            if name.lower() in DROPPED_HEADERS:
+                continue
+            if name.lower() == 'set-cookie':
+                value = _redact_set_cookie(value)
+            headers.append([name, value])
+
+        exchange = {
+            'method': request.method,
+            'url': request.url,
+            'form': _form_fields(request.body),
+            'status': response.status_code,
+            'reason': response.reason,
+            'headers': headers
+        }
+        try:
+            exchange['body'] = content.decode('utf-8')
+        except UnicodeDecodeError:
+            exchange['body_b64'] = base64.b64encode(content).decode('ascii')
+
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(exchange, ensure_ascii=False) + "\n")
+        self.count += 1
+        return response
+
+
+class ReplayAdapter(HTTPAdapter):
+    """HTTPAdapter that answers from a recorded fixture instead of the network"""
+
+    def __init__(self, fixture_dir, **kwargs):
+        super().__init__(**kwargs)
+        self.recorded = defaultdict(list)
+        with open(os.path.join(fixture_dir, EXCHANGES_FILE), encoding='utf-8') as f:
+            for line in f:
+                exchange = json.loads(line)
+                self.recorded[exchange_key(exchange['method'], exchange['url'], exchange['form'])].append(exchange)
+        self.rewind()
+
+    def rewind(self):
+        """Serve every key from its first recorded response again (for repeated runs)"""
+        self.cursors = defaultdict(int)
+        self.served = 0
+        self.misses = []
+
+    def send(self, request, **kwargs):
+        key = exchange_key(request.method, request.url, _form_fields(request.body))
+        candidates = self.recorded.get(key)
+        if not candidates:
+            self.misses.append(f"{request.method} {request.url}")
+            raise ReplayMiss(f"No recorded exchange for {request.method} {request.url}", request=request)
+
+        # Identical requests (back clicks, probes) get their responses in recorded order,
+        # the last one repeating once they run out
+        position = self.cursors[key]
+        self.cursors[key] += 1
+        self.served += 1
+        return self.build_response(request, self._raw_response(candidates[min(position, len(candidates) - 1)]))
+
+    @staticmethod
+    def _raw_response(exchange):
+        if 'body_b64' in exchange:
+            content = base64.b64decode(exchange['body_b64'])
+        else:
+            content = exchange['body'].encode('utf-8')
+
+        headers = HTTPHeaderDict()
+        message = http.client.HTTPMessage()
+        for name, value in exchange['headers']:
+            headers.add(name, value)
+            message[name] = value
+
+        return HTTPResponse(
+            body=io.BytesIO(content),
+            headers=headers,
+            status=exchange['status'],
+            reason=exchange['reason'],
+            preload_content=False,
+            decode_content=False,
+            original_response=_RecordedConnection(message)
+        )
+
+
+def record_session(scraper, fixture_dir, upstream=None):
+    """Mount a RecordingAdapter on the scraper's session and return it"""
+    adapter = RecordingAdapter(fixture_dir, upstream)
+    scraper.session.mount('https://', adapter)
+    scraper.session.mount('http://', adapter)
+    return adapter
+
+
+def replay_session(scraper, fixture_dir):
+    """Mount a ReplayAdapter on the scraper's session and return it"""
+    adapter = ReplayAdapter(fixture_dir)
+    scraper.session.mount('https://', adapter)
+    scraper.session.mount('http://', adapter)
+    return adapter
+
+
+def run_extraction(scraper, username, password, member_id, dob, output_file):
+    """authenticate -> navigate -> search -> extract_all_categories_data; returns the results or None"""
+    scraper.authenticate(username, password, reuse_session=False)
+    if not scraper.navigate_to_benefits_portal():
+        print("Failed to navigate to benefits portal")
+        return None
+    if not scraper.search_patient(member_id, dob):
+        print(f"Patient {member_id} not found")
+        return None
+    return scraper.extract_all_categories_data(output_file=output_file)
+
+
+def record(args):
+    username = args.username or os.environ.get('UC_USERNAME')
+    password = args.password or os.environ.get('UC_PASSWORD')
+    if not (username and password):
+        print("Credentials required: --username/--password or UC_USERNAME/UC_PASSWORD")
+        return 1
+
+    scraper = UnitedConcordiaPortalScraper()
+    adapter = record_session(scraper, args.fixture_dir)
+    results = run_extraction(scraper, username, password, args.member_id, args.dob, args.output)
+    if not results:
+        return 1
+
+    save_manifest(args.fixture_dir, args.member_id, args.dob, adapter.count, results['extraction_summary'])
+    print(f"Recorded {adapter.count} exchanges to {args.fixture_dir}")
+    return 0
+
+
+def save_manifest(fixture_dir, member_id, dob, exchanges, extraction_summary):
+    """Write what replay needs besides the exchanges: the patient searched and the recorded counts"""
+    manifest = {
+        'member_id': member_id,
+        'dob': dob,
+        'recorded_at': time.strftime('%Y-%m-%d %H:%M:%S'),
+        'exchanges': exchanges,
+        'extraction_summary': extraction_summary
+    }
+    with open(os.path.join(fixture_dir, MANIFEST_FILE), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+
+
+def replay(args):
+    with open(os.path.join(args.fixture_dir, MANIFEST_FILE), encoding='utf-8') as f:
+        manifest = json.load(f)
+
+    timings = []
+    for run in range(args.repeat):
+        scraper = UnitedConcordiaPortalScraper(html_parser=args.html_parser, parse_fast_path=not args.full_parse)
+        scraper.logger.setLevel(logging.WARNING)
+        adapter = replay_session(scraper, args.fixture_dir)
+
+        start = time.perf_counter()
+        results = run_extraction(scraper, REDACTED, REDACTED, manifest['member_id'], manifest['dob'], args.output)
+        elapsed = time.perf_counter() - start
+        if adapter.misses:
+            print(f"{len(adapter.misses)} requests had no recorded exchange, first: {adapter.misses[0]}")
+        if not results:
+            return 1
+
+        timings.append(elapsed)
+        summary = results['extraction_summary']
+        print(f"Run {run + 1}: {elapsed:.3f}s, {adapter.served} exchanges, "
+              f"{summary['total_categories_processed']} categories, {summary['total_procedures_extracted']} procedures")
+
+    expected = manifest['extraction_summary']
+    if (summary['total_categories_processed'], summary['total_procedures_extracted']) != \
+            (expected['total_categories_processed'], expected['total_procedures_extracted']):
+        print(f"Replay differs from the recording: {expected['total_categories_processed']} categories, "
+              f"{expected['total_procedures_extracted']} procedures recorded")
+        return 1
+
+    print(f"\nmin {min(timings):.3f}s  median {statistics.median(timings):.3f}s over {len(timings)} runs")
+    for action, stats in results['request_metrics']['by_action'].items():
+        print(f"  {action:<20} {stats['requests']:>5} requests {stats['seconds']:>8.3f}s")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    record_parser = commands.add_parser('record', help="Run one live extraction and save its exchanges")
+    record_parser.add_argument('fixture_dir')
+    record_parser.add_argument('--member-id', required=True)
+    record_parser.add_argument('--dob', required=True)
+    record_parser.add_argument('--username')
+    record_parser.add_argument('--password')
+    record_parser.add_argument('--output', default='mypatientbenefitssummary.json')
+    record_parser.set_defaults(handler=record)
+
+    replay_parser = commands.add_parser('replay', help="Run the extraction offline from a fixture")
+    replay_parser.add_argument('fixture_dir')
+    replay_parser.add_argument('--repeat', type=int, default=1)
+    replay_parser.add_argument('--html-parser', help="BeautifulSoup tree builder (default: html.parser, or UC_HTML_PARSER)")
+    replay_parser.add_argument('--full-parse', action='store_true', help="Disable the parse fast path")
+    replay_parser.add_argument('--output', default='replay_results.json')
+    replay_parser.set_defaults(handler=replay)
+
+    args = parser.parse_args()
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
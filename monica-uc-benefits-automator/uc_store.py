@@ -0,0 +1,273 @@
+"""
+Persistent SQLite stores for the UC scraper (plan cache, procedure locations, CDT dictionary, extraction checkpoints)
+"""
+
+import json
+import sqlite3
+import threading
+import time
+
+from uc_records import to_json
+
+DEFAULT_DB_PATH = "uc_cache.sqlite3"
+
+
+class _SQLiteStore:
+    """Shared connection handling: one connection per store, serialized by a lock"""
+
+    SCHEMA = ""
+
+    def __init__(self, path=DEFAULT_DB_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.executescript(self.SCHEMA)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class PlanBenefitCache(_SQLiteStore):
+    """Plan-level procedure data (category tables, allowances, policy details) keyed by
+    group and network, so patients on the same plan skip the plan-level requests"""
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS plan_benefits (
+            plan_key TEXT NOT NULL,
+            category_name TEXT NOT NULL,
+            category_index INTEGER NOT NULL,
+            data TEXT NOT NULL,
+            updated_at REAL NOT NULL,
+            PRIMARY KEY (plan_key, category_name)
+        );
+    """
+
+    def __init__(self, path=DEFAULT_DB_PATH, ttl_seconds=7 * 24 * 3600):
+        super().__init__(path)
+        self.ttl_seconds = ttl_seconds
+
+    @staticmethod
+    def plan_key(benefits_summary):
+        """Group / ID plus network from extract_benefits_summary, or None if the plan is unknown"""
+        network_info = (benefits_summary or {}).get('Network and Group Information', {})
+        group = network_info.get('Group / ID')
+        if not group:
+            return None
+        return '|'.join([group, network_info.get('Your Network', ''), network_info.get('Group Network', '')])
+
+    def get(self, plan_key):
+        """Return {category_name: {'category_index', 'procedures'}} for entries still within the TTL"""
+        cutoff = time.time() - self.ttl_seconds
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT category_name, category_index, data FROM plan_benefits WHERE plan_key = ? AND updated_at >= ?",
+                (plan_key, cutoff)
+            ).fetchall()
+        return {
+            name: {'category_index': category_index, 'procedures': json.loads(data)}
+            for name, category_index, data in rows
+        }
+
+    def put_category(self, plan_key, category_name, category_index, procedures):
+        """Store one category's procedures (service history already blanked by the caller)"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO plan_benefits (plan_key, category_name, category_index, data, updated_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (plan_key, category_name, category_index, json.dumps(procedures, default=to_json), time.time())
+            )
+
+    def purge_expired(self):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM plan_benefits WHERE updated_at < ?", (time.time() - self.ttl_seconds,))
+
+
+class ProcedureLocationMap(_SQLiteStore):
+    """Which category each procedure code is listed under, keyed by plan, so targeted
+    extractions expand only the categories holding the requested codes"""
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS procedure_locations (
+            plan_key TEXT NOT NULL,
+            procedure_code TEXT NOT NULL,
+            category_index INTEGER NOT NULL,
+            category_name TEXT NOT NULL,
+            updated_at REAL NOT NULL,
+            PRIMARY KEY (plan_key, procedure_code, category_index)
+        );
+    """
+
+    plan_key = staticmethod(PlanBenefitCache.plan_key)
+
+    def __init__(self, path=DEFAULT_DB_PATH, ttl_seconds=7 * 24 * 3600):
+        super().__init__(path)
+        self.ttl_seconds = ttl_seconds
+
+    def get(self, plan_key):
+        """Return {procedure_code: [(category_index, category_name), ...]} ordered by category"""
+        cutoff = time.time() - self.ttl_seconds
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT procedure_code, category_index, category_name FROM procedure_locations "
+                "WHERE plan_key = ? AND updated_at >= ? ORDER BY category_index",
+                (plan_key, cutoff)
+            ).fetchall()
+        locations = {}
+        for code, category_index, category_name in rows:
+            locations.setdefault(code, []).append((category_index, category_name))
+        return locations
+
+    def put_category(self, plan_key, category_index, category_name, procedure_codes):
+        """Replace the codes listed under one category"""
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "DELETE FROM procedure_locations WHERE plan_key = ? AND category_index = ?",
+                (plan_key, category_index)
+            )
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO procedure_locations VALUES (?, ?, ?, ?, ?)",
+                [(plan_key, code, category_index, category_name, now) for code in procedure_codes]
+            )
+
+
+class ProcedureDictionary(_SQLiteStore):
+    """CDT reference entries (the procedure dictionary of the detail view) by procedure code.
+    They are the same for every patient and plan, so results reference them by code"""
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS procedure_dictionary (
+            procedure_code TEXT PRIMARY KEY,
+            entries TEXT NOT NULL,
+            updated_at REAL NOT NULL
+        );
+    """
+
+    def __init__(self, path=DEFAULT_DB_PATH):
+        super().__init__(path)
+        # Known codes are checked for every procedure detail, so keep them in memory
+        with self._lock:
+            self._known = {row[0] for row in self._conn.execute("SELECT procedure_code FROM procedure_dictionary")}
+
+    def __contains__(self, procedure_code):
+        return procedure_code in self._known
+
+    def get(self, procedure_code):
+        """Return the entries for one code, or None"""
+        return self.get_many([procedure_code]).get(procedure_code)
+
+    def get_many(self, procedure_codes):
+        """Return {procedure_code: entries} for the known codes among procedure_codes"""
+        codes = [code for code in set(procedure_codes) if code in self._known]
+        if not codes:
+            return {}
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT procedure_code, entries FROM procedure_dictionary "
+                f"WHERE procedure_code IN ({','.join('?' * len(codes))})",
+                codes
+            ).fetchall()
+        return {code: json.loads(entries) for code, entries in rows}
+
+    def put(self, procedure_code, entries):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO procedure_dictionary VALUES (?, ?, ?)",
+                (procedure_code, json.dumps(entries, default=to_json), time.time())
+            )
+            self._known.add(procedure_code)
+
+
+class ExtractionCheckpoint(_SQLiteStore):
+    """Completed procedures and categories of an in-progress extraction, keyed by member ID
+    and DOB, so a rerun after a failure or session timeout resumes where it stopped.
+    Entries older than ttl_seconds (1 day by default) are ignored and purged: service
+    history and benefits used may have changed since"""
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS checkpoint_procedures (
+            member_key TEXT NOT NULL,
+            category_index INTEGER NOT NULL,
+            row_index INTEGER NOT NULL,
+            unique_key TEXT NOT NULL,
+            data TEXT NOT NULL,
+            saved_at REAL NOT NULL DEFAULT 0,
+            PRIMARY KEY (member_key, category_index, row_index)
+        );
+        CREATE TABLE IF NOT EXISTS checkpoint_categories (
+            member_key TEXT NOT NULL,
+            category_index INTEGER NOT NULL,
+            category_name TEXT NOT NULL,
+            data TEXT NOT NULL,
+            saved_at REAL NOT NULL DEFAULT 0,
+            PRIMARY KEY (member_key, category_index)
+        );
+    """
+
+    def __init__(self, path=DEFAULT_DB_PATH, ttl_seconds=24 * 3600):
+        super().__init__(path)
+        self.ttl_seconds = ttl_seconds
+        # Checkpoints written before saved_at existed count as expired
+        with self._lock, self._conn:
+            for table in ('checkpoint_procedures', 'checkpoint_categories'):
+                columns = {row[1] for row in self._conn.execute(f"PRAGMA table_info({table})")}
+                if 'saved_at' not in columns:
+                    self._conn.execute(f"ALTER TABLE {table} ADD COLUMN saved_at REAL NOT NULL DEFAULT 0")
+
+    @staticmethod
+    def member_key(member_id, dob):
+        return f"{member_id}|{dob}"
+
+    def save_procedure(self, member_key, category_index, row_index, unique_key, record):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO checkpoint_procedures "
+                "(member_key, category_index, row_index, unique_key, data, saved_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (member_key, category_index, row_index, unique_key, json.dumps(record, default=to_json), time.time())
+            )
+
+    def load_procedures(self, member_key, category_index):
+        """Return {row_index: (unique_key, record)} for one category, within the TTL"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT row_index, unique_key, data FROM checkpoint_procedures "
+                "WHERE member_key = ? AND category_index = ? AND saved_at >= ?",
+                (member_key, category_index, time.time() - self.ttl_seconds)
+            ).fetchall()
+        return {row_index: (unique_key, json.loads(data)) for row_index, unique_key, data in rows}
+
+    def save_category(self, member_key, category_index, category_name, entry):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO checkpoint_categories "
+                "(member_key, category_index, category_name, data, saved_at) VALUES (?, ?, ?, ?, ?)",
+                (member_key, category_index, category_name, json.dumps(entry, default=to_json), time.time())
+            )
+            # The category entry now holds its procedures
+            self._conn.execute(
+                "DELETE FROM checkpoint_procedures WHERE member_key = ? AND category_index = ?",
+                (member_key, category_index)
+            )
+
+    def load_categories(self, member_key):
+        """Return {category_index: (category_name, entry)} for completed categories, within the TTL"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT category_index, category_name, data FROM checkpoint_categories "
+                "WHERE member_key = ? AND saved_at >= ?",
+                (member_key, time.time() - self.ttl_seconds)
+            ).fetchall()
+        return {category_index: (name, json.loads(data)) for category_index, name, data in rows}
+
+    def purge_expired(self):
+        cutoff = time.time() - self.ttl_seconds
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM checkpoint_procedures WHERE saved_at < ?", (cutoff,))
+            self._conn.execute("DELETE FROM checkpoint_categories WHERE saved_at < ?", (cutoff,))
+
+    def clear(self, member_key):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM checkpoint_procedures WHERE member_key = ?", (member_key,))
+            self._conn.execute("DELETE FROM checkpoint_categories WHERE member_key = ?", (member_key,))
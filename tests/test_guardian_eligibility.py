@@ -0,0 +1,103 @@
+"""
+guardian_eligibility.demultiplex_search: response blocks of one batched
+multiple-patient/search are matched back to the patients that asked for them, and any
+patient without exactly one fitting block falls back to its own search
+"""
+
+import asyncio
+import os
+import sys
+import unittest
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from guardian_eligibility import SEARCH_PATH, demultiplex_search, search_chunk  # noqa: E402
+
+
+def member_block(member_id, last_name="SMITH", dob="01/02/1980"):
+    return {"input_identifier": member_id,
+            "member_dependent": [{"identifier": member_id, "last_name": last_name, "date_of_birth": dob}]}
+
+
+def name_block(last_name, dob):
+    return {"member_dependent": [{"identifier": f"ID-{last_name}", "last_name": last_name, "date_of_birth": dob}]}
+
+
+def blocks_for(matched):
+    return {position: response["multiple_patient_search_res"][0] for position, response in matched.items()}
+
+
+class DemultiplexSearchTest(unittest.TestCase):
+
+    def test_blocks_in_request_order(self):
+        chunk = [(0, {"member_id": "A1"}), (1, {"member_id": "B2"})]
+        blocks = [member_block("A1"), member_block("B2")]
+        self.assertEqual(blocks_for(demultiplex_search(chunk, blocks)), {0: blocks[0], 1: blocks[1]})
+
+    def test_reordered_blocks(self):
+        chunk = [(4, {"member_id": "A1"}), (7, {"member_id": "b2 "}), (9, {"member_id": "C3"})]
+        blocks = [member_block("C3"), member_block("A1"), member_block("B2")]
+        self.assertEqual(blocks_for(demultiplex_search(chunk, blocks)), {4: blocks[1], 7: blocks[2], 9: blocks[0]})
+
+    def test_same_dob_different_last_names(self):
+        chunk = [(0, {"last_name": "Smith", "dob": "01/02/1980"}), (1, {"last_name": "Jones", "dob": "01/02/1980"})]
+        blocks = [name_block("JONES", "01/02/1980"), name_block("SMITH", "01/02/1980")]
+        self.assertEqual(blocks_for(demultiplex_search(chunk, blocks)), {0: blocks[1], 1: blocks[0]})
+
+    def test_dob_match_without_last_name_falls_back(self):
+        chunk = [(0, {"last_name": "Smith", "dob": "01/02/1980"})]
+        blocks = [{"member_dependent": [{"identifier": "X", "date_of_birth": "01/02/1980"}]}]
+        self.assertEqual(demultiplex_search(chunk, blocks), {})
+
+    def test_block_matching_nothing_falls_back(self):
+        chunk = [(0, {"member_id": "A1"}), (1, {"member_id": "B2"})]
+        blocks = [member_block("A1"), member_block("Z9")]
+        self.assertEqual(blocks_for(demultiplex_search(chunk, blocks)), {0: blocks[0]})
+
+    def test_ambiguous_block_falls_back(self):
+        # One family block lists both searched dependents: it answers neither search alone
+        family = {"member_dependent": [{"identifier": "A1", "last_name": "SMITH", "date_of_birth": "01/02/1980"},
+                                       {"identifier": "B2", "last_name": "SMITH", "date_of_birth": "03/04/2010"}]}
+        chunk = [(0, {"member_id": "A1"}), (1, {"member_id": "B2"})]
+        self.assertEqual(demultiplex_search(chunk, [family]), {})
+
+    def test_patient_without_result(self):
+        chunk = [(0, {"member_id": "A1"}), (1, {"member_id": "B2"}), (2, {"member_id": "C3"})]
+        blocks = [member_block("A1"), member_block("C3")]
+        matched = demultiplex_search(chunk, blocks)
+        self.assertEqual(blocks_for(matched), {0: blocks[0], 2: blocks[1]})
+        self.assertNotIn(1, matched)
+
+    def test_non_dict_blocks_are_skipped(self):
+        chunk = [(0, {"member_id": "A1"})]
+        blocks = [None, "error", member_block("A1")]
+        self.assertEqual(blocks_for(demultiplex_search(chunk, blocks)), {0: blocks[2]})
+
+
+class SearchChunkTest(unittest.TestCase):
+
+    def search(self, chunk, handler):
+        async def run():
+            async with httpx.AsyncClient(base_url="https://guardian.test",
+                                         transport=httpx.MockTransport(handler)) as client:
+                return await search_chunk(client, chunk, log=lambda message: None)
+        return asyncio.run(run())
+
+    def test_missing_patient_is_left_to_its_own_search(self):
+        chunk = [(0, {"member_id": "A1"}), (1, {"member_id": "B2"})]
+
+        def handler(request):
+            self.assertEqual(request.url.path, SEARCH_PATH)
+            return httpx.Response(200, json={"multiple_patient_search_res": [member_block("B2")]})
+
+        self.assertEqual(list(self.search(chunk, handler)), [1])
+
+    def test_failed_request_matches_nothing(self):
+        chunk = [(0, {"member_id": "A1"})]
+        self.assertEqual(self.search(chunk, lambda request: httpx.Response(500, text="error")), {})
+
+
+if __name__ == '__main__':
+    unittest.main()